@@ -0,0 +1,92 @@
+# Measure peak memory while extracting synthetic Textract response files of increasing density,
+# streaming the file compared to loading it whole.
+#
+# Run from the libriscan directory with:
+#
+# (bash) python manage.py shell < benchmarks/extraction_memory.py
+#
+# Saving is skipped, so nothing is written to the database.
+
+import json
+import os
+import random
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+from biblios.models import Document, Page
+from biblios.services.extractors import AWSExtractor, JSONArrayStream
+
+WORDS_PER_LINE = 10
+SIZES = (1250, 2500, 5000, 10000)
+
+
+def synthetic_response(words):
+    """A Textract-style response with `words` words, in lines at random heights down the page."""
+    blocks = []
+    lines = words // WORDS_PER_LINE
+    for line in random.sample(range(lines * 10), lines):
+        top = line / (lines * 10)
+        ids = [f"{line}-{n}" for n in range(WORDS_PER_LINE)]
+        geometry = {
+            "BoundingBox": {"Top": top, "Left": 0.1, "Width": 0.8, "Height": 0.01},
+            "Polygon": [{"X": 0.1, "Y": top}] * 4,
+        }
+        blocks.append(
+            {
+                "BlockType": "LINE",
+                "Id": f"line-{line}",
+                "Geometry": geometry,
+                "Relationships": [{"Type": "CHILD", "Ids": ids}],
+            }
+        )
+        blocks += [
+            {
+                "BlockType": "WORD",
+                "Id": i,
+                "Text": "word",
+                "TextType": "PRINTED",
+                "Confidence": 99.0,
+                "Geometry": geometry,
+            }
+            for i in ids
+        ]
+    return {"DocumentMetadata": {"Pages": 1}, "Blocks": blocks}
+
+
+class LoadedExtractor(AWSExtractor):
+    def __get_extraction__(self):
+        with open(self.filename) as j:
+            return json.load(j)["Blocks"]
+
+
+class StreamedExtractor(AWSExtractor):
+    def __get_extraction__(self):
+        return JSONArrayStream(self.filename, "Blocks")
+
+
+def peak_memory(extractor_class, filename):
+    extractor = extractor_class(Page(document=Document(identifier="benchmark")))
+    extractor.filename = filename
+    with patch(
+        "biblios.services.extractors.bulk_create_with_history",
+        lambda objs, model: None,
+    ):
+        tracemalloc.start()
+        extractor.get_words()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak
+
+
+print(f"{'Words':>6} {'Loaded':>10} {'Streamed':>10}")
+with tempfile.TemporaryDirectory() as directory:
+    for size in SIZES:
+        filename = os.path.join(directory, f"{size}.json")
+        with open(filename, "w") as f:
+            json.dump(synthetic_response(size), f)
+
+        row = [f"{size:>6}"]
+        for extractor_class in (LoadedExtractor, StreamedExtractor):
+            row.append(f"{peak_memory(extractor_class, filename) / 2**20:8.1f}MB")
+        print(" ".join(row))
@@ -0,0 +1,121 @@
+# Time how AWSExtractor numbers lines and words as pages get denser, using synthetic Textract responses
+# of up to 10,000 words. The time per word should stay flat as the page grows.
+#
+# Run from the libriscan directory with:
+#
+# (bash) python manage.py shell < benchmarks/line_numbering.py
+#
+# For comparison it also times the list-based numbering AWSExtractor used to have, which grows with
+# the square of the number of words. Nothing is saved to the database.
+
+import gc
+import random
+import time
+
+from biblios.models import TextBlock
+from biblios.services.extractors import AWSExtractor
+
+WORDS_PER_LINE = 10
+SIZES = (1250, 2500, 5000, 10000)
+
+
+def synthetic_response(words):
+    """A Textract-style response with `words` words, in lines at random heights down the page."""
+    blocks = []
+    lines = words // WORDS_PER_LINE
+    for line in random.sample(range(lines * 10), lines):
+        top = line / (lines * 10)
+        ids = [f"{line}-{n}" for n in range(WORDS_PER_LINE)]
+        geometry = {
+            "BoundingBox": {"Top": top, "Left": 0.1, "Width": 0.8, "Height": 0.01},
+            "Polygon": [{"X": 0.1, "Y": top}] * 4,
+        }
+        blocks.append(
+            {
+                "BlockType": "LINE",
+                "Id": f"line-{line}",
+                "Geometry": geometry,
+                "Relationships": [{"Type": "CHILD", "Ids": ids}],
+            }
+        )
+        blocks += [
+            {
+                "BlockType": "WORD",
+                "Id": i,
+                "Text": "word",
+                "TextType": "PRINTED",
+                "Confidence": 99.0,
+                "Geometry": geometry,
+            }
+            for i in ids
+        ]
+    return blocks
+
+
+class ListNumberingExtractor(AWSExtractor):
+    """AWSExtractor's previous line and word numbering."""
+
+    def __process_lines__(self, lines):
+        relationships = {}
+        for block in lines:
+            top = block["Geometry"]["BoundingBox"]["Top"]
+            children = block["Relationships"][-1]
+            for child in children["Ids"]:
+                relationships[child] = (top, children["Ids"].index(child))
+        return relationships
+
+    def __generate_line_numbers__(self, lines):
+        numbers = []
+        for line in lines.values():
+            if line[0] not in numbers:
+                numbers.append(line[0])
+        numbers.sort()
+        return numbers
+
+    def __create_text_block__(self, word):
+        text_type = (
+            TextBlock.PRINTED if word["Text"] == "PRINTED" else TextBlock.HANDWRITING
+        )
+
+        position = self.lines[word["Id"]]
+
+        return TextBlock(
+            page=self.page,
+            text=word["Text"],
+            text_type=text_type,
+            line=self.line_numbers.index(position[0]),
+            number=position[1],
+            confidence=word["Confidence"],
+            geo_x_0=word["Geometry"]["Polygon"][0]["X"],
+            geo_y_0=word["Geometry"]["Polygon"][0]["Y"],
+            geo_x_1=word["Geometry"]["Polygon"][2]["X"],
+            geo_y_1=word["Geometry"]["Polygon"][2]["Y"],
+        )
+
+
+def number_words(extractor_class, response):
+    """The numbering part of get_words(), without saving anything."""
+    extractor = extractor_class(None)
+    words, lines, others = extractor.__filter__(response)
+    extractor.lines = extractor.__process_lines__(lines)
+    extractor.line_numbers = extractor.__generate_line_numbers__(extractor.lines)
+    return [extractor.__create_text_block__(w) for w in words]
+
+
+print(f"{'Words':>6} {'Dict ranks':>18} {'List searches':>18}")
+for size in SIZES:
+    response = synthetic_response(size)
+    row = [f"{size:>6}"]
+    results = []
+    for extractor_class in (AWSExtractor, ListNumberingExtractor):
+        # Keep garbage collection pauses out of the timings
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        blocks = number_words(extractor_class, response)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        results.append([(b.line, b.number) for b in blocks])
+        row.append(f"{elapsed * 1000:8.1f}ms ({elapsed / size * 1e6:4.1f}us/w)")
+    assert results[0] == results[1], "The numbering doesn't match"
+    print(" ".join(row))
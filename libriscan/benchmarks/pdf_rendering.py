@@ -0,0 +1,60 @@
+# Time rendering a PDF export of synthetic scanned pages, in order in one process compared to across a pool
+# of worker processes. With as many workers as cores, the time should fall close to in proportion.
+#
+# Run from the libriscan directory with:
+#
+# (bash) python manage.py shell < benchmarks/pdf_rendering.py
+#
+# The pages are noisy JPEGs the size of a 300dpi letter page, so decoding and embedding them costs about what
+# real scans do, each with a few hundred words of text. Nothing is read from or saved to the database.
+
+import io
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image
+
+from biblios.services.pdf_pages import render_pdf
+
+PAGES = 100
+WORDS_PER_PAGE = 300
+PAGE_SIZE = (2550, 3300)
+
+
+def synthetic_page(path):
+    """A page image of random grey speckles, with words in rows down the page."""
+    noise = os.urandom(PAGE_SIZE[0] * PAGE_SIZE[1] // 16)
+    Image.frombytes("L", (PAGE_SIZE[0] // 4, PAGE_SIZE[1] // 4), noise).resize(
+        PAGE_SIZE
+    ).save(path, quality=85)
+
+    words = []
+    for n in range(WORDS_PER_PAGE):
+        x0 = (n % 10) / 10 + 0.01
+        y0 = (n // 10) / (WORDS_PER_PAGE / 10) * 0.9 + 0.05
+        text = "".join(random.choices("abcdefghij", k=random.randint(2, 9)))
+        words.append((text, "cour", x0, y0, x0 + 0.08))
+    # No derived image path: this doesn't time the web profile, whose scaled down images are made once and kept
+    return path, words, None
+
+
+with tempfile.TemporaryDirectory() as directory:
+    # Every page gets its own image, as it would in a real document. PDFs only store repeated images once.
+    pages = [synthetic_page(f"{directory}/{n}.jpg") for n in range(PAGES)]
+
+    cores = os.cpu_count()
+    print(f"{PAGES} pages of {WORDS_PER_PAGE} words, on {cores} cores")
+    for profile in ("archival", "text"):
+        timings = {}
+        for workers in sorted({1, 2, 4, cores}):
+            output = io.BytesIO()
+            start = time.perf_counter()
+            render_pdf(pages, output, profile, workers)
+            timings[workers] = time.perf_counter() - start
+            speedup = timings[1] / timings[workers]
+            print(
+                f"{profile:>9} {workers:>2} workers: "
+                f"{timings[workers]:6.2f}s ({speedup:.1f}x), {len(output.getvalue()) / 1e6:.0f}MB"
+            )
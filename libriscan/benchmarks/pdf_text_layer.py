@@ -0,0 +1,72 @@
+# Time writing the text layer of a PDF export, in words per second: one insert_text() call for each word,
+# as exports used to, compared to one TextWriter for each page, as add_page() does now.
+#
+# Run from the libriscan directory with:
+#
+# (bash) python manage.py shell < benchmarks/pdf_text_layer.py
+#
+# The pages are blank, with the text profile, so only the text is timed. Nothing is read from or saved to the database.
+
+import io
+import random
+import tempfile
+import time
+
+from PIL import Image
+from pymupdf import Document as PdfDocument
+
+from biblios.services.pdf_pages import PROFILES, add_page
+
+PAGES = 20
+PAGE_SIZE = (2550, 3300)
+
+
+def synthetic_words(count):
+    """Words of random letters, in rows of ten down the page."""
+    rows = max(1, count // 10)
+    words = []
+    for n in range(count):
+        x0 = (n % 10) / 10 + 0.01
+        y0 = (n // 10) / rows * 0.9 + 0.05
+        text = "".join(random.choices("abcdefghij", k=random.randint(2, 9)))
+        words.append((text, "cour", x0, y0, x0 + 0.08))
+    return words
+
+
+def add_page_per_word(pdf, page, profile):
+    """How add_page() wrote the text before: one insert_text() call, and text object, for each word."""
+    image_path, words, _ = page
+    with Image.open(image_path) as image:
+        width, height = image.size
+    pdf.new_page(-1, width=width, height=height)
+    for text, font, x0, y0, x1 in words:
+        x0, y0, x1 = x0 * width, y0 * height, x1 * width
+        size = int(((x1 - x0) / len(text)) * 1.67)
+        pdf[-1].insert_text(
+            point=(x0, y0 + size), text=text, fontsize=size, fontname=font
+        )
+
+
+with tempfile.NamedTemporaryFile(suffix=".png") as image:
+    Image.new("L", PAGE_SIZE, 255).save(image.name)
+
+    print(f"{PAGES} pages at each size")
+    for words_per_page in (100, 300, 1000):
+        pages = [
+            (image.name, synthetic_words(words_per_page), None) for _ in range(PAGES)
+        ]
+        rates = {}
+        for name, add in (("insert_text", add_page_per_word), ("TextWriter", add_page)):
+            pdf = PdfDocument()
+            start = time.perf_counter()
+            for page in pages:
+                add(pdf, page, PROFILES["text"])
+            output = io.BytesIO()
+            pdf.save(output)
+            elapsed = time.perf_counter() - start
+            rates[name] = PAGES * words_per_page / elapsed
+            print(
+                f"{words_per_page:>5} words/page, {name:>11}: "
+                f"{rates[name]:8.0f} words/s, {len(output.getvalue()) / 1e3:.0f}KB"
+            )
+        print(f"{'':>17}speedup: {rates['TextWriter'] / rates['insert_text']:.1f}x")
@@ -0,0 +1,63 @@
+# Compare building a Textract client for every page against sharing one client per CloudService.
+# Requests go to a local stand-in for Textract, so no AWS account is needed.
+#
+# Run from the libriscan directory with:
+#
+# (bash) python manage.py shell < benchmarks/textract_clients.py
+#
+# The stand-in answers over plain HTTP, so this understates the saving: against the real endpoint,
+# every new client also pays for a TLS handshake.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from django.conf import settings
+from django.test import override_settings
+
+from biblios.models import CloudService
+from biblios.services.extractors import get_textract_client, invalidate_aws_clients
+from biblios.tests.textract_stub import TextractStub
+
+PAGES = 200
+LATENCY = 0.02
+
+service = CloudService(pk=0, organization_id=0, client_id="123", client_secret="098")
+
+
+def new_client(service):
+    # How AWSExtractor used to get its client
+    return boto3.client(
+        "textract",
+        region_name="us-east-1",
+        endpoint_url=settings.AWS_ENDPOINT_URLS.get("textract"),
+        aws_access_key_id=service.client_id,
+        aws_secret_access_key=service.client_secret,
+    )
+
+
+def run(get_client, workers):
+    def extract(_):
+        get_client(service).detect_document_text(Document={"Bytes": b"image"})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(extract, range(PAGES)))
+    return time.perf_counter() - start
+
+
+print(f"{PAGES} pages, {LATENCY * 1000:.0f}ms simulated Textract latency")
+for workers in (1, settings.HUEY_WORKERS):
+    for name, get_client in (
+        ("New client", new_client),
+        ("Shared client", get_textract_client),
+    ):
+        invalidate_aws_clients(service)
+        with TextractStub(latency=LATENCY) as stub, override_settings(
+            AWS_ENDPOINT_URLS={"textract": stub.url}
+        ):
+            elapsed = run(get_client, workers)
+        print(
+            f"{name:>14}, {workers} worker(s): {elapsed:6.2f}s "
+            f"({elapsed / PAGES * 1000:5.1f}ms/page, {stub.connections} connections)"
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from biblios.services.suggestion_cache import warm_suggestion_cache
+
+
+class Command(BaseCommand):
+    help = "Load the spelling suggestions already stored on TextBlocks into the shared suggestion cache."
+
+    def handle(self, *args, **options):
+        count = warm_suggestion_cache()
+        self.stdout.write(f"Cached suggestions for {count} words")
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:36
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cloudservice',
+            name='concurrency',
+            field=models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='historicalcloudservice',
+            name='concurrency',
+            field=models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0002_cloudservice_concurrency"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cloudservice",
+            name="bucket",
+            field=models.CharField(blank=True, max_length=63),
+        ),
+        migrations.AddField(
+            model_name="historicalcloudservice",
+            name="bucket",
+            field=models.CharField(blank=True, max_length=63),
+        ),
+        migrations.AlterField(
+            model_name="cloudservice",
+            name="service",
+            field=models.CharField(
+                choices=[
+                    ("T", "Test"),
+                    ("A", "Amazon Web Services"),
+                    ("J", "Amazon Web Services (document jobs)"),
+                ],
+                max_length=1,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="historicalcloudservice",
+            name="service",
+            field=models.CharField(
+                choices=[
+                    ("T", "Test"),
+                    ("A", "Amazon Web Services"),
+                    ("J", "Amazon Web Services (document jobs)"),
+                ],
+                max_length=1,
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def from_history(apps, schema_editor):
+    """Fill in the last edits from the history records the old save cascade left behind."""
+    for model, edits in (
+        ("Page", {"history_change_reason": "Edited word"}),
+        ("Document", {"history_user__isnull": False}),
+    ):
+        Model = apps.get_model("biblios", model)
+        latest = (
+            apps.get_model("biblios", f"Historical{model}")
+            .objects.filter(id=OuterRef("pk"), **edits)
+            .order_by("-history_date")
+        )
+        Model.objects.update(
+            last_edited=Subquery(latest.values("history_date")[:1]),
+            last_edited_by=Subquery(latest.values("history_user")[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0003_cloudservice_bucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="last_edited",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="last_edited_by",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="last_edited",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="last_edited_by",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(from_history, migrations.RunPython.noop),
+    ]
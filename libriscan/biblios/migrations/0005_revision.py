@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0004_last_edited"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:09
+
+import django.db.models.deletion
+import rules.contrib.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def from_history(apps, schema_editor):
+    """Find the last edited words in the words' history, the way the page view used to."""
+    Page = apps.get_model("biblios", "Page")
+    TextBlock = apps.get_model("biblios", "TextBlock")
+    LastEditedWord = apps.get_model("biblios", "LastEditedWord")
+
+    edits = (
+        apps.get_model("biblios", "HistoricalTextBlock")
+        .objects.filter(history_type="~", id__in=TextBlock.objects.values("id"))
+        .order_by("history_date")
+        .values_list("id", "page_id", "history_user_id", "history_date")
+    )
+    # Later edits replace earlier ones
+    pages = {}
+    users = {}
+    for word, page, user, date in edits.iterator():
+        pages[page] = word
+        if user is not None:
+            users[page, user] = (word, date)
+
+    for page, word in pages.items():
+        Page.objects.filter(pk=page).update(last_edited_word=word)
+    LastEditedWord.objects.bulk_create(
+        LastEditedWord(page_id=page, user_id=user, word_id=word, edited=date)
+        for (page, user), (word, date) in users.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0005_revision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="page",
+            name="last_edited_word",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="biblios.textblock",
+            ),
+        ),
+        migrations.CreateModel(
+            name="LastEditedWord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("edited", models.DateTimeField()),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="biblios.page",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "word",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="biblios.textblock",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("page", "user"), name="unique_last_edited_word"
+                    )
+                ],
+            },
+            bases=(models.Model, rules.contrib.models.RulesModelMixin),
+        ),
+        migrations.RunPython(from_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0006_last_edited_word"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(fields=["collection", "status"], name="doc_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="historicaltextblock",
+            index=models.Index(
+                fields=["history_user", "-history_date"], name="word_history_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="textblock",
+            index=models.Index(
+                fields=["page", "line", "number"], name="word_order_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="textblock",
+            index=models.Index(fields=["page", "print_control"], name="word_print_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="textblock",
+            index=models.Index(fields=["page", "review"], name="word_review_idx"),
+        ),
+    ]
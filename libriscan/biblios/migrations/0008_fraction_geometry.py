@@ -0,0 +1,98 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:13
+
+import biblios.models.base
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Round
+
+COORDINATES = ("geo_x_0", "geo_y_0", "geo_x_1", "geo_y_1")
+SCALE = biblios.models.base.FractionField.SCALE
+
+
+def to_millionths(apps, schema_editor):
+    """The altered columns still hold the old fractions, so scale them up to whole millionths."""
+    for model in ("TextBlock", "HistoricalTextBlock"):
+        apps.get_model("biblios", model).objects.update(
+            **{
+                c: Cast(Round(F(c) * Value(SCALE)), models.PositiveIntegerField())
+                for c in COORDINATES
+            }
+        )
+
+
+def to_fractions(apps, schema_editor):
+    for model in ("TextBlock", "HistoricalTextBlock"):
+        apps.get_model("biblios", model).objects.update(
+            **{
+                c: Cast(F(c), models.FloatField()) / Value(float(SCALE))
+                for c in COORDINATES
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0007_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="historicaltextblock",
+            name="geo_x_0",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="historicaltextblock",
+            name="geo_x_1",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="historicaltextblock",
+            name="geo_y_0",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="historicaltextblock",
+            name="geo_y_1",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textblock",
+            name="geo_x_0",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textblock",
+            name="geo_x_1",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textblock",
+            name="geo_y_0",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textblock",
+            name="geo_y_1",
+            field=biblios.models.base.FractionField(
+                validators=[django.core.validators.MaxValueValidator(1)]
+            ),
+        ),
+        migrations.RunPython(to_millionths, to_fractions),
+    ]
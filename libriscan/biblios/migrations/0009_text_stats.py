@@ -0,0 +1,121 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:33
+
+import django.db.models.deletion
+import rules.contrib.models
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, Q
+
+
+def count_words(apps, schema_editor):
+    """Count the words of every page and document there is so far."""
+    Page = apps.get_model("biblios", "Page")
+    PageStats = apps.get_model("biblios", "PageStats")
+    DocumentStats = apps.get_model("biblios", "DocumentStats")
+
+    counts = Page.objects.annotate(
+        total_words=Count("words"),
+        total_included=Count("words", filter=Q(words__print_control="I")),
+        total_flagged=Count("words", filter=Q(words__review=True)),
+        # TextBlock.CONF_MEDIUM
+        total_low_confidence=Count("words", filter=Q(words__confidence__lt=80)),
+        total_mean_confidence=Avg("words__confidence", output_field=FloatField()),
+    ).values_list(
+        "id",
+        "document_id",
+        "total_words",
+        "total_included",
+        "total_flagged",
+        "total_low_confidence",
+        "total_mean_confidence",
+    )
+
+    pages = []
+    documents = {}
+    for page, document, words, included, flagged, low, mean in counts.iterator():
+        pages.append(
+            PageStats(
+                page_id=page,
+                word_count=words,
+                included_count=included,
+                flagged_count=flagged,
+                low_confidence_count=low,
+                mean_confidence=mean,
+            )
+        )
+        totals = documents.setdefault(document, [0, 0, 0, 0, 0.0])
+        for n, value in enumerate((words, included, flagged, low, (mean or 0) * words)):
+            totals[n] += value
+    PageStats.objects.bulk_create(pages, batch_size=500)
+
+    stats = []
+    for document, (words, included, flagged, low, confidence) in documents.items():
+        stats.append(
+            DocumentStats(
+                document_id=document,
+                word_count=words,
+                included_count=included,
+                flagged_count=flagged,
+                low_confidence_count=low,
+                mean_confidence=confidence / words if words else None,
+            )
+        )
+    DocumentStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0008_fraction_geometry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentStats",
+            fields=[
+                ("word_count", models.PositiveIntegerField(default=0)),
+                ("included_count", models.PositiveIntegerField(default=0)),
+                ("flagged_count", models.PositiveIntegerField(default=0)),
+                ("low_confidence_count", models.PositiveIntegerField(default=0)),
+                ("mean_confidence", models.FloatField(blank=True, null=True)),
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="biblios.document",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+            bases=(models.Model, rules.contrib.models.RulesModelMixin),
+        ),
+        migrations.CreateModel(
+            name="PageStats",
+            fields=[
+                ("word_count", models.PositiveIntegerField(default=0)),
+                ("included_count", models.PositiveIntegerField(default=0)),
+                ("flagged_count", models.PositiveIntegerField(default=0)),
+                ("low_confidence_count", models.PositiveIntegerField(default=0)),
+                ("mean_confidence", models.FloatField(blank=True, null=True)),
+                (
+                    "page",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="biblios.page",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+            bases=(models.Model, rules.contrib.models.RulesModelMixin),
+        ),
+        migrations.RunPython(count_words, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0009_text_stats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cloudservice",
+            name="concurrency",
+            field=models.PositiveSmallIntegerField(
+                default=2, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="historicalcloudservice",
+            name="concurrency",
+            field=models.PositiveSmallIntegerField(
+                default=2, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+    ]
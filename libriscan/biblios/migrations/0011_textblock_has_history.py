@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:34
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def find_unrecorded_words(apps, schema_editor):
+    """Mark the words extracted so far with EXTRACTION_HISTORY_SUMMARY on, which have no history yet."""
+    TextBlock = apps.get_model("biblios", "TextBlock")
+    HistoricalTextBlock = apps.get_model("biblios", "HistoricalTextBlock")
+
+    TextBlock.objects.filter(
+        ~Exists(HistoricalTextBlock.objects.filter(id=OuterRef("pk")))
+    ).update(has_history=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biblios", "0010_cloudservice_concurrency_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="textblock",
+            name="has_history",
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(find_unrecorded_words, migrations.RunPython.noop),
+    ]
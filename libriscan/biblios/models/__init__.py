@@ -1,4 +1,12 @@
 __all__ = ["base", "documents", "organizations", "users"]
 from .users import User, UserRole
 from .organizations import Organization, CloudService, Collection, Series
-from .documents import Document, DublinCoreMetadata, Page, TextBlock
+from .documents import (
+    Document,
+    DocumentStats,
+    DublinCoreMetadata,
+    LastEditedWord,
+    Page,
+    PageStats,
+    TextBlock,
+)
@@ -1,10 +1,97 @@
 from rules.contrib.models import RulesModelMixin, RulesModelBase
 
 
+from django import forms
+from django.core import exceptions
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from simple_history.models import HistoricalRecords
 
 
 # Custom model in case there's a need for anything more than just the rules meta class
 class BibliosModel(models.Model, RulesModelMixin, metaclass=RulesModelBase):
     class Meta:
         abstract = True
+
+
+class IndexedHistoricalRecords(HistoricalRecords):
+    """HistoricalRecords, with `indexes` for the historical model's Meta."""
+
+    def __init__(self, *args, indexes=(), **kwargs):
+        self.indexes = list(indexes)
+        super().__init__(*args, **kwargs)
+
+    def get_meta_options(self, model):
+        meta = super().get_meta_options(model)
+        meta["indexes"] = list(meta.get("indexes", ())) + self.indexes
+        return meta
+
+
+class FractionField(models.PositiveIntegerField):
+    """
+    A fraction from 0 to 1, such as a position on a page, stored as a whole number of millionths.
+    It's a float in Python, which is far cheaper to load and do arithmetic with than a Decimal.
+    """
+
+    SCALE = 1_000_000
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else value / self.SCALE
+
+    def to_python(self, value):
+        if value is None or isinstance(value, float):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages["invalid"], code="invalid", params={"value": value}
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        return None if value is None else round(float(value) * self.SCALE)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(
+            self,
+            **{
+                "form_class": forms.FloatField,
+                "min_value": 0,
+                "max_value": 1,
+                **kwargs,
+            },
+        )
+
+
+def current_editor():
+    """The signed-in user behind the current request, the same one simple_history records changes against."""
+    request = getattr(HistoricalRecords.context, "request", None)
+    user = getattr(request, "user", None)
+    return user if user is not None and user.is_authenticated else None
+
+
+class EditedQuerySet(models.QuerySet):
+    """
+    For models that keep track of when something in them was last edited, and who by,
+    along with a revision number that goes up whenever their content changes.
+    """
+
+    def revise(self):
+        """Mark the records' content as changed, without counting it as an edit by anyone."""
+        return self.update(revision=F("revision") + 1)
+
+    def touch(self, user=None, **fields):
+        """
+        Mark the records as just edited, in a single UPDATE, along with any other `fields` given. This doesn't call
+        save(), so it doesn't write history records; the edit itself is what has the history.
+        """
+        # Outside a request there's no editor to record, so keep whoever edited them last
+        editor = user or current_editor()
+        if editor is not None:
+            fields["last_edited_by"] = editor
+        return self.update(
+            last_edited=timezone.now(), revision=F("revision") + 1, **fields
+        )
@@ -1,20 +1,81 @@
 import logging
 
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Prefetch,
+    Q,
+    Sum,
+    Value,
+    Window,
+)
+from django.db.models.functions import Coalesce, NullIf, RowNumber
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.functional import cached_property
 
 from simple_history.models import HistoricalRecords
-from simple_history.utils import update_change_reason
 
 from biblios.access_rules import is_org_editor, is_org_viewer
-from biblios.models.base import BibliosModel
+from biblios.models.base import (
+    BibliosModel,
+    EditedQuerySet,
+    FractionField,
+    IndexedHistoricalRecords,
+    current_editor,
+)
 from biblios.tasks import queue_extraction
 
 logger = logging.getLogger("django")
 
 
+class DocumentQuerySet(EditedQuerySet):
+    @transaction.atomic
+    def refresh_stats(self):
+        """
+        Bring the documents' DocumentStats up to date, summed from their pages' PageStats rather than their words.
+        Call it after their pages change; Page.objects.refresh_stats() already does for changes to words.
+        """
+        words = Sum("pages__stats__word_count")
+        totals = (
+            self.values("id")
+            .annotate(
+                total_words=Coalesce(words, 0),
+                total_included=Coalesce(Sum("pages__stats__included_count"), 0),
+                total_flagged=Coalesce(Sum("pages__stats__flagged_count"), 0),
+                total_low_confidence=Coalesce(
+                    Sum("pages__stats__low_confidence_count"), 0
+                ),
+                # Weighted by each page's words, so it's the mean of all of the document's words
+                total_mean_confidence=Sum(
+                    F("pages__stats__mean_confidence") * F("pages__stats__word_count"),
+                    output_field=FloatField(),
+                )
+                / NullIf(words, Value(0)),
+            )
+            .values_list(
+                "id",
+                "total_words",
+                "total_included",
+                "total_flagged",
+                "total_low_confidence",
+                "total_mean_confidence",
+            )
+        )
+        DocumentStats.objects.bulk_create(
+            [DocumentStats(document_id=row[0], **stats_fields(row)) for row in totals],
+            update_conflicts=True,
+            unique_fields=["document"],
+            update_fields=STATS_FIELDS,
+        )
+
+
 class Document(BibliosModel):
     NEW = "N"
     IN_PROGRESS = "I"
@@ -39,7 +100,25 @@ class Document(BibliosModel):
     identifier = models.SlugField(max_length=25)
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=NEW)
     published_url = models.URLField(blank=True)
-    history = HistoricalRecords()
+
+    # When anything in the document was last edited, and who by. Kept up to date with touch(),
+    # rather than saving the document for every change to its pages and words.
+    last_edited = models.DateTimeField(blank=True, null=True, editable=False)
+    last_edited_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    # Goes up every time the content changes, so anything built from it can tell when it's out of date
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    history = HistoricalRecords(
+        excluded_fields=["last_edited", "last_edited_by", "revision"]
+    )
+
+    objects = DocumentQuerySet.as_manager()
 
     # Spelling suggestion rules
     use_long_s_detection = models.BooleanField(default=True)
@@ -50,6 +129,10 @@ class Document(BibliosModel):
                 fields=["collection", "identifier"], name="unique_doc_per_org"
             )
         ]
+        indexes = [
+            # For finding the documents waiting on review
+            models.Index(fields=["collection", "status"], name="doc_status_idx"),
+        ]
         rules_permissions = {
             "add": is_org_editor,
             "view": is_org_viewer,
@@ -60,16 +143,35 @@ class Document(BibliosModel):
     @property
     def can_export(self):
         """Checks if the document has at least one page with extracted text."""
-        return TextBlock.objects.filter(
-            page__document=self, print_control=TextBlock.INCLUDE
-        ).exists()
+        return self.text_stats.included_count > 0
+
+    @property
+    def text_stats(self):
+        """
+        The document's DocumentStats: the ones it was loaded with, if it was loaded with them, or else the latest.
+        A document saved without them, such as one loaded from a fixture, has its words counted instead,
+        without saving the counts, so reading them never writes.
+        """
+        stats = Document.stats.related.get_cached_value(self, None)
+        stats = stats or DocumentStats.objects.filter(document=self).first()
+        if stats is None:
+            words = TextBlock.objects.filter(page__document=self)
+            stats = DocumentStats(document_id=self.pk, **word_stats(words))
+        return stats
 
     def __str__(self):
         return self.identifier
 
     def save(self, *args, **kwargs):
         """Save the document, and create its metadata record if necessary."""
+        if editor := current_editor():
+            self.last_edited = timezone.now()
+            self.last_edited_by = editor
+        adding = self._state.adding
         s = super(Document, self).save(*args, **kwargs)
+        if adding:
+            # A new document has no words, but its stats are there to be added to
+            DocumentStats.objects.create(document_id=self.pk)
         try:
             m = self.metadata
         except Document.metadata.RelatedObjectDoesNotExist:
@@ -85,33 +187,17 @@ class Document(BibliosModel):
         }
         return reverse("document", kwargs=keys)
 
-    def export_pdf(self, use_image=True):
-        """
-        Provide a full PDF version of the document.
-
-        use_image:
-            true: generate the PDF using page images
-            false: generate the PDF using just the extracted text
-        """
-        from biblios.services.exporters import export_pdf
-
-        return export_pdf(self, use_image)
-
-    def export_text(self):
-        """
-        Provide a text file version of the document.
-        """
-        from biblios.services.exporters import export_text
+    def generate_extraction(self):
+        """Extract text for every page that doesn't have it yet, spread across background workers."""
+        from biblios.services.extraction import start_document_extraction
 
-        return export_text(self)
+        return start_document_extraction(self)
 
-    def export_xml(self):
-        """
-        Provides an XML file of the document's metadata.
-        """
-        from biblios.services.exporters import export_metadata_dc
+    @property
+    def extraction_progress(self):
+        from biblios.services.extraction import document_extraction_progress
 
-        return export_metadata_dc(self)
+        return document_extraction_progress(self)
 
 
 # An implementation of Dublin Core metadata:
@@ -164,6 +250,159 @@ class DublinCoreMetadata(BibliosModel):
     def __str__(self):
         return f"{self.document} Metadata"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # The metadata is part of the document's exports, so they need making again
+        Document.objects.filter(pk=self.document_id).revise()
+
+
+class PageQuerySet(EditedQuerySet):
+    def touch(self, user=None, word=None):
+        """
+        Mark the pages as just edited. If the edit was to a `word`, it's recorded as the last one edited on the page,
+        and as the editor's last one on it too, so the page view can go straight back to it.
+        """
+        if word is None:
+            return super().touch(user)
+
+        user = user or current_editor()
+        updated = super().touch(user, last_edited_word=word)
+        if user is not None:
+            # One upsert, rather than looking the row up first
+            LastEditedWord.objects.bulk_create(
+                [
+                    LastEditedWord(
+                        page_id=word.page_id,
+                        user=user,
+                        word=word,
+                        edited=timezone.now(),
+                    )
+                ],
+                update_conflicts=True,
+                unique_fields=["page", "user"],
+                update_fields=["word", "edited"],
+            )
+        return updated
+
+    def with_words(self):
+        """
+        Pages with their included words, in reading order, as `printed_words`.
+        The words for all of the pages come from one query.
+        """
+        return self.prefetch_related(
+            Prefetch(
+                "words",
+                queryset=TextBlock.objects.filter(
+                    print_control=TextBlock.INCLUDE
+                ).order_by("line", "number"),
+                to_attr="printed_words",
+            )
+        )
+
+    def with_snippets(self):
+        """
+        Pages ready to be listed: with their stats, and just the words of their snippets as `snippet_words`,
+        for any number of pages in two queries.
+        """
+        return self.select_related("stats").prefetch_related(
+            Prefetch("words", queryset=snippet_words(), to_attr="snippet_words")
+        )
+
+    @transaction.atomic
+    def refresh_stats(self):
+        """
+        Count the pages' words again into their PageStats, and sum their documents' DocumentStats from those.
+        For whole pages of words at once, such as an extraction; add_to_stats() is for changes to a few.
+        The counts and the writes are one transaction, so another change to the words can't come between them.
+        """
+        documents = self.count_words()
+        Document.objects.filter(pk__in=documents).refresh_stats()
+
+    def add_to_stats(self, change):
+        """
+        Apply a stats_change() to the pages' PageStats and their documents' DocumentStats, without counting anything.
+        Run it in the same transaction as the words' changes, so the stats can't get out of step with them.
+        Pages and documents without stats rows, such as ones loaded from fixtures, are left for text_stats to count.
+        """
+        if not any(change.values()):
+            return
+
+        fields = {field: F(field) + change[field] for field in STATS_COUNTS}
+        # The mean is kept as one, so it's turned back into a total to add to
+        total = ExpressionWrapper(
+            Coalesce(F("mean_confidence"), 0.0) * F("word_count"),
+            output_field=FloatField(),
+        )
+        fields["mean_confidence"] = (total + change["confidence"]) / NullIf(
+            F("word_count") + change["word_count"], Value(0)
+        )
+        PageStats.objects.filter(page__in=self).update(**fields)
+        DocumentStats.objects.filter(document__pages__in=self).update(**fields)
+
+    @transaction.atomic
+    def count_words(self):
+        """Count up the pages' words into their PageStats, in one query for all of them. Returns their document IDs."""
+        counts = (
+            self.values("id", "document_id")
+            .annotate(
+                total_words=Count("words"),
+                total_included=Count(
+                    "words", filter=Q(words__print_control=TextBlock.INCLUDE)
+                ),
+                total_flagged=Count("words", filter=Q(words__review=True)),
+                total_low_confidence=Count(
+                    "words", filter=Q(words__confidence__lt=TextBlock.CONF_MEDIUM)
+                ),
+                total_mean_confidence=Avg(
+                    "words__confidence", output_field=FloatField()
+                ),
+            )
+            .values_list(
+                "id",
+                "total_words",
+                "total_included",
+                "total_flagged",
+                "total_low_confidence",
+                "total_mean_confidence",
+                "document_id",
+            )
+        )
+        documents = set()
+        stats = []
+        for row in counts:
+            stats.append(PageStats(page_id=row[0], **stats_fields(row)))
+            documents.add(row[-1])
+        PageStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=["page"],
+            update_fields=STATS_FIELDS,
+        )
+        return documents
+
+
+def snippet_words():
+    """
+    The included words that go in page snippets: the first and last half of Page.SNIPPET_LENGTH on each page.
+    The database picks them out, so a page's other words are never loaded. Each has `word_count`,
+    how many included words its page has.
+    """
+    half = Page.SNIPPET_LENGTH // 2
+    return (
+        TextBlock.objects.filter(print_control=TextBlock.INCLUDE)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("page"),
+                order_by=[F("line"), F("number")],
+            ),
+            word_count=Window(Count("*"), partition_by=F("page")),
+        )
+        .filter(Q(position__lte=half) | Q(position__gt=F("word_count") - half))
+        .order_by("line", "number")
+    )
+
 
 class Page(BibliosModel):
     # How many words should the page snippets be?
@@ -176,7 +415,38 @@ class Page(BibliosModel):
     image = models.ImageField(blank=True, upload_to="pages")
     # This should be a bit longer than the Document identifier, since it's likely to include that with a suffix
     identifier = models.CharField(max_length=30, blank=True, null=True)
-    history = HistoricalRecords()
+
+    # When the page's words were last edited, and who by. Kept up to date with touch().
+    last_edited = models.DateTimeField(blank=True, null=True, editable=False)
+    last_edited_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    # The word edited most recently, by anyone. LastEditedWord has each editor's own.
+    last_edited_word = models.ForeignKey(
+        "TextBlock",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    # Goes up every time the content changes, so anything built from it can tell when it's out of date
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    history = HistoricalRecords(
+        excluded_fields=[
+            "last_edited",
+            "last_edited_by",
+            "last_edited_word",
+            "revision",
+        ]
+    )
+
+    objects = PageQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -194,12 +464,31 @@ class Page(BibliosModel):
         return f"{self.document} page {self.number}"
 
     def save(self, *args, **kwargs):
-        # Propagate the save history up to the page
-        doc = self.document
-        doc.save()
-        update_change_reason(doc, "Edited page")
+        from biblios.services.exporters import remove_derived_images
 
+        adding = self._state.adding
         super().save(**kwargs)
+        if adding:
+            # A new page has no words, but its stats are there to be added to
+            PageStats.objects.create(page_id=self.pk)
+
+        # Mark the document as edited, without loading or saving it
+        Document.objects.filter(pk=self.document_id).touch()
+        # If the image has changed, the exports' scaled-down copies of the old one are no use
+        remove_derived_images(self)
+
+    def delete(self, *args, **kwargs):
+        from biblios.services.exporters import remove_derived_images
+
+        # Before the page loses its id. They can be made again if the delete fails.
+        remove_derived_images(self, keep_current=False)
+        deleted = super().delete(*args, **kwargs)
+
+        # The document has lost content, so its exports need making again,
+        # and the page's words no longer count towards its stats
+        Document.objects.filter(pk=self.document_id).touch()
+        Document.objects.filter(pk=self.document_id).refresh_stats()
+        return deleted
 
     def get_absolute_url(self):
         keys = {
@@ -210,6 +499,11 @@ class Page(BibliosModel):
         }
         return reverse("page", kwargs=keys)
 
+    @property
+    def text_etag(self):
+        """Identifies this version of the page's words, for conditional requests and caching."""
+        return f'"page-{self.id}-{self.revision}"'
+
     @property
     def can_extract(self):
         from biblios.models.organizations import CloudService
@@ -224,7 +518,20 @@ class Page(BibliosModel):
 
     @property
     def has_extraction(self):
-        return self.words.exists()
+        return self.text_stats.word_count > 0
+
+    @property
+    def text_stats(self):
+        """
+        The page's PageStats: the ones it was loaded with, as with_snippets() does, or else the latest.
+        A page saved without them, such as one loaded from a fixture, has its words counted instead,
+        without saving the counts, so reading them never writes.
+        """
+        stats = Page.stats.related.get_cached_value(self, None)
+        stats = stats or PageStats.objects.filter(page=self).first()
+        if stats is None:
+            stats = PageStats(page_id=self.pk, **word_stats(self.words.all()))
+        return stats
 
     @cached_property
     def extraction_key(self):
@@ -232,24 +539,22 @@ class Page(BibliosModel):
 
     @property
     def snippet(self):
-        # Pulling the text into a list at the start means this property will only introduce one additional DB query
-        words = list(self.words.filter(print_control=TextBlock.INCLUDE))
-        snippet = ""
+        # Pages loaded with_snippets() already have their words; otherwise it takes one query
+        words = getattr(self, "snippet_words", None)
+        if words is None:
+            words = list(snippet_words().filter(page=self))
+
         # We might not have any words yet
         if not words:
-            snippet = "(No extracted text)"
+            return "(No extracted text)"
         # Use the full text if it's short enough
-        elif len(words) <= self.SNIPPET_LENGTH:
-            print(len(words))
-            snippet = " ".join([w.text for w in words])
-        # Otherwise, construct our snippet
-        else:
-            snip = int(self.SNIPPET_LENGTH / 2)
-            first = " ".join([w.text for w in words[:snip]])
-            last = " ".join([w.text for w in words[-snip:]])
-
-            snippet = f"{first} ... {last}"
-        return snippet
+        if words[0].word_count <= self.SNIPPET_LENGTH:
+            return " ".join(w.text for w in words)
+        # Otherwise, it's the first and last words
+        half = self.SNIPPET_LENGTH // 2
+        first = " ".join(w.text for w in words[:half])
+        last = " ".join(w.text for w in words[half:])
+        return f"{first} ... {last}"
 
     # Hand off this work to the Huey background task
     def generate_extraction(self):
@@ -304,30 +609,25 @@ class TextBlock(BibliosModel):
     )
 
     # The bounding box is recorded as the top-left corner (X,Y 0) and bottom-right corner (X,Y 1)
-    # Textract returns values that are percentages of the page width, so these need to be decimals too
-    geo_x_0 = models.DecimalField(
-        max_digits=20,
-        decimal_places=20,
-        validators=[MinValueValidator(0), MaxValueValidator(1)],
-    )
-    geo_y_0 = models.DecimalField(
-        max_digits=20,
-        decimal_places=20,
-        validators=[MinValueValidator(0), MaxValueValidator(1)],
-    )
-    geo_x_1 = models.DecimalField(
-        max_digits=20,
-        decimal_places=20,
-        validators=[MinValueValidator(0), MaxValueValidator(1)],
-    )
-    geo_y_1 = models.DecimalField(
-        max_digits=20,
-        decimal_places=20,
-        validators=[MinValueValidator(0), MaxValueValidator(1)],
-    )
+    # Textract returns values that are fractions of the page's width and height, and these keep them to a millionth
+    geo_x_0 = FractionField(validators=[MaxValueValidator(1)])
+    geo_y_0 = FractionField(validators=[MaxValueValidator(1)])
+    geo_x_1 = FractionField(validators=[MaxValueValidator(1)])
+    geo_y_1 = FractionField(validators=[MaxValueValidator(1)])
 
     suggestions = models.JSONField(blank=True, default=dict)
-    history = HistoricalRecords()
+    # False for words extracted with EXTRACTION_HISTORY_SUMMARY on, until their creation record is written.
+    # It saves looking for their history every time a word is saved.
+    has_history = models.BooleanField(default=True, editable=False)
+    # For listing a user's recent edits, newest first
+    history = IndexedHistoricalRecords(
+        excluded_fields=["has_history"],
+        indexes=[
+            models.Index(
+                fields=["history_user", "-history_date"], name="word_history_user_idx"
+            )
+        ],
+    )
 
     class Meta:
         rules_permissions = {
@@ -337,6 +637,12 @@ class TextBlock(BibliosModel):
             "delete": is_org_editor,
         }
         ordering = ["line", "number"]
+        # A page's words are almost always read in order, or picked out by how they're printed or reviewed
+        indexes = [
+            models.Index(fields=["page", "line", "number"], name="word_order_idx"),
+            models.Index(fields=["page", "print_control"], name="word_print_idx"),
+            models.Index(fields=["page", "review"], name="word_review_idx"),
+        ]
 
     def __str__(self):
         return self.text
@@ -347,22 +653,107 @@ class TextBlock(BibliosModel):
 
         return generate_suggestions(self.text, self.page.document.use_long_s_detection)
 
+    def get_suggestions(self):
+        """
+        Spellcheck suggestions for the word, as a list of (suggestion, frequency) pairs.
+        Uses the stored suggestions if there are any, otherwise generates them through the suggestion cache.
+        """
+        # An empty dict is the model default, meaning suggestions were never stored for the word
+        if isinstance(self.suggestions, list):
+            return self.suggestions
+        return self.__get_suggestions__()
+
     def save(self, **kwargs):
-        """Generate spellcheck suggestions on save"""
+        """Generate spellcheck suggestions on save, if they're being stored"""
 
-        self.suggestions = self.__get_suggestions__()
+        # Otherwise clear them, so old suggestions don't outlive a change to the word's text
+        self.suggestions = (
+            self.__get_suggestions__() if settings.STORE_SUGGESTIONS else {}
+        )
         # In case the word text has been specified as an update_field, include the suggestions too
         if (
             update_fields := kwargs.get("update_fields")
         ) is not None and "text" in update_fields:
             kwargs["update_fields"] = {"suggestions"}.union(update_fields)
 
-        # Propagate the save history up to the page
-        page = self.page
-        page.save()
-        update_change_reason(page, "Edited word")
+        # Words extracted with EXTRACTION_HISTORY_SUMMARY on don't have a creation record yet
+        if self.pk and not self.has_history:
+            TextBlock.record_extraction([self])
+
+        # Only some of the fields are counted in the stats.
+        # The word is read as it was and saved in one transaction, so the difference is what gets added to them.
+        fields = kwargs.get("update_fields")
+        counted = fields is None or {
+            "review",
+            "print_control",
+            "confidence",
+        }.intersection(fields)
+        with transaction.atomic(savepoint=False):
+            before = []
+            if counted and self.pk:
+                before = list(
+                    TextBlock.objects.filter(pk=self.pk).only(
+                        "review", "print_control", "confidence"
+                    )
+                )
+            super().save(**kwargs)
+            if counted:
+                Page.objects.filter(pk=self.page_id).add_to_stats(
+                    stats_change(before, [self])
+                )
+
+        # The word's history records the edit, so its page and document only need marking as edited.
+        # That's an UPDATE each, without loading or saving them.
+        editor = current_editor()
+        Page.objects.filter(pk=self.page_id).touch(editor, word=self)
+        Document.objects.filter(pages=self.page_id).touch(editor)
+
+    @classmethod
+    def record_extraction(cls, words):
+        """
+        Write creation records for any of a page's words that don't have history yet, from their stored versions,
+        before they're first changed, so they can still be reverted to the extracted text.
+        """
+        ids = {w.pk for w in words if not w.has_history}
+        if not ids:
+            return
+        for word in words:
+            word.has_history = True
+        recorded = cls.history.filter(id__in=ids).values_list("id", flat=True)
+        missing = ids.difference(recorded)
+        cls.objects.filter(pk__in=ids).update(has_history=True)
+        if not missing:
+            return
+
+        originals = list(cls.objects.filter(pk__in=missing))
+        # Date them from the page's extraction summary, if there is one
+        extracted = (
+            Page.history.filter(
+                id=originals[0].page_id,
+                history_change_reason__startswith="Extracted",
+            )
+            .values_list("history_date", flat=True)
+            .first()
+            if originals
+            else None
+        )
+        cls.history.bulk_history_create(
+            originals, default_change_reason="Extracted", default_date=extracted
+        )
+
+    @property
+    def bbox(self):
+        """The word's bounding box as (x0, y0, x1, y1), in fractions of the page's width and height."""
+        return self.geo_x_0, self.geo_y_0, self.geo_x_1, self.geo_y_1
 
-        super().save(**kwargs)
+    def bbox_in(self, width, height):
+        """The word's bounding box scaled to a page `width` by `height`, such as the page image's size in pixels."""
+        return (
+            self.geo_x_0 * width,
+            self.geo_y_0 * height,
+            self.geo_x_1 * width,
+            self.geo_y_1 * height,
+        )
 
     @property
     def confidence_level(self):
@@ -378,16 +769,119 @@ class TextBlock(BibliosModel):
         else:
             return "none"
 
-    @property
-    def suggestions_json(self):
-        """Returns suggestions as a JSON string for template rendering"""
-        import json
 
-        if not self.suggestions:
-            return "[]"
-        try:
-            # Serialize directly - suggestions is either a list or dict
-            # Handled by the JavaScript parser
-            return json.dumps(self.suggestions)
-        except (TypeError, ValueError):
-            return "[]"
+class LastEditedWord(BibliosModel):
+    """
+    The word each user edited last on each page, kept up to date by Page.objects.touch().
+    It saves searching the words' history to find where someone left off.
+    """
+
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="+")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    word = models.ForeignKey(TextBlock, on_delete=models.CASCADE, related_name="+")
+    edited = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["page", "user"], name="unique_last_edited_word"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} last edited {self.word} on {self.page}"
+
+
+# The fields of PageStats and DocumentStats, in the order stats_fields() takes their values
+STATS_FIELDS = [
+    "word_count",
+    "included_count",
+    "flagged_count",
+    "low_confidence_count",
+    "mean_confidence",
+]
+
+
+# The ones that are counts, which add_to_stats() can add to as they are
+STATS_COUNTS = STATS_FIELDS[:-1]
+
+
+def stats_fields(row):
+    """The stats fields from a row of counts, which start after an ID."""
+    return dict(zip(STATS_FIELDS, row[1:]))
+
+
+def word_stats(words):
+    """The stats fields for a queryset of words, counted in one query."""
+    return words.aggregate(
+        word_count=Count("id"),
+        included_count=Count("id", filter=Q(print_control=TextBlock.INCLUDE)),
+        flagged_count=Count("id", filter=Q(review=True)),
+        low_confidence_count=Count(
+            "id", filter=Q(confidence__lt=TextBlock.CONF_MEDIUM)
+        ),
+        mean_confidence=Avg("confidence", output_field=FloatField()),
+    )
+
+
+def stats_change(before, after):
+    """
+    How the stats change when words go from `before` to `after`, for add_to_stats(): a difference in each count,
+    and in the total `confidence`. A new word has nothing before it, and a deleted one nothing after.
+    """
+    change = dict.fromkeys(STATS_COUNTS, 0)
+    change["confidence"] = 0.0
+    for words, sign in ((after, 1), (before, -1)):
+        for word in words:
+            change["word_count"] += sign
+            change["included_count"] += sign * (word.print_control == TextBlock.INCLUDE)
+            change["flagged_count"] += sign * bool(word.review)
+            change["low_confidence_count"] += sign * (
+                word.confidence < TextBlock.CONF_MEDIUM
+            )
+            change["confidence"] += sign * float(word.confidence)
+    return change
+
+
+class TextStats(BibliosModel):
+    """
+    Counts of words, kept up to date as they change so that pages and lists don't have to count them each time.
+    When they were last edited, and who by, is on the page or document itself.
+    """
+
+    word_count = models.PositiveIntegerField(default=0)
+    # Words that go in exports
+    included_count = models.PositiveIntegerField(default=0)
+    # Words flagged for review
+    flagged_count = models.PositiveIntegerField(default=0)
+    # Words with less than TextBlock.CONF_MEDIUM confidence
+    low_confidence_count = models.PositiveIntegerField(default=0)
+    # Empty until there are words
+    mean_confidence = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+
+class PageStats(TextStats):
+    """A page's word counts, kept up to date by Page.objects.add_to_stats() and refresh_stats()."""
+
+    page = models.OneToOneField(
+        Page, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+
+    def __str__(self):
+        return f"{self.page} stats"
+
+
+class DocumentStats(TextStats):
+    """A document's word counts, summed from its pages' by Document.objects.refresh_stats()."""
+
+    document = models.OneToOneField(
+        Document, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+
+    def __str__(self):
+        return f"{self.document} stats"
@@ -2,6 +2,7 @@ import logging
 
 import rules
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.urls import reverse
 from django.utils.functional import cached_property
@@ -62,17 +63,47 @@ class Organization(BibliosModel):
 class CloudService(models.Model):
     TEST = "T"
     AWS = "A"
-    SERVICE_CHOICES = {TEST: "Test", AWS: "Amazon Web Services"}
+    AWS_JOBS = "J"
+    SERVICE_CHOICES = {
+        TEST: "Test",
+        AWS: "Amazon Web Services",
+        AWS_JOBS: "Amazon Web Services (document jobs)",
+    }
 
     organization = models.OneToOneField(Organization, on_delete=models.CASCADE)
     service = models.CharField(max_length=1, choices=SERVICE_CHOICES)
     client_id = models.CharField(max_length=100)
     client_secret = models.CharField(max_length=100)
+    # Document jobs read their files from S3, so they need a bucket these credentials can write to
+    bucket = models.CharField(max_length=63, blank=True)
+    # How many pages this organization can have extracting at once when a whole document is queued.
+    # Each one holds a Huey worker for as long as its share of pages takes, so it's kept below HUEY_WORKERS.
+    concurrency = models.PositiveSmallIntegerField(
+        default=2, validators=[MinValueValidator(1)]
+    )
     history = HistoricalRecords()
 
     def __str__(self):
         return self.SERVICE_CHOICES[self.service]
 
+    def clean(self, *args, **kwargs):
+        if self.service == self.AWS_JOBS and not self.bucket:
+            raise ValidationError("Document jobs need an S3 bucket.")
+        super().clean(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Don't keep using a client built from the old settings
+        from biblios.services.extractors import invalidate_aws_clients
+
+        invalidate_aws_clients(self)
+
+    def delete(self, *args, **kwargs):
+        from biblios.services.extractors import invalidate_aws_clients
+
+        invalidate_aws_clients(self)
+        return super().delete(*args, **kwargs)
+
     @cached_property
     def extractor(self):
         from biblios.services.extractors import EXTRACTORS
@@ -1 +1 @@
-__all__ = ['extractors', 'suggestions', 'exporters']
\ No newline at end of file
+__all__ = ['extractors', 'extraction', 'suggestions', 'suggestion_cache', 'exporters', 'exports', 'pdf_pages', 'edits']
\ No newline at end of file
@@ -0,0 +1,170 @@
+import logging
+from copy import copy
+
+from django.conf import settings
+from django.db import transaction
+from simple_history.utils import bulk_update_with_history
+
+from biblios.models import Document, Page, TextBlock
+from biblios.models.documents import stats_change
+from biblios.models.base import current_editor
+
+logger = logging.getLogger("django")
+
+
+def clean_text(value):
+    text = value.strip() if isinstance(value, str) else ""
+    if not text:
+        raise ValueError("Text cannot be empty")
+    if len(text) > TextBlock._meta.get_field("text").max_length:
+        raise ValueError("Text is too long")
+    # Corrected text is accepted as right
+    return {"text": text, "confidence": TextBlock.CONF_ACCEPTED}
+
+
+def clean_print_control(value):
+    if value not in TextBlock.PRINT_CONTROL_CHOICES:
+        raise ValueError(
+            f"Invalid print_control value. Must be one of: {', '.join(TextBlock.PRINT_CONTROL_CHOICES)}"
+        )
+    return {"print_control": value}
+
+
+def clean_review(value):
+    # An explicit value rather than a toggle, so a queued edit means the same thing however late it arrives
+    if not isinstance(value, bool):
+        raise ValueError("Review must be true or false")
+    return {"review": value}
+
+
+# Each kind of edit, and how to turn its value into the fields it changes
+EDITS = {
+    "text": clean_text,
+    "print_control": clean_print_control,
+    "review": clean_review,
+}
+
+
+def merge_words(right_block):
+    """
+    Combine a word with the printable word before it on the same line, into a new third word.
+    Both of the originals are marked as merged. Returns the new word, and the left and right originals.
+
+    Raises ValueError if there isn't a printable word before it on the line.
+    """
+    # Find the printable words on this line before the selected one, and take the last as our merge target
+    # TextBlock orders by line+number so we can trust last() to return the correct one
+    left_block = TextBlock.objects.filter(
+        page=right_block.page_id,
+        line=right_block.line,
+        number__lt=right_block.number,
+        print_control=TextBlock.INCLUDE,
+    ).last()
+
+    if not left_block:
+        raise ValueError(
+            "The selected word must have another printable word before it on the same line"
+        )
+
+    new_block = TextBlock()
+
+    # Concatenate the blocks' text with no space
+    new_block.text = f"{left_block.text}{right_block.text}"
+
+    # Use block 1's info except where we need block 2's
+    new_block.text_type = left_block.text_type
+    new_block.page = left_block.page
+    new_block.line = left_block.line
+    new_block.number = left_block.number
+    new_block.confidence = TextBlock.CONF_ACCEPTED
+    # Don't assume block_1 is the first.
+    # Take the smallest (x,y)0 and the largest (x,y)1 to get the full boundary corners
+    new_block.geo_x_0 = min(left_block.geo_x_0, right_block.geo_x_0)
+    new_block.geo_y_0 = min(left_block.geo_y_0, right_block.geo_y_0)
+    new_block.geo_x_1 = max(left_block.geo_x_1, right_block.geo_x_1)
+    new_block.geo_y_1 = max(left_block.geo_y_1, right_block.geo_y_1)
+
+    with transaction.atomic():
+        left_block.print_control = TextBlock.MERGE
+        left_block.save()
+
+        right_block.print_control = TextBlock.MERGE
+        right_block.save()
+
+        new_block.save()
+
+    return new_block, left_block, right_block
+
+
+def apply_word_edits(page, operations, user=None):
+    """
+    Apply a batch of edits to a page's words, in one transaction, or none of them if any edit is invalid.
+
+    Each operation is a dict with a word `id` and an `op`: "text", "print_control" or "review" with the new `value`,
+    or "merge" to merge the word with the printable word before it. A later edit to the same field of a word
+    replaces an earlier one. Merges are applied after the other edits, in the order they were given.
+
+    The edited words are saved with a single bulk update, and their history with a single insert.
+    Returns the edited words, and the (new, left, right) words of each merge.
+    Raises ValueError if an operation is invalid, or names a word that isn't on the page.
+    """
+    changes = {}
+    merges = []
+    for operation in operations:
+        try:
+            word_id = int(operation["id"])
+            op = operation["op"]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid operation: {operation}")
+
+        if op == "merge":
+            merges.append(word_id)
+        elif op in EDITS:
+            changes.setdefault(word_id, {}).update(EDITS[op](operation.get("value")))
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+
+    user = user or current_editor()
+    with transaction.atomic():
+        words = page.words.in_bulk(set(changes).union(merges))
+        if missing := set(changes).union(merges).difference(words):
+            raise ValueError(f"Words not found on this page: {sorted(missing)}")
+
+        # As the words were, to work out how the page's stats change
+        before = [copy(words[word_id]) for word_id in changes]
+        fields = set()
+        for word_id, values in changes.items():
+            word = words[word_id]
+            # Save looking the page up again for every word's suggestions
+            word.page = page
+            for field, value in values.items():
+                setattr(word, field, value)
+            if "text" in values:
+                word.suggestions = (
+                    word.__get_suggestions__() if settings.STORE_SUGGESTIONS else {}
+                )
+                fields.add("suggestions")
+            fields.update(values)
+
+        edited = [words[word_id] for word_id in changes]
+        if edited:
+            # Words extracted with EXTRACTION_HISTORY_SUMMARY on don't have a creation record yet
+            TextBlock.record_extraction(edited)
+            bulk_update_with_history(
+                edited, TextBlock, sorted(fields), default_user=user
+            )
+            Page.objects.filter(pk=page.pk).touch(user, word=edited[-1])
+            Document.objects.filter(pk=page.document_id).touch(user)
+            Page.objects.filter(pk=page.pk).add_to_stats(stats_change(before, edited))
+
+        merged = []
+        for word_id in merges:
+            new, left, right = merge_words(words[word_id])
+            # The left word was loaded fresh by the merge, so return that version if it was edited too
+            words[left.id] = left
+            merged.append((new, left, right))
+
+    logger.info(
+        f"Applied {len(operations)} word edits to page {page.id}: {len(edited)} words edited, {len(merged)} merged"
+    )
+    return [words[word_id] for word_id in changes], merged
@@ -1,124 +1,137 @@
-import io
+import hashlib
 import logging
-from decimal import Decimal
-from pymupdf import Document as PdfDocument, Point
+import shutil
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
 
-from django.http import FileResponse, HttpResponseBadRequest
+from django.conf import settings
 
-from biblios.models import Document, TextBlock
+from biblios.models import TextBlock
+from biblios.services.pdf_pages import PROFILES, render_pdf
 
 logger = logging.getLogger(__name__)
 
+# How many words the text export fetches from the database at a time
+TEXT_EXPORT_CHUNK_SIZE = 2000
 
-def export_text(doc):
+
+def write_text(doc, output, chunk_size=TEXT_EXPORT_CHUNK_SIZE):
+    """Write the document's text to the `output` file object, a page at a time."""
+    for text in document_text(doc, chunk_size):
+        output.write(text.encode("utf-8"))
+
+
+def document_text(doc, chunk_size=TEXT_EXPORT_CHUNK_SIZE):
     """
-    Returns a text file of this document.
+    Generate the text of a document, a page at a time, with a line of text for each line of words.
+    The words for every page come from a single ordered query, so only one page is ever held in memory.
     """
-    logger.info(f"Generating a text file of {doc}")
-    if not isinstance(doc, Document):
-        logger.error(f"export_text() called with object of {type(doc)} type.")
-        return HttpResponseBadRequest("Invalid document")
-
-    # Lines will be tracked by comparing each word's horizontal position on the page to the previous.
-    # If a word is suddenly to the left of the previous one's right-most corner, it's a new line.
-    # Don't use vertical position though -- too many false positives from variation in the exact Y positions
-    lines = []
-    words = []
-    current_line = 0
-
-    # Create a buffer that can be returned as a file download
-    output = io.BytesIO()
-
-    for page in doc.pages.all():
-        for word in page.words.filter(print_control=TextBlock.INCLUDE):
-            # Compare the word's line number to the last one, and start a new line if appropriate
-            if word.line > current_line:
-                lines.append(f"{' '.join(words)}\n")
-                words = []
-
-            current_line = word.line
-            words.append(word.text)
-        lines.append(f"{' '.join(words)}\n")
-        words = []
+    words = (
+        TextBlock.objects.filter(page__document=doc, print_control=TextBlock.INCLUDE)
+        .order_by("page__number", "line", "number")
+        .values_list("page_id", "line", "text")
+        .iterator(chunk_size=chunk_size)
+    )
+    pages = groupby(words, key=itemgetter(0))
+    next_page = next(pages, None)
 
-    # Write the text to the buffer and send it as a file response
-    output.write(bytes("".join(lines), "utf-8"))
-    output.seek(0)
-    return FileResponse(output, as_attachment=True, filename=f"{doc.identifier}.txt")
+    for page_id in doc.pages.values_list("id", flat=True):
+        if next_page is None or next_page[0] != page_id:
+            # A page with no text still gets its own line
+            yield "\n"
+            continue
 
+        lines = groupby(next_page[1], key=itemgetter(1))
+        yield "".join(f"{' '.join(w[2] for w in line)}\n" for _, line in lines)
+        next_page = next(pages, None)
 
-def export_pdf(doc, use_image=True):
-    """
-    Returns a PDF version of this document with the images and text of all its pages.
 
-    doc: a Document object
-    use_image: whether to generate the PDF with the doc's page images or just render the text
+def write_pdf(doc, output, profile="archival", workers=None):
     """
-    logger.info(f"Generating a PDF of {doc}")
-    if not isinstance(doc, Document):
-        logger.error(f"export_pdf() called with object of {type(doc)} type.")
-        return HttpResponseBadRequest("Invalid document")
+    Write a PDF of the document to the `output` file object.
 
-    new_pdf = PdfDocument()
+    profile: which of pdf_pages.PROFILES to use, for the page images
+    workers: how many processes to render the pages across, settings.EXPORT_WORKERS by default
+    """
+    render_pdf(
+        pdf_pages(doc, profile),
+        output,
+        profile,
+        settings.EXPORT_WORKERS if workers is None else workers,
+    )
 
-    # use PDF render mode 3 ("not rendered") if we're generating a PDF from the page images
-    # https://pymupdf.readthedocs.io/en/latest/shape.html
-    render_mode = 3 if use_image else 0
 
-    for page in doc.pages.order_by("number"):
-        # skip pages that don't have an image yet (even if we're not printing them)
+def pdf_pages(doc, profile="archival"):
+    """
+    The document's pages as pdf_pages renders them: each image's path, its printable words,
+    and where to keep its image scaled down for the profile. The words for every page come from a single query.
+    """
+    pages = []
+    for page in doc.pages.order_by("number").with_words():
+        # Skip pages that don't have an image yet, since that's what sets the page size
         if not page.image:
-            pass
-        height = page.image.height
-        width = page.image.width
-
-        new_pdf.new_page(-1, width=width, height=height)
-        if use_image:
-            new_pdf[-1].insert_image(
-                rect=(0, 0, width, height), filename=page.image.path
-            )
-
-        for word in page.words.filter(print_control=TextBlock.INCLUDE):
-            # TextBlock coordinates are percentages of page size, so convert them to real pixels
-            # x0, y0 is top left, x1, y1 is bottom right.
-            x0 = word.geo_x_0 * width
-            y0 = word.geo_y_0 * height
-            x1 = word.geo_x_1 * width
-            # y1 = word.geo_y_1 * height //unused
-
-            # Use a font size that will fill the height of the text block.
-            # Courier characters are about 0.6x as wide as they are tall, so divide the width of the word in pts by
-            # the number of characters in it and multiple by 1.67 to get the font size
-            size = int(((x1 - x0) / len(word.text)) * Decimal(1.67))
-
-            # Text will be placed relative to the bottom-left point of its geometry.
-            # Don't use y1 for this -- y1 is too low when there are descenders like g or q.
-            # Instead, use the font size as an offset to y0.
-            point = Point(x0, y0 + size)
+            continue
 
+        words = []
+        for word in page.printed_words:
             # Courier font so we can calculate size more easily, italicized if it's handwriting.
             # Font choices are shown here: https://pymupdf.readthedocs.io/en/latest/recipes-text.html
             # Hopefully they don't change these strings
-            font = "coit" if word.text_type is TextBlock.HANDWRITING else "cour"
-
-            # Add the word to the page
-            new_pdf[-1].insert_text(
-                point=point,
-                text=word.text,
-                fontsize=size,
-                fontname=font,
-                render_mode=render_mode,
-            )
-
-    # Save the new PDF to a buffer that can be returned as a file download
-    output = io.BytesIO()
-    new_pdf.save(output)
-    output.seek(0)
-    return FileResponse(output, as_attachment=True, filename=f"{doc.identifier}.pdf")
-
-
-def export_metadata_dc(document):
-    """Exports an XML file with the document's Dublin Core metadata"""
+            font = "coit" if word.text_type == TextBlock.HANDWRITING else "cour"
+            words.append((word.text, font, word.geo_x_0, word.geo_y_0, word.geo_x_1))
+        derived = derived_image_path(page, profile)
+        if derived:
+            # A new copy replaces any of an earlier image or profile settings
+            remove_derived_images(page)
+        pages.append((page.image.path, words, derived))
+    return pages
+
+
+def derived_image_path(page, profile):
+    """
+    Where the page's image is kept once it's been scaled down for an export profile, or None if the profile
+    uses the image as it is. The name changes along with the image and the profile's settings, so a copy is
+    made once and reused by every export after.
+    """
+    options = PROFILES[profile]
+    if not options.get("format"):
+        return None
+
+    image = hashlib.sha1(page.image.name.encode()).hexdigest()[:16]
+    extension = "jp2" if options["format"] == "JPEG2000" else "jpg"
+    name = f"{image}-{options['dpi']}dpi-{options['quality']}q.{extension}"
+    return str(derived_image_dir(page) / name)
+
+
+def derived_image_dir(page):
+    """Where the page's scaled-down images are kept."""
+    return Path(settings.MEDIA_ROOT) / "derived" / str(page.id)
+
+
+def remove_derived_images(page, keep_current=True):
+    """
+    Remove the page's scaled-down images that no export will use again: copies of an earlier image,
+    or made with profile settings that have since changed. Unless `keep_current`, they all go, directory and all.
+    """
+    directory = derived_image_dir(page)
+    if not keep_current:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+    if not directory.is_dir():
+        return
+
+    current = set()
+    if page.image:
+        current = {derived_image_path(page, profile) for profile in PROFILES}
+    for path in directory.iterdir():
+        # Names starting with a dot are copies still being written
+        if str(path) not in current and not path.name.startswith("."):
+            path.unlink(missing_ok=True)
+
+
+def write_metadata_dc(document, output):
+    """Write the document's Dublin Core metadata as XML to the `output` file object."""
     import xml.etree.ElementTree as ET
 
     # This format is largely based on the output of https://nsteffel.github.io/dublin_core_generator/generator_nq.html
@@ -145,10 +158,4 @@ def export_metadata_dc(document):
     # Wrap the root in a tree -- seems like we need to do this here rather than the start
     tree = ET.ElementTree(root)
 
-    # Write the tree into a file buffer to return as the response
-    output = io.BytesIO()
     tree.write(output, xml_declaration=True, encoding="utf-8")
-    output.seek(0)
-    return FileResponse(
-        output, as_attachment=True, filename=f"{document.identifier}.xml"
-    )
@@ -0,0 +1,177 @@
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+
+from huey.contrib.djhuey import HUEY as huey
+from huey.exceptions import TaskLockedException
+
+from biblios.models import Document
+from biblios.services.exporters import write_metadata_dc, write_pdf, write_text
+
+logger = logging.getLogger("django")
+
+# Each kind of export: its file extension, and how to write it
+EXPORTS = {
+    "pdf": ("pdf", lambda document, output: write_pdf(document, output, "archival")),
+    "webpdf": ("pdf", lambda document, output: write_pdf(document, output, "web")),
+    "textpdf": ("pdf", lambda document, output: write_pdf(document, output, "text")),
+    "text": ("txt", write_text),
+    "xml": ("xml", write_metadata_dc),
+}
+
+# Export state older than this is assumed to belong to a job whose worker died
+EXPORT_TIMEOUT = timedelta(hours=1)
+
+# How long to wait for another request or job to finish replacing an export's state
+STATE_LOCK_TIMEOUT = 5
+
+
+def export_key(document, kind):
+    """The Huey store key for a document's export job."""
+    return f"export-{document.id}-{kind}"
+
+
+def export_path(document, kind):
+    """
+    Where the export of the document's current revision is kept, under MEDIA_ROOT.
+    Any change to the document moves it on to a new revision, and so a new file.
+    """
+    extension = EXPORTS[kind][0]
+    return (
+        Path(settings.MEDIA_ROOT)
+        / "exports"
+        / str(document.id)
+        / f"{kind}-{document.revision}.{extension}"
+    )
+
+
+def export_filename(document, kind):
+    """The name to download an export as."""
+    return f"{document.identifier}.{EXPORTS[kind][0]}"
+
+
+def export_progress(document, kind):
+    """
+    Summarize the export of the document's current revision: whether it's ready, and if it failed, why.
+    Returns None if one hasn't been started.
+    """
+    if export_path(document, kind).exists():
+        return {"kind": kind, "ready": True, "error": None}
+
+    state = huey.get(export_key(document, kind), peek=True)
+    if state is None or state["revision"] != document.revision:
+        return None
+    return {
+        "kind": kind,
+        "ready": False,
+        "started": state["started"],
+        "error": state.get("error"),
+    }
+
+
+def export_revision(path):
+    """The document revision an export file is of, from its name."""
+    return int(path.stem.rsplit("-", 1)[1])
+
+
+def replace_export_state(key, state, revision=None):
+    """
+    Replace the export state under `key` with `state`, or clear it if `state` is None.
+    Given the `revision` a job exported, it's left alone if it belongs to a newer revision's job,
+    so an older job that finishes late doesn't clear or overwrite it.
+    Returns whether the state was replaced.
+    """
+    # Checking and replacing the state has to be done as one, against jobs in other threads and processes
+    deadline = time.monotonic() + STATE_LOCK_TIMEOUT
+    while True:
+        try:
+            with huey.lock_task(f"{key}-state"):
+                current = huey.get(key, peek=True)
+                if revision is not None and current and current["revision"] > revision:
+                    return False
+                if state is None:
+                    huey.get(key)
+                else:
+                    huey.put(key, state)
+                return True
+        except TaskLockedException:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def start_export(document, kind):
+    """
+    Queue an export of the document, unless one of its current revision is ready or already being made.
+    Returns the export progress.
+    """
+    key = export_key(document, kind)
+    try:
+        # One request at a time checks and replaces the state, so two can't both find it missing and queue a job
+        with huey.lock_task(key):
+            progress = export_progress(document, kind)
+            if progress and not progress["error"]:
+                return progress
+
+            # Replace a failed export, or one of an earlier revision
+            replace_export_state(
+                key, {"started": datetime.today(), "revision": document.revision}
+            )
+            from biblios.tasks import queue_export
+
+            queue_export(document.id, kind)
+            logger.info(f"Queued {kind} export of document {document.id}")
+    except TaskLockedException:
+        # Another request is starting it
+        pass
+    return export_progress(document, kind)
+
+
+def write_export(document_id, kind):
+    """
+    Write the document's export to its file under MEDIA_ROOT, and remove the ones of earlier revisions.
+    A job that finishes after one of a newer revision leaves that one's file and state alone.
+    Run this through tasks.queue_export().
+    """
+    document = Document.objects.select_related("collection__owner").get(id=document_id)
+    key = export_key(document, kind)
+    # Read before the content is, so an edit made during the export means it's done again
+    path = export_path(document, kind)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first, so a download never gets a partly written one.
+    # Its name is unique, since more than one worker thread can be exporting at once.
+    temp = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as output:
+            temp = Path(output.name)
+            EXPORTS[kind][1](document, output)
+        os.replace(temp, path)
+    except Exception as e:
+        logger.error(f"Couldn't export document {document_id} as {kind}: {e}")
+        if temp:
+            temp.unlink(missing_ok=True)
+        replace_export_state(
+            key,
+            {
+                "started": datetime.today(),
+                "revision": document.revision,
+                "error": str(e),
+            },
+            document.revision,
+        )
+        return None
+
+    for old in path.parent.glob(f"{kind}-*"):
+        if export_revision(old) < document.revision:
+            old.unlink(missing_ok=True)
+    replace_export_state(key, None, document.revision)
+    logger.info(f"Exported document {document_id} as {kind} to {path}")
+    return path
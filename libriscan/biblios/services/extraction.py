@@ -0,0 +1,285 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from huey.contrib.djhuey import HUEY as huey
+from huey.exceptions import TaskLockedException
+
+from biblios.models import CloudService, Page, TextBlock
+
+logger = logging.getLogger("django")
+
+# Document extraction state older than this is assumed to belong to a run whose workers died
+DOCUMENT_EXTRACTION_TIMEOUT = timedelta(days=1)
+
+# How often, in seconds, an extraction event stream checks on its page,
+# and how long it stays open before the browser has to reconnect
+EXTRACTION_EVENTS_INTERVAL = 1
+EXTRACTION_EVENTS_TIMEOUT = 55
+
+
+def document_extraction_key(document):
+    """The Huey store key for a document's whole-document extraction state."""
+    return f"document-extraction-{document.id}"
+
+
+def lane_key(key, lane):
+    return f"{key}-lane-{lane}"
+
+
+def extraction_lanes(concurrency):
+    """
+    How many lanes an organization can have extracting at once: its concurrency setting,
+    but always at least one Huey worker short, since each lane holds a worker until its pages are done.
+    That leaves a worker for single pages, suggestions, exports and the periodic tasks.
+    """
+    return max(1, min(concurrency, settings.HUEY_WORKERS - 1))
+
+
+def start_document_extraction(document):
+    """
+    Queue every page of a document that doesn't have text yet.
+
+    The pages are dealt out round-robin into lanes, up to extraction_lanes() of them,
+    and each lane is a Huey task that extracts its pages one after another. Dealing them out this way
+    means the first pages of the document are ready first.
+
+    Returns the extraction progress, or None if there was nothing to extract.
+    """
+    key = document_extraction_key(document)
+
+    # Don't start a second run while one is still going
+    progress = document_extraction_progress(document)
+    if progress and not progress["finished"]:
+        logger.info(f"Extraction already in progress for document {document.id}")
+        return progress
+
+    service = CloudService.objects.filter(
+        organization=document.collection.owner
+    ).first()
+    if service is None:
+        return None
+
+    pages = list(
+        document.pages.filter(
+            ~Exists(TextBlock.objects.filter(page=OuterRef("pk")))
+        ).values_list("id", flat=True)
+    )
+    if not pages:
+        return None
+
+    lanes = min(extraction_lanes(service.concurrency), len(pages))
+    for lane in range(lanes):
+        huey.put(lane_key(key, lane), {"processed": 0, "failed": 0})
+    huey.put(key, {"started": datetime.today(), "pages": pages, "lanes": lanes})
+
+    from biblios.tasks import queue_extraction_lane
+
+    for lane in range(lanes):
+        queue_extraction_lane(
+            service.organization_id, lane, pages[lane::lanes], lane_key(key, lane)
+        )
+
+    logger.info(
+        f"Queued {len(pages)} pages of document {document.id} across {lanes} lanes"
+    )
+    return document_extraction_progress(document)
+
+
+def extraction_slot_key(org_id, number):
+    # These share the page handles' prefix, so tasks.check_timeouts() frees a slot whose worker has died
+    return f"extracting-slot-{org_id}-{number}"
+
+
+def claim_extraction_slot(org_id):
+    """
+    Take whichever of the organization's extraction slots is free, and return its key,
+    or None if they're all busy. There's one slot for each lane it can have extracting at once.
+    """
+    concurrency = (
+        CloudService.objects.filter(organization_id=org_id)
+        .values_list("concurrency", flat=True)
+        .first()
+        or 1
+    )
+    for number in range(extraction_lanes(concurrency)):
+        slot = extraction_slot_key(org_id, number)
+        if huey.put_if_empty(slot, datetime.today()):
+            return slot
+    return None
+
+
+def extract_lane(org_id, lane, page_ids, progress_key, last_try=False):
+    """
+    Extract one lane's pages while holding one of the organization's extraction slots.
+    Only one lane can hold each slot, which is what limits how many pages an organization extracts at once.
+    Raises TaskLockedException if every slot is busy, so the Huey task retries later,
+    unless it's the `last_try`. Then, as when the lane stops on an error, its pages are counted as failed.
+    Run this through tasks.queue_extraction_lane().
+    """
+    slot = claim_extraction_slot(org_id)
+    if slot is None:
+        if last_try:
+            logger.error(f"Extraction lane {progress_key} never got a slot")
+            return fail_lane(page_ids, progress_key)
+        raise TaskLockedException(
+            f"Every extraction slot for organization {org_id} is busy"
+        )
+
+    try:
+        return extract_pages(page_ids, progress_key, slot)
+    except Exception as e:
+        logger.error(f"Extraction lane {progress_key} stopped: {e}")
+        return fail_lane(page_ids, progress_key)
+    finally:
+        huey.get(slot)
+
+
+def fail_lane(page_ids, progress_key):
+    """Count the lane's pages that it didn't get to as failed, so the document's extraction can finish."""
+    progress = huey.get(progress_key, peek=True) or {"processed": 0, "failed": 0}
+    progress = {
+        "processed": len(page_ids),
+        "failed": progress["failed"] + len(page_ids) - progress["processed"],
+    }
+    huey.put(progress_key, progress)
+    return progress
+
+
+def extract_pages(page_ids, progress_key, slot=None):
+    """Extract text for each of the pages, recording progress under `progress_key`."""
+    from biblios.tasks import queue_suggestions
+
+    progress = {"processed": 0, "failed": 0}
+    pages = list(
+        Page.objects.filter(id__in=page_ids).select_related(
+            "document__collection__owner__cloudservice"
+        )
+    )
+    if not pages:
+        return progress
+
+    def keep_alive(pending=()):
+        # Keep the slot's and pages' timestamps fresh so they aren't mistaken for abandoned ones
+        for key in ([slot] if slot else []) + [p.extraction_key for p in pending]:
+            huey.put(key, datetime.today())
+
+    def finish(page, result=None):
+        if isinstance(result, Exception):
+            logger.error(f"Couldn't extract page {page.id}: {result}")
+            progress["failed"] += 1
+        elif settings.STORE_SUGGESTIONS:
+            queue_suggestions(page.id)
+        huey.get(page.extraction_key)
+
+        progress["processed"] += 1
+        huey.put(progress_key, progress)
+
+    # Skip pages that have been extracted, or started extracting on their own, since the document was queued.
+    # Holding the page's extraction handle also lets the page view show that it's being worked on.
+    def claim(page):
+        if page.can_extract and huey.put_if_empty(
+            page.extraction_key, datetime.today()
+        ):
+            return True
+        progress["processed"] += 1
+        huey.put(progress_key, progress)
+        return False
+
+    extractor = pages[0].document.collection.owner.cloudservice.extractor
+    if hasattr(extractor, "extract_pages"):
+        # The extractor can take all of the pages at once
+        claimed = [page for page in pages if claim(page)]
+        pending = set(claimed)
+
+        def on_page(page, result):
+            pending.discard(page)
+            finish(page, result)
+
+        try:
+            if claimed:
+                extractor.extract_pages(
+                    claimed, on_page=on_page, on_wait=lambda: keep_alive(pending)
+                )
+        except Exception as e:
+            logger.error(f"Extraction job stopped: {e}")
+        # Anything the extractor didn't get to has failed
+        for page in [p for p in claimed if p in pending]:
+            finish(page, RuntimeError("No results were returned"))
+    else:
+        for page in pages:
+            keep_alive()
+            if claim(page):
+                try:
+                    extractor(page).get_words()
+                    finish(page)
+                except Exception as e:
+                    finish(page, e)
+
+    return progress
+
+
+def document_extraction_progress(document):
+    """
+    Summarize the document's most recent whole-document extraction, or return None if there hasn't been one.
+    """
+    key = document_extraction_key(document)
+    state = huey.get(key, peek=True)
+    if state is None:
+        return None
+
+    processed = failed = 0
+    for lane in range(state["lanes"]):
+        lane_state = huey.get(lane_key(key, lane), peek=True) or {}
+        processed += lane_state.get("processed", 0)
+        failed += lane_state.get("failed", 0)
+
+    total = len(state["pages"])
+    return {
+        "started": state["started"],
+        "total": total,
+        "processed": processed,
+        "failed": failed,
+        "percent": int(processed * 100 / total),
+        "finished": processed >= total,
+    }
+
+
+def clear_document_extraction(key):
+    """Remove a document's extraction state, and its lanes', from the Huey store."""
+    state = huey.get(key)
+    if state:
+        for lane in range(state["lanes"]):
+            huey.get(lane_key(key, lane))
+
+
+def page_extraction_status(page):
+    """
+    None while the page's extraction handle is held, then "finished" if the page has words, or "failed" if it doesn't.
+    Until the extraction is done, this only looks at the Huey store.
+    """
+    if huey.get(page.extraction_key, peek=True) is not None:
+        return None
+    return "finished" if page.words.exists() else "failed"
+
+
+async def page_extraction_events(page):
+    """
+    Server-sent events for a page's extraction: one "finished" or "failed" event when it's done.
+    The stream closes without one after EXTRACTION_EVENTS_TIMEOUT, and the browser reconnects on its own.
+    """
+    status = sync_to_async(page_extraction_status)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EXTRACTION_EVENTS_TIMEOUT
+
+    # How long the browser should wait before reconnecting, in milliseconds
+    yield f"retry: {EXTRACTION_EVENTS_INTERVAL * 1000}\n\n"
+    while loop.time() < deadline:
+        if result := await status(page):
+            yield f"event: {result}\ndata: {page.id}\n\n"
+            return
+        await asyncio.sleep(EXTRACTION_EVENTS_INTERVAL)
@@ -1,13 +1,122 @@
 import json
 import logging
-
+import re
+import threading
+import time
+from itertools import islice
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from pymupdf import Document as PdfDocument
 from simple_history.utils import bulk_create_with_history
 
-from biblios.models import CloudService, TextBlock
-from biblios.services.suggestions import generate_suggestions
+from biblios.models import CloudService, Document, Page, TextBlock
 
 logger = logging.getLogger("django")
 
+# boto3 clients are thread-safe and keep a pool of warm connections, so each process shares one per CloudService.
+# Entries are (connection settings, client), so a client is rebuilt if its CloudService's credentials change.
+_aws_clients = {}
+_aws_clients_lock = threading.Lock()
+
+
+def get_aws_client(service, name):
+    """Return a boto3 client for the CloudService, reusing the process's existing one if possible."""
+    endpoint_url = settings.AWS_ENDPOINT_URLS.get(name)
+    connection = (service.client_id, service.client_secret, endpoint_url)
+    entry = _aws_clients.get((service.pk, name))
+    if entry is None or entry[0] != connection:
+        with _aws_clients_lock:
+            entry = _aws_clients.get((service.pk, name))
+            if entry is None or entry[0] != connection:
+                import boto3
+                from botocore.config import Config
+
+                # boto3's default session isn't thread-safe, so build each client from its own session
+                session = boto3.session.Session(
+                    aws_access_key_id=service.client_id,
+                    aws_secret_access_key=service.client_secret,
+                    region_name="us-east-1",
+                )
+                client = session.client(
+                    name,
+                    endpoint_url=endpoint_url,
+                    # Every Huey worker thread can have a request in flight at once
+                    config=Config(max_pool_connections=settings.HUEY_WORKERS),
+                )
+                logger.info(
+                    f"Created {name} client for organization {service.organization_id}"
+                )
+                entry = (connection, client)
+                _aws_clients[(service.pk, name)] = entry
+    return entry[1]
+
+
+def get_textract_client(service):
+    return get_aws_client(service, "textract")
+
+
+def invalidate_aws_clients(service):
+    """Drop the process's clients for the CloudService, so the next request builds fresh ones."""
+    with _aws_clients_lock:
+        for key in [k for k in _aws_clients if k[0] == service.pk]:
+            del _aws_clients[key]
+
+
+class JSONArrayStream(object):
+    """
+    The items of an array in a JSON file, parsed one at a time instead of loading the whole file.
+    `key` is the name of the array's property in the file's top-level object.
+    Each iteration reads through the file again, so a response file can be filtered several ways.
+    """
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, filename, key):
+        self.filename = filename
+        self.start = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+
+    def __iter__(self):
+        decoder = json.JSONDecoder()
+        with open(self.filename) as f:
+            buffer = f.read(self.READ_SIZE)
+
+            # Skip ahead to the start of the array
+            while not (match := self.start.search(buffer)):
+                more = f.read(self.READ_SIZE)
+                if not more:
+                    return
+                # Keep the tail, in case the key is split across reads
+                buffer = buffer[-100:] + more
+            position = match.end()
+
+            while True:
+                # Step over the separator to the next item, or the end of the array
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer) and buffer[position] == "]":
+                    return
+
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # An item that runs right to the end of the buffer might be cut off, e.g. a number
+                    complete = end < len(buffer)
+                except json.JSONDecodeError:
+                    complete = False
+
+                if not complete:
+                    # The item isn't all in the buffer yet
+                    more = f.read(self.READ_SIZE)
+                    if not more:
+                        raise ValueError(f"{self.filename} ended inside the array")
+                    buffer = buffer[position:] + more
+                    position = 0
+                    continue
+
+                position = end
+                yield item
+
 
 class BaseExtractor(object):
     """
@@ -26,8 +135,6 @@ class BaseExtractor(object):
 
     def __init__(self, page):
         self.page = page
-        self.distinct_words = set()
-        self.spelling_candidates = {}
 
     def __str__(self):
         return f"{self.service} Extractor"
@@ -38,24 +145,24 @@ class BaseExtractor(object):
     def __filter__(self, res):
         """
         Method to split word and non-word items from the extraction response.
-        `res` is a list from json.loads().
-        This method should return three subsets of items from it: words, lines, and then the remainder
+        `res` is an iterable of items from the response, such as a list from json.loads() or a JSONArrayStream.
+        This method should return three iterables of items from it: words, lines, and then the remainder.
+        Prefer generators, so items are only read as they're needed.
         """
         words = res
         lines = []
         others = []
         return words, lines, others
 
-    def _process_lines__(self, lines):
+    def __process_lines__(self, lines):
         return lines
 
     def __process_others__(self, others):
         return others
 
     def __generate_line_numbers__(self, lines):
-        return [
-            0,
-        ]
+        """Map each line position from __process_lines__ to its line number."""
+        return {0: 0}
 
     # Override this method with specifics about how to translate an extraction service's response to a TextBlock
     def __create_text_block__(self, word):
@@ -83,18 +190,17 @@ class BaseExtractor(object):
         # Cap it to the "accepted" level.
         textblock.confidence = min(textblock.confidence, TextBlock.CONF_ACCEPTED)
 
-        # If the text reaches the exact edge of the image, that causes a decimal.InvalidOperation error.
-        # Nudge it in just slightly.
+        # Textract's coordinates can fall just outside the image, so keep them on the page
         for coord in ("geo_x_0", "geo_y_0", "geo_x_1", "geo_y_1"):
-            c = getattr(textblock, coord)
-            setattr(textblock, coord, max(c, 0.000000000000001))
-            setattr(textblock, coord, min(c, 0.999999999999999))
+            setattr(textblock, coord, min(max(getattr(textblock, coord), 0), 1))
 
         return textblock
 
     # Ideally, don't override this.
-    # This can take a while because of the spellchecking. Best to call it through tasks.queue_extraction().
+    # This waits on the extraction service, so it's best to call it through tasks.queue_extraction().
+    # Spelling suggestions are left empty here, and filled in afterwards by tasks.queue_suggestions().
     def get_words(self):
+        """Extract the page's words and save them as TextBlocks. Returns how many were saved."""
         logger.info(f"Extracting {self.page} with {self.service}")
         response = self.__get_extraction__()
 
@@ -103,41 +209,47 @@ class BaseExtractor(object):
         self.others = self.__process_others__(others)
         self.line_numbers = self.__generate_line_numbers__(self.lines)
 
-        # Loop through the response words and create new text blocks for them.
-        # As we do this, generate spellcheck candidates for each unique word.
-        # This is currently case-sensitive and not aware of punctuation, and we can get
-        # bigger performance gains there with some more work.
-        new_text = []
-        for w in words:
-            text = w.get(self.word_attr)
-            if text not in self.distinct_words:
-                self.distinct_words.add(text)
-                self.spelling_candidates[text] = generate_suggestions(
-                    text, self.page.document.use_long_s_detection
+        # Create the text blocks as the response words stream through, and save them a batch at a time,
+        # so only one batch of TextBlocks is ever held in memory.
+        # The page lands in one transaction, so nobody sees it half extracted.
+        new_text = (self.__clean_block__(w) for w in words)
+        batch_size = settings.EXTRACTION_BATCH_SIZE
+        summary = settings.EXTRACTION_HISTORY_SUMMARY
+        count = 0
+        with transaction.atomic():
+            while batch := list(islice(new_text, batch_size)):
+                if summary:
+                    for word in batch:
+                        word.has_history = False
+                    TextBlock.objects.bulk_create(batch)
+                else:
+                    bulk_create_with_history(batch, TextBlock, batch_size=batch_size)
+                count += len(batch)
+
+            # The page and document have new content, though nobody has edited it yet
+            if count:
+                Page.objects.filter(pk=self.page.pk).revise()
+                Document.objects.filter(pk=self.page.document_id).revise()
+                Page.objects.filter(pk=self.page.pk).refresh_stats()
+
+            # Instead of a history record per word, give the page one that covers them all
+            if summary and count:
+                Page.history.bulk_history_create(
+                    [self.page],
+                    update=True,
+                    default_change_reason=f"Extracted {count} words",
                 )
 
-            new_text.append(self.__clean_block__(w))
-
-        logger.info(f"Found {len(self.distinct_words)} distinct words")
-
-        bulk_create_with_history(new_text, TextBlock)
-
-        return new_text
+        logger.info(f"Saved {count} words")
+        return count
 
 
 class AWSExtractor(BaseExtractor):
     service = "Amazon Web Services"
 
     def __get_extraction__(self):
-        import boto3
-
         service = self.page.document.collection.owner.cloudservice
-        client = boto3.client(
-            "textract",
-            region_name="us-east-1",
-            aws_access_key_id=service.client_id,
-            aws_secret_access_key=service.client_secret,
-        )
+        client = get_textract_client(service)
 
         # Get the bytes of the page image to send to Textract
         image = self.page.image.file.file.read()
@@ -152,41 +264,31 @@ class AWSExtractor(BaseExtractor):
 
     def __filter__(self, res):
         """
-        Filter the Textract response to just word blocks.
+        Split the Textract response into word, line, and other blocks.
+        Each one reads through `res` separately, so it needs to be something that can be iterated more than once.
         """
-        words = []
-        lines = []
-        others = []
-        for block in res:
-            if block["BlockType"] == "WORD":
-                words.append(block)
-            elif block["BlockType"] == "LINE":
-                lines.append(block)
-            else:
-                others.append(block)
-
+        words = (block for block in res if block["BlockType"] == "WORD")
+        lines = (block for block in res if block["BlockType"] == "LINE")
+        others = (block for block in res if block["BlockType"] not in ("WORD", "LINE"))
         return words, lines, others
 
     def __process_lines__(self, lines):
-        relationships = {}
+        positions = {}
         for block in lines:
-            # For lines, record each child as a key in that dict.
-            # Using the line's top point and its index as the value gives us sortability.
+            # For lines, map each child word to the line's top point and the word's place in the line.
+            # That pair is the word's sort order on the page.
             # All lines *should* have Relationships but it's not clear whether that's a guarantee.
-            rel = block.get("Relationships", [])
             top = block["Geometry"]["BoundingBox"]["Top"]
-            children = rel.pop()
-            for child in children["Ids"]:
-                relationships[child] = (top, children["Ids"].index(child))
-        return relationships
+            for rel in block.get("Relationships", []):
+                if rel["Type"] == "CHILD":
+                    for number, child in enumerate(rel["Ids"]):
+                        positions[child] = (top, number)
+        return positions
 
     def __generate_line_numbers__(self, lines):
-        numbers = []
-        for line in lines.values():
-            if line[0] not in numbers:
-                numbers.append(line[0])
-        numbers.sort()
-        return numbers
+        # Rank each distinct line top, so a word's line number is a single lookup
+        tops = sorted({position[0] for position in lines.values()})
+        return {top: number for number, top in enumerate(tops)}
 
     def __create_text_block__(self, word):
         text_type = (
@@ -199,11 +301,9 @@ class AWSExtractor(BaseExtractor):
             page=self.page,
             text=word["Text"],
             text_type=text_type,
-            line=self.line_numbers.index(position[0]),
+            line=self.line_numbers[position[0]],
             number=position[1],
             confidence=word["Confidence"],
-            # TextBlock does this on save(), but the bulk create process bypasses that
-            suggestions=self.spelling_candidates[word["Text"]],
             geo_x_0=word["Geometry"]["Polygon"][0]["X"],
             geo_y_0=word["Geometry"]["Polygon"][0]["Y"],
             geo_x_1=word["Geometry"]["Polygon"][2]["X"],
@@ -211,13 +311,161 @@ class AWSExtractor(BaseExtractor):
         )
 
 
+class AWSJobExtractor(AWSExtractor):
+    """
+    Extracts text with Textract's asynchronous document jobs, instead of one blocking request per page.
+
+    extract_pages() sends several pages as a single multi-page PDF, through the CloudService's S3 bucket,
+    and saves each page's words as its results are read back. Extracting a single page runs a one-page job.
+    """
+
+    service = "Amazon Web Services (document jobs)"
+
+    # Seconds between checks on a running job, and how long to wait for one before giving up
+    POLL_INTERVAL = 5
+    JOB_TIMEOUT = 3600
+
+    def __init__(self, page, blocks=None):
+        super().__init__(page)
+        # The page's share of a job's results, if they've already been fetched
+        self.blocks = blocks
+
+    def __get_extraction__(self):
+        if self.blocks is None:
+            self.blocks = []
+            for page, blocks in self.run_job([self.page]):
+                self.blocks = blocks
+        return self.blocks
+
+    @staticmethod
+    def build_pdf(pages):
+        """Combine the pages' images into one PDF, a page apiece, in order."""
+        pdf = PdfDocument()
+        for page in pages:
+            with page.image.open("rb") as f:
+                image = PdfDocument(stream=f.read())
+            # Only the first frame of a multi-frame TIFF, so PDF pages line up with Pages
+            pdf.insert_pdf(PdfDocument(stream=image.convert_to_pdf(0, 0)))
+        return pdf.tobytes()
+
+    @classmethod
+    def job_results(cls, service, job_id, on_wait=None):
+        """Yield a job's result blocks, one response's worth at a time, once it has finished."""
+        textract = get_textract_client(service)
+        request = {"JobId": job_id, "MaxResults": 1000}
+        started = time.monotonic()
+        while True:
+            response = textract.get_document_text_detection(**request)
+            status = response["JobStatus"]
+
+            if status == "IN_PROGRESS":
+                if time.monotonic() - started > cls.JOB_TIMEOUT:
+                    raise TimeoutError(f"Textract job {job_id} is still running")
+                if on_wait:
+                    on_wait()
+                time.sleep(cls.POLL_INTERVAL)
+                continue
+            elif status == "FAILED":
+                raise RuntimeError(
+                    f"Textract job {job_id} failed: {response.get('StatusMessage')}"
+                )
+            elif status == "PARTIAL_SUCCESS":
+                logger.warning(
+                    f"Textract job {job_id} partly failed: {response.get('Warnings')}"
+                )
+
+            yield from response["Blocks"]
+
+            if "NextToken" not in response:
+                return
+            request["NextToken"] = response["NextToken"]
+
+    @staticmethod
+    def job_pages(blocks):
+        """
+        Group a job's result blocks by page, yielding (page number, blocks) as each page is complete.
+        Textract doesn't promise to return them in page order, so a page is complete once its PAGE block has arrived
+        along with every block listed as a child of it, or of its children. Pages still missing blocks when the
+        results run out are yielded at the end with what they have.
+        """
+        pending, finished = {}, set()
+        for block in blocks:
+            number = block["Page"]
+            if number in finished:
+                # Its words have been saved already, and saving these too would repeat them
+                logger.warning(f"Ignoring a late result block for page {number}")
+                continue
+
+            page = pending.setdefault(
+                number, {"blocks": [], "seen": set(), "missing": set(), "top": False}
+            )
+            page["blocks"].append(block)
+            page["seen"].add(block["Id"])
+            page["missing"].discard(block["Id"])
+            for relationship in block.get("Relationships", []):
+                if relationship["Type"] == "CHILD":
+                    page["missing"].update(
+                        i for i in relationship["Ids"] if i not in page["seen"]
+                    )
+            page["top"] |= block["BlockType"] == "PAGE"
+
+            if page["top"] and not page["missing"]:
+                finished.add(number)
+                yield number, pending.pop(number)["blocks"]
+
+        for number in sorted(pending):
+            yield number, pending[number]["blocks"]
+
+    @classmethod
+    def run_job(cls, pages, on_wait=None):
+        """
+        Run a job over several pages, of the same organization, and yield (page, blocks) as each page's results arrive.
+        on_wait() is called each time the job is checked on while it's running.
+        """
+        service = pages[0].document.collection.owner.cloudservice
+        s3 = get_aws_client(service, "s3")
+        key = f"libriscan/{uuid4()}.pdf"
+
+        logger.info(f"Submitting {len(pages)} pages to a Textract job")
+        s3.put_object(Bucket=service.bucket, Key=key, Body=cls.build_pdf(pages))
+        try:
+            job = get_textract_client(service).start_document_text_detection(
+                DocumentLocation={"S3Object": {"Bucket": service.bucket, "Name": key}}
+            )
+            logger.info(f"Started Textract job {job['JobId']}")
+
+            results = cls.job_results(service, job["JobId"], on_wait)
+            for number, blocks in cls.job_pages(results):
+                yield pages[number - 1], blocks
+        finally:
+            # The job's done with the file, one way or another
+            s3.delete_object(Bucket=service.bucket, Key=key)
+
+    @classmethod
+    def extract_pages(cls, pages, on_page=None, on_wait=None):
+        """
+        Extract text for several pages with a single job.
+        on_page(page, result) is called as each page is done, with its saved words or the exception that stopped them.
+        Pages the job returned nothing for are left alone.
+        """
+        for page, blocks in cls.run_job(pages, on_wait):
+            try:
+                result = cls(page, blocks).get_words()
+            except Exception as e:
+                result = e
+            if on_page:
+                on_page(page, result)
+
+
 class TestExtractor(AWSExtractor):
     service = "Dummy Service"
 
     def __get_extraction__(self):
-        with open("biblios/tests/textract_response.json") as j:
-            response = json.load(j)
-        return response["Blocks"]
+        return JSONArrayStream("biblios/tests/textract_response.json", "Blocks")
 
 
-EXTRACTORS = {CloudService.TEST: TestExtractor, CloudService.AWS: AWSExtractor}
+EXTRACTORS = {
+    CloudService.TEST: TestExtractor,
+    CloudService.AWS: AWSExtractor,
+    CloudService.AWS_JOBS: AWSJobExtractor,
+}
@@ -0,0 +1,159 @@
+import math
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from itertools import repeat
+
+from PIL import Image
+from pymupdf import Document as PdfDocument, Font, TextWriter
+
+# Rendering PDF pages, kept apart from Django and the models so it can run in worker processes that don't set it up.
+# A page is given as the path to its image, its printable words, each as (text, font, x0, y0, x1),
+# with the coordinates as fractions of the page's width and height, and where to keep a scaled down copy of its image.
+
+# How many chunks of pages to give each worker process, so one slow chunk doesn't hold up the rest for long
+CHUNKS_PER_WORKER = 4
+
+# What's embedded for each kind of PDF export. With a format, page images are scaled down to no more than `dpi`
+# and recompressed, JPEG at a quality of 1-95, or JPEG2000 at a quality in decibels (around 30-50).
+# Without one, the images go in as they were uploaded.
+PROFILES = {
+    # The page images at full resolution, as they were uploaded
+    "archival": {"images": True, "format": None},
+    # Small enough to share and read online
+    "web": {"images": True, "dpi": 150, "format": "JPEG", "quality": 70},
+    # Just the text, laid out where it is on the pages
+    "text": {"images": False},
+}
+
+# The resolution scans are assumed to have if their images don't say
+SCAN_DPI = 300
+
+
+@cache
+def load_font(name):
+    """One of pymupdf's built-in fonts, loaded once for each process."""
+    return Font(name)
+
+
+def derive_image(source, target, profile):
+    """
+    Write a copy of the page image to `target`, scaled down and recompressed for the export profile,
+    unless it's already there. Returns the target path.
+    """
+    if os.path.exists(target):
+        return target
+
+    with Image.open(source) as image:
+        dpi = image.info.get("dpi", (SCAN_DPI,))[0] or SCAN_DPI
+        scale = min(1, profile["dpi"] / dpi)
+        # 16-bit greyscale, common for archival scans, is clipped rather than scaled when it's converted to 8 bits
+        if image.mode.startswith("I"):
+            image = image.point(lambda v: v / 256)
+        # JPEG only takes greyscale or colour
+        image = image.convert(
+            "L" if image.mode in ("1", "L", "I", "I;16", "F") else "RGB"
+        )
+        if scale < 1:
+            size = (
+                max(1, round(image.width * scale)),
+                max(1, round(image.height * scale)),
+            )
+            image = image.resize(size, Image.Resampling.LANCZOS)
+
+        # Write it under a temporary name first, so another export never picks up a partly written one.
+        # The name is unique, since exports in other threads of the same process may be making it too.
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(target),
+            prefix=f".{os.path.basename(target)}.",
+            delete=False,
+        ) as temp:
+            if profile["format"] == "JPEG2000":
+                image.save(
+                    temp,
+                    "JPEG2000",
+                    quality_mode="dB",
+                    quality_layers=[profile["quality"]],
+                )
+            else:
+                image.save(temp, "JPEG", quality=profile["quality"], optimize=True)
+        os.replace(temp.name, target)
+
+    return target
+
+
+def add_page(pdf, page, profile):
+    """Add a page to the PDF, the size of its image, with its words placed where they appear on it."""
+    image_path, words, derived_path = page
+    with Image.open(image_path) as image:
+        width, height = image.size
+
+    pdf.new_page(-1, width=width, height=height)
+    use_image = profile["images"]
+    if use_image:
+        if profile["format"]:
+            image_path = derive_image(image_path, derived_path, profile)
+        # The image fills the page whatever its own size, so a scaled down copy lines up with the text too
+        pdf[-1].insert_image(rect=(0, 0, width, height), filename=image_path)
+
+    # use PDF render mode 3 ("not rendered") if we're generating a PDF from the page images
+    # https://pymupdf.readthedocs.io/en/latest/shape.html
+    render_mode = 3 if use_image else 0
+
+    # All of the page's words go into one text object, written to the page at once
+    writer = TextWriter(pdf[-1].rect)
+    for text, font, x0, y0, x1 in words:
+        # TextBlock coordinates are percentages of page size, so convert them to real pixels
+        # x0, y0 is top left, x1 is the right-hand side.
+        x0, y0, x1 = x0 * width, y0 * height, x1 * width
+
+        # Use a font size that will fill the height of the text block.
+        # Courier characters are about 0.6x as wide as they are tall, so divide the width of the word in pts by
+        # the number of characters in it and multiple by 1.67 to get the font size
+        size = int(((x1 - x0) / len(text)) * 1.67)
+
+        # Text will be placed relative to the bottom-left point of its geometry.
+        # Don't use y1 for this -- y1 is too low when there are descenders like g or q.
+        # Instead, use the font size as an offset to y0.
+        writer.append((x0, y0 + size), text, font=load_font(font), fontsize=size)
+
+    if words:
+        writer.write_text(pdf[-1], render_mode=render_mode)
+
+
+def render_pages(pages, profile):
+    """Render a chunk of pages into a PDF of their own, and return it as bytes."""
+    pdf = PdfDocument()
+    for page in pages:
+        add_page(pdf, page, profile)
+    return pdf.tobytes()
+
+
+def render_pdf(pages, output, profile="archival", workers=1):
+    """
+    Render the pages into a PDF with one of the PROFILES, and write it to the `output` file object.
+
+    With more than one worker, the pages are split into chunks that are rendered as separate PDFs
+    in a pool of that many processes, then put together in order.
+    """
+    profile = PROFILES[profile]
+    pages = list(pages)
+    pdf = PdfDocument()
+
+    if workers <= 1 or len(pages) <= 1:
+        for page in pages:
+            add_page(pdf, page, profile)
+    else:
+        size = math.ceil(len(pages) / (workers * CHUNKS_PER_WORKER))
+        chunks = [pages[i : i + size] for i in range(0, len(pages), size)]
+        # Spawn fresh processes, rather than forking one that may be running other threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(min(workers, len(chunks)), context) as pool:
+            for part in pool.map(render_pages, chunks, repeat(profile)):
+                with PdfDocument(stream=part) as partial:
+                    pdf.insert_pdf(partial)
+
+    pdf.save(output)
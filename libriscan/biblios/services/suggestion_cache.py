@@ -0,0 +1,198 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+
+logger = logging.getLogger("django")
+
+
+class SuggestionCache(object):
+    """
+    A size-bounded store of spelling suggestions with least-recently-used eviction.
+
+    It lives in a SQLite file next to the Huey task queue, so every gunicorn and Huey worker
+    on the host reads and writes the same entries. Entries are keyed by (word, long_s flag, s),
+    matching the arguments of generate_suggestions().
+    """
+
+    # Only check the size of the cache every so many writes, since counting rows isn't free
+    EVICTION_INTERVAL = 500
+
+    # Don't bother recording a cache hit if the entry was used more recently than this many seconds ago.
+    # Keeps hot words from turning every read into a write.
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, filename, max_entries):
+        self.filename = str(filename)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+    def __str__(self):
+        return f"Suggestion cache ({self.filename})"
+
+    @staticmethod
+    def normalize(word):
+        """Normalize a word's unicode representation so equivalent spellings share an entry."""
+        return unicodedata.normalize("NFC", word)
+
+    @property
+    def connection(self):
+        # SQLite connections can't be shared across threads, and Huey runs thread workers
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=10, isolation_level=None)
+            # WAL mode lets readers in other processes carry on while one of them is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS suggestions ("
+                "word TEXT NOT NULL, long_s INTEGER NOT NULL, s INTEGER NOT NULL, "
+                "suggestions TEXT NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (word, long_s, s))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS suggestions_last_used ON suggestions (last_used)"
+            )
+            self._local.connection = conn
+        return conn
+
+    def get(self, word, long_s_detect, s):
+        """Return the cached suggestions for a word, or None if there aren't any."""
+        key = (self.normalize(word), bool(long_s_detect), s)
+        try:
+            row = self.connection.execute(
+                "SELECT suggestions, last_used FROM suggestions WHERE word = ? AND long_s = ? AND s = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if now - row[1] > self.TOUCH_INTERVAL:
+                self.connection.execute(
+                    "UPDATE suggestions SET last_used = ? WHERE word = ? AND long_s = ? AND s = ?",
+                    (now, *key),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"{self} read failed: {e}")
+            return None
+
+        # JSON turns the (suggestion, frequency) tuples into lists, so turn them back
+        return [tuple(suggestion) for suggestion in json.loads(row[0])]
+
+    def set(self, word, long_s_detect, s, suggestions):
+        """Store the suggestions for a word."""
+        self.set_many([(word, long_s_detect, s, suggestions)])
+
+    def set_many(self, entries):
+        """Store a batch of (word, long_s flag, s, suggestions) entries in a single transaction."""
+        now = time.time()
+        rows = [
+            (self.normalize(word), bool(long_s_detect), s, json.dumps(suggestions), now)
+            for word, long_s_detect, s, suggestions in entries
+        ]
+        if not rows:
+            return
+
+        try:
+            with self.connection as conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO suggestions (word, long_s, s, suggestions, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"{self} write failed: {e}")
+            return
+
+        self._writes += len(rows)
+        if self._writes >= self.EVICTION_INTERVAL:
+            self._writes = 0
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries until the cache is back under its size limit."""
+        try:
+            with self.connection as conn:
+                conn.execute("BEGIN")
+                (count,) = conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()
+                excess = count - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM suggestions WHERE rowid IN "
+                        "(SELECT rowid FROM suggestions ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+                    logger.info(f"Evicted {excess} entries from {self}")
+        except sqlite3.Error as e:
+            logger.warning(f"{self} eviction failed: {e}")
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+
+    def clear(self):
+        self.connection.execute("DELETE FROM suggestions")
+
+
+# One cache object per file, so each process only opens its connections once
+_caches = {}
+
+
+def get_suggestion_cache():
+    """Return the configured suggestion cache, or None if caching is turned off."""
+    config = getattr(settings, "SUGGESTION_CACHE", None)
+    if not config or not config.get("filename") or not config.get("max_entries"):
+        return None
+
+    filename = str(config["filename"])
+    if filename not in _caches:
+        _caches[filename] = SuggestionCache(filename, config["max_entries"])
+    return _caches[filename]
+
+
+def warm_suggestion_cache(batch_size=1000):
+    """
+    Load the suggestions already stored on TextBlocks into the shared cache.
+    Returns the number of distinct entries written.
+    """
+    from biblios.models import TextBlock
+
+    cache = get_suggestion_cache()
+    if cache is None:
+        logger.info("Suggestion cache is turned off; nothing to warm")
+        return 0
+
+    # TextBlocks get their suggestions from generate_suggestions() with the default of 3.
+    # An empty dict is the model default, meaning suggestions were never generated for the word.
+    s = 3
+    seen = set()
+    batch = []
+    count = 0
+    rows = TextBlock.objects.values_list(
+        "text", "page__document__use_long_s_detection", "suggestions"
+    )
+    for text, long_s_detect, suggestions in rows.iterator(chunk_size=batch_size):
+        if not isinstance(suggestions, list):
+            continue
+        key = (cache.normalize(text), long_s_detect)
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append((text, long_s_detect, s, suggestions))
+
+        if len(batch) >= batch_size:
+            cache.set_many(batch)
+            count += len(batch)
+            batch = []
+
+    cache.set_many(batch)
+    count += len(batch)
+
+    logger.info(f"Warmed {cache} with {count} entries")
+    return count
@@ -1,10 +1,22 @@
 import re
 from string import punctuation
 
+from django.conf import settings
+from django.db import transaction
 from spellchecker import SpellChecker
 
+from biblios.services.suggestion_cache import get_suggestion_cache
+from biblios.services.symspell import SymSpellIndex
+
 spell = SpellChecker()
 
+# Both engines search pyspellchecker's dictionary and return the same candidates.
+# SymSpell answers much faster, at the cost of building a large index the first time it's used.
+ENGINES = {
+    "pyspellchecker": spell,
+    "symspell": SymSpellIndex(spell),
+}
+
 # This app probably won't see such heavy use that compiling the regex will make a noticable difference,
 # but it doesn't hurt and makes it easier to read when we do use it.
 
@@ -26,13 +38,37 @@ def long_s_conversion(word, modern=True):
 def generate_suggestions(wrd, long_s_detect, s=3):
     """
     Find possible spellcheck suggestions of a word and its variants, and return the top n candidates.
+    Results are shared between processes through the suggestion cache, so each word is only spellchecked once.
+
+    wrd (str): the potentially misspelled word
+    long_s_detect (bool): whether to use long-s detection rules
+    s (int): the number of suggestions to return
+
+    Returns a list of (suggestion, frequency) tuples.
+    """
+    cache = get_suggestion_cache()
+    if cache is None:
+        return find_suggestions(wrd, long_s_detect, s)
+
+    suggestions = cache.get(wrd, long_s_detect, s)
+    if suggestions is None:
+        suggestions = find_suggestions(wrd, long_s_detect, s)
+        cache.set(wrd, long_s_detect, s, suggestions)
+    return suggestions
+
+
+def find_suggestions(wrd, long_s_detect, s=3, engine=None):
+    """
+    Spellcheck a word and its variants, and return the top n candidates. This skips the suggestion cache.
 
     wrd (str): the potentially misspelled word
     long_s_detect (bool): whether to use long-s detection rules
     s (int): the number of suggestions to return
+    engine (str): the key of the spelling engine in ENGINES to use; defaults to settings.SUGGESTION_ENGINE
 
     Returns a list of (suggestion, frequency) tuples.
     """
+    checker = ENGINES[engine or settings.SUGGESTION_ENGINE]
 
     words = [wrd,]
 
@@ -69,15 +105,39 @@ def generate_suggestions(wrd, long_s_detect, s=3):
         else:
             case = None
 
-        candidates = spell.candidates(word)
+        candidates = checker.candidates(word)
         if candidates:
             for candidate in candidates:
                 if case:
                     candidate = case(candidate)
                 suggestions.add((F"{candidate}{last_letter}", spell.word_frequency[candidate]))
 
-    # Sort the suggestions by their frequency, descending
-    suggestions = sorted(suggestions, key=lambda c: c[1], reverse=True)
+    # Sort the suggestions by their frequency, descending.
+    # Break ties alphabetically, so the result doesn't depend on set ordering or which engine found them.
+    suggestions = sorted(suggestions, key=lambda c: (-c[1], c[0]))
     
     return suggestions[:s]
-    
+
+
+def update_page_suggestions(page):
+    """
+    Fill in spelling suggestions for every word on a page that doesn't have them yet.
+    Extraction inserts words without suggestions so the page can be shown right away; this finishes the job.
+
+    Returns the number of words updated.
+    """
+    # An empty dict is the model default, meaning suggestions were never generated for the word
+    pending = page.words.filter(suggestions={})
+    texts = set(pending.values_list("text", flat=True))
+
+    # Spellcheck before opening the transaction, so the database isn't locked while it runs
+    long_s = page.document.use_long_s_detection
+    suggestions = {text: generate_suggestions(text, long_s) for text in texts}
+
+    # Update by text rather than by ID, so a word edited in the meantime keeps the suggestions from its save()
+    updated = 0
+    with transaction.atomic():
+        for text, suggested in suggestions.items():
+            updated += pending.filter(text=text).update(suggestions=suggested)
+
+    return updated
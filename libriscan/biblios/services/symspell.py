@@ -0,0 +1,125 @@
+import logging
+import threading
+
+logger = logging.getLogger("django")
+
+
+def deletes(word, distance):
+    """Every string that can be made by deleting up to `distance` characters from the word, including itself."""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def damerau_levenshtein(a, b):
+    """
+    The unrestricted Damerau-Levenshtein distance between two strings.
+    This is the fewest inserts, deletes, replacements and adjacent transpositions needed to turn `a` into `b`,
+    which is exactly the distance that pyspellchecker's repeated single edits explore.
+    """
+    last_row_of = {}
+    inf = len(a) + len(b)
+
+    # The distance matrix has an extra sentinel row and column for the transposition lookback
+    d = [[inf] * (len(b) + 2)]
+    d += [[inf] + list(range(len(b) + 1))]
+    d += [[inf, i] + [0] * len(b) for i in range(1, len(a) + 1)]
+
+    for i in range(1, len(a) + 1):
+        last_match_col = 0
+        for j in range(1, len(b) + 1):
+            i1 = last_row_of.get(b[j - 1], 0)
+            j1 = last_match_col
+            if a[i - 1] == b[j - 1]:
+                cost = 0
+                last_match_col = j
+            else:
+                cost = 1
+            d[i + 1][j + 1] = min(
+                d[i][j] + cost,
+                d[i + 1][j] + 1,
+                d[i][j + 1] + 1,
+                d[i1][j1] + (i - i1 - 1) + 1 + (j - j1 - 1),
+            )
+        last_row_of[a[i - 1]] = i
+
+    return d[len(a) + 1][len(b) + 1]
+
+
+class SymSpellIndex(object):
+    """
+    A symmetric-delete spelling index over pyspellchecker's frequency dictionary.
+
+    Instead of generating every edit of a query word, each dictionary word is indexed under
+    the strings made by deleting up to `distance` characters from its prefix. At query time
+    the same deletes of the query word find every dictionary word within that distance, and
+    only those few are checked with a real edit distance.
+    See https://github.com/wolfgarbe/SymSpell for the technique.
+
+    candidates() returns the same results as SpellChecker.candidates().
+    """
+
+    # Only index deletes of the first few characters. This keeps the index a fraction of the size,
+    # and candidates are verified against the full word anyway.
+    PREFIX_LENGTH = 7
+
+    def __init__(self, spell, distance=2):
+        self.spell = spell
+        self.distance = distance
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        # Building the index takes several seconds, so only do it once, and only when it's needed
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self.build()
+        return self._index
+
+    def build(self):
+        logger.info("Building symmetric-delete spelling index")
+        index = {}
+        for word in self.spell.word_frequency.dictionary:
+            for d in deletes(word[: self.PREFIX_LENGTH], self.distance):
+                # Most deletes only belong to one word, so don't pay for a container until there's a second
+                entry = index.get(d)
+                if entry is None:
+                    index[d] = word
+                elif isinstance(entry, str):
+                    index[d] = (entry, word)
+                else:
+                    index[d] = entry + (word,)
+        logger.info(f"Spelling index built with {len(index)} entries")
+        return index
+
+    def candidates(self, word):
+        """
+        Possible spelling corrections for a word, up to the index's edit distance.
+        Like SpellChecker.candidates(), returns {word} if it's already correct, or None if nothing is close.
+        """
+        spell = self.spell
+        if spell.known([word]) or not spell._check_if_should_check(word):
+            return {word}
+
+        word = word.lower()
+        distances = {}
+        for d in deletes(word[: self.PREFIX_LENGTH], self.distance):
+            entry = self.index.get(d)
+            if entry is None:
+                continue
+            for candidate in (entry,) if isinstance(entry, str) else entry:
+                if candidate in distances or abs(len(candidate) - len(word)) > self.distance:
+                    continue
+                distances[candidate] = damerau_levenshtein(word, candidate)
+
+        # Only return the closest candidates, the same way pyspellchecker stops at the first distance with a match
+        for distance in range(1, self.distance + 1):
+            found = {c for c, dist in distances.items() if dist == distance}
+            if found:
+                return found
+        return None
@@ -124,6 +124,16 @@ const LibriscanUtils = {
     return `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/word/${wordId}/update/`;
   },
 
+  /**
+   * Build the URL for updating several of the current page's words at once
+   * @param {string} pathname - URL pathname (default: current location)
+   * @returns {string} Batch update URL
+   */
+  buildWordsUpdateURL(pathname = window.location.pathname) {
+    const { shortName, collectionSlug, identifier, pageNumber } = this.parseLibriscanURL(pathname);
+    return `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/words/update/`;
+  },
+
   /**
    * Build a word history URL for the current page
    * @param {number} wordId - Word ID to get history for
@@ -157,6 +167,28 @@ const LibriscanUtils = {
     return `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/word/${wordId}/toggle-review/`;
   },
 
+  /**
+   * Build a word suggestions URL for the current page
+   * @param {number} wordId - Word ID to get suggestions for
+   * @param {string} pathname - URL pathname (default: current location)
+   * @returns {string} Suggestions URL
+   */
+  buildWordSuggestionsURL(wordId, pathname = window.location.pathname) {
+    const { shortName, collectionSlug, identifier, pageNumber } = this.parseLibriscanURL(pathname);
+    return `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/word/${wordId}/suggestions/`;
+  },
+
+  /**
+   * Build a line suggestions URL for the current page
+   * @param {number} line - Line number to get suggestions for
+   * @param {string} pathname - URL pathname (default: current location)
+   * @returns {string} Line suggestions URL
+   */
+  buildLineSuggestionsURL(line, pathname = window.location.pathname) {
+    const { shortName, collectionSlug, identifier, pageNumber } = this.parseLibriscanURL(pathname);
+    return `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/line/${line}/suggestions/`;
+  },
+
   /**
    * Fetch JSON data from a URL with optional authentication
    * @param {string} url - Request URL
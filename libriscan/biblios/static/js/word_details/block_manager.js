@@ -10,7 +10,6 @@ class WordBlockManager {
     wordBlock.dataset.wordText = data.text;
     wordBlock.dataset.wordConfidence = data.confidence;
     wordBlock.dataset.wordConfidenceLevel = data.confidence_level;
-    wordBlock.dataset.wordSuggestions = JSON.stringify(Object.entries(data.suggestions));
     if (data.print_control !== undefined) wordBlock.dataset.wordPrintControl = data.print_control;
     if (data.text_type !== undefined) wordBlock.dataset.wordType = data.text_type;
   }
@@ -28,6 +28,10 @@ const WordDetailsConfig = {
 
   ACCEPTED_THRESHOLD: 99.999,
   WORD_BLOCK_CLASS: 'word-block',
-  AUTO_ADVANCE_DELAY: 100
+  AUTO_ADVANCE_DELAY: 100,
+
+  // Word edits are sent in batches: this long after the last edit, or as soon as this many are waiting
+  EDIT_FLUSH_DELAY: 1500,
+  EDIT_BATCH_SIZE: 50
 };
 
@@ -0,0 +1,97 @@
+/**
+ * WordEditQueue - Collects word edits and sends them to the server in batches
+ * A batch is sent a moment after the last edit, when enough edits are waiting, or when the page is left
+ */
+class WordEditQueue {
+  constructor() {
+    // Waiting edits, by word and operation, so a later edit to the same field replaces an earlier one
+    this.pending = new Map();
+    // The callers waiting on each edit's result
+    this.waiting = [];
+    this.timer = null;
+    // The batch being sent; batches go one after another so the server gets edits in the order they were made
+    this.inFlight = Promise.resolve();
+
+    this._pageHideHandler = () => this.flush({ keepalive: true });
+    window.addEventListener('pagehide', this._pageHideHandler);
+  }
+
+  destroy() {
+    window.removeEventListener('pagehide', this._pageHideHandler);
+    this.flush();
+  }
+
+  /**
+   * Queue an edit to a word
+   * @param {number|string} wordId - Word ID
+   * @param {string} op - 'text', 'print_control', 'review' or 'merge'
+   * @param {*} value - The new value
+   * @returns {Promise<Object>} The word's data once the batch has been saved
+   */
+  enqueue(wordId, op, value) {
+    this.pending.set(`${wordId}:${op}`, { id: Number(wordId), op, value });
+    const result = new Promise((resolve, reject) => {
+      this.waiting.push({ wordId: String(wordId), resolve, reject });
+    });
+
+    if (this.pending.size >= WordDetailsConfig.EDIT_BATCH_SIZE) {
+      this.flush();
+    } else {
+      clearTimeout(this.timer);
+      this.timer = setTimeout(() => this.flush(), WordDetailsConfig.EDIT_FLUSH_DELAY);
+    }
+    return result;
+  }
+
+  /**
+   * Send everything that's waiting
+   * @param {Object} options
+   * @param {boolean} options.keepalive - Let the request outlive the page
+   * @returns {Promise} Resolves once every edit made so far has been sent
+   */
+  flush({ keepalive = false } = {}) {
+    clearTimeout(this.timer);
+    this.timer = null;
+    if (this.pending.size === 0) return this.inFlight;
+
+    const operations = [...this.pending.values()];
+    const waiting = this.waiting;
+    this.pending = new Map();
+    this.waiting = [];
+
+    // The page is going away, so there's no time to wait for an earlier batch
+    const previous = keepalive ? Promise.resolve() : this.inFlight;
+    this.inFlight = previous
+      .then(() => this._send(operations, keepalive))
+      .then(
+        (data) => waiting.forEach((w) => w.resolve(data.words[w.wordId])),
+        (error) => waiting.forEach((w) => w.reject(error))
+      );
+    return this.inFlight;
+  }
+
+  async _send(operations, keepalive) {
+    const response = await fetch(LibriscanUtils.buildWordsUpdateURL(), {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': LibriscanUtils.getCSRFToken()
+      },
+      body: JSON.stringify({ operations }),
+      credentials: 'same-origin',
+      keepalive
+    });
+
+    if (!response.ok) {
+      let errorMessage = `Request failed with status ${response.status}`;
+      try {
+        errorMessage = (await response.json()).error || errorMessage;
+      } catch {
+        // If JSON parsing fails, use default error message
+      }
+      throw new Error(errorMessage);
+    }
+
+    return response.json();
+  }
+}
@@ -24,6 +24,9 @@ class WordDetails {
     if (this.keyboard) {
       this.keyboard.destroy();
     }
+    if (this.editQueue) {
+      this.editQueue.destroy();
+    }
     // Remove event listeners
     document.removeEventListener('wordSelected', this._wordSelectedHandler);
     document.removeEventListener('wordVisibilityControlUpdated', this._wordVisibilityControlHandler);
@@ -53,6 +56,8 @@ class WordDetails {
   }
 
   _initModules() {
+    this.editQueue = new WordEditQueue();
+
     this.editor = new WordEditor({
       wordElement: this.wordElement,
       wordInput: this.wordInput,
@@ -65,7 +70,8 @@ class WordDetails {
       wordVisibilityControlDropdownBtn: document.getElementById('wordVisibilityControlDropdownBtn'),
       wordVisibilityControlBadge: document.getElementById('wordVisibilityControlBadge'),
       wordVisibilityControlOptions: document.querySelectorAll('.word-visibility-control-option'),
-      acceptBtn: this.acceptBtn
+      acceptBtn: this.acceptBtn,
+      editQueue: this.editQueue
     });
 
     this.keyboard = new WordKeyboard(this);
@@ -266,6 +272,9 @@ class WordDetails {
       this.auditHistory = new AuditHistory();
     }
 
+    // The history should include any edits still waiting to be sent
+    await this.editQueue.flush();
+
     await this.auditHistory.displayHistory(this.currentWordId);
     this.revert.checkAndEnableRevertButton(this.currentWordId);
   }
@@ -8,6 +8,7 @@ class WordMetadata {
     this.wordVisibilityControlBadge = elements.wordVisibilityControlBadge;
     this.wordVisibilityControlOptions = elements.wordVisibilityControlOptions;
     this.acceptBtn = elements.acceptBtn;
+    this.editQueue = elements.editQueue;
     this.currentWordId = null;
     this.currentWordInfo = null;
     this.currentWordVisibilityControl = 'I';
@@ -76,12 +77,10 @@ class WordMetadata {
   }
 
   async _sendWordVisibilityControlUpdate(wordVisibilityControlValue) {
-    const { shortName, collectionSlug, identifier, pageNumber } = LibriscanUtils.parseLibriscanURL();
-    const url = `/${shortName}/${collectionSlug}/${identifier}/page${pageNumber}/word/${this.currentWordId}/print-control/`;
-    
-    return await LibriscanUtils.postFormData(url, { 
-      print_control: wordVisibilityControlValue 
-    });
+    const result = this.editQueue.enqueue(this.currentWordId, 'print_control', wordVisibilityControlValue);
+    // The dropdown waits on the result, so send it now, along with anything else that's queued
+    this.editQueue.flush();
+    return await result;
   }
 
   _updateWordVisibilityControlDisplay(wordVisibilityControlValue) {
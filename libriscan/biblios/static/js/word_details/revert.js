@@ -34,6 +34,9 @@ class WordRevert {
     LibriscanUtils.setButtonLoading(button, true, 'Reverting...');
 
     try {
+      // Send any queued edits first, so they can't land on top of the reverted word
+      await this.wordDetails.editQueue.flush();
+
       const data = await LibriscanUtils.postFormData(
         LibriscanUtils.buildWordRevertURL(this.wordDetails.currentWordId), 
         {}
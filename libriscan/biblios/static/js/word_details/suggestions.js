@@ -4,6 +4,10 @@
 class WordSuggestions {
   constructor(wordDetails) {
     this.wordDetails = wordDetails;
+    // Suggestions aren't included in the page, so they're fetched on demand and kept here by word ID
+    this.cache = new Map();
+    // In-flight requests for a whole line of suggestions, by line number
+    this.lineRequests = new Map();
   }
 
   updateSuggestions(wordInfo) {
@@ -22,6 +26,18 @@ class WordSuggestions {
     if (!this.wordDetails.suggestionsContainer && container) {
       this.wordDetails.suggestionsContainer = container;
     }
+
+    const wordId = String(wordInfo.id);
+    if (wordInfo.suggestions) {
+      // Suggestions returned by an update are the latest, so remember them
+      this.cache.set(wordId, wordInfo.suggestions);
+    } else if (this.cache.has(wordId)) {
+      wordInfo.suggestions = this.cache.get(wordId);
+    } else {
+      container.textContent = 'Loading suggestions...';
+      this.loadSuggestions(wordInfo);
+      return;
+    }
     
     // Clear and update content
     container.innerHTML = '';
@@ -57,6 +73,52 @@ class WordSuggestions {
     container.appendChild(suggestionsList);
   }
 
+  async loadSuggestions(wordInfo) {
+    const wordId = String(wordInfo.id);
+
+    try {
+      // Fetch the whole line at once, since the next few words selected are likely to be on it too
+      if (Number.isInteger(wordInfo.line)) {
+        await this.loadLine(wordInfo.line);
+      }
+      if (!this.cache.has(wordId)) {
+        const data = await LibriscanUtils.fetchJSON(LibriscanUtils.buildWordSuggestionsURL(wordId));
+        this.cache.set(wordId, data.suggestions);
+      }
+    } catch (error) {
+      console.error('Error loading suggestions:', error);
+      LibriscanUtils.showToast('Failed to load word suggestions', 'warning');
+    }
+
+    // The user may have moved on to another word while the request was running
+    if (String(this.wordDetails.currentWordId) !== wordId) return;
+
+    if (this.cache.has(wordId)) {
+      this.updateSuggestions(wordInfo);
+    } else if (this.wordDetails.suggestionsContainer) {
+      this.wordDetails.suggestionsContainer.textContent = 'No suggestions available';
+    }
+  }
+
+  loadLine(line) {
+    if (!this.lineRequests.has(line)) {
+      const request = LibriscanUtils.fetchJSON(LibriscanUtils.buildLineSuggestionsURL(line))
+        .then(data => {
+          Object.entries(data.suggestions).forEach(([wordId, suggestions]) => {
+            // Don't overwrite anything newer that came back from an update
+            if (!this.cache.has(wordId)) this.cache.set(wordId, suggestions);
+          });
+        })
+        .catch(error => {
+          // Let the next selection on this line try again, and fall back to fetching the single word
+          this.lineRequests.delete(line);
+          console.warn('Error loading line suggestions:', error);
+        });
+      this.lineRequests.set(line, request);
+    }
+    return this.lineRequests.get(line);
+  }
+
   async applySuggestion(suggestion, suggestionsList, clickedLink) {
     if (!suggestion.trim()) {
       LibriscanUtils.showToast('Suggestion cannot be empty', 'error');
@@ -9,33 +9,61 @@ class WordUpdateHandler {
   }
 
   async updateWordText(newText, options = {}) {
-    try {
-      const updateUrl = LibriscanUtils.buildWordUpdateURL(this.wordDetails.currentWordInfo.id);
-      const data = await LibriscanUtils.postFormData(updateUrl, { text: newText });
-      
-      this.applyWordUpdate(data);
-      this.handleUpdateCallbacks(options);
-      
-      if (options.autoAdvance) {
-        this.autoAdvanceIfPossible();
-      }
-    } catch (error) {
-      console.error('Error updating word:', error);
-      LibriscanUtils.showToast('Error updating word', 'error');
-      throw error;
+    const wordInfo = this.wordDetails.currentWordInfo;
+    const wordId = wordInfo.id;
+    const previous = {
+      text: wordInfo.word,
+      confidence: wordInfo.confidence,
+      confidence_level: wordInfo.confidence_level,
+      suggestions: wordInfo.suggestions
+    };
+
+    // The edit is queued and sent with others, so show it straight away.
+    // The server's version, with the new suggestions, replaces this once the batch is saved.
+    this.wordDetails.editQueue.enqueue(wordId, 'text', newText)
+      .then((data) => this.applyWordUpdate(data, wordId))
+      .catch((error) => {
+        console.error('Error updating word:', error);
+        LibriscanUtils.showToast('Error updating word', 'error');
+        this.applyWordUpdate(previous, wordId);
+      });
+
+    this.applyWordUpdate({
+      text: newText,
+      confidence: WordDetailsConfig.ACCEPTED_THRESHOLD,
+      confidence_level: WordDetailsConfig.CONFIDENCE_LEVELS.ACCEPTED,
+      suggestions: {}
+    }, wordId);
+    this.handleUpdateCallbacks(options);
+
+    if (options.autoAdvance) {
+      this.autoAdvanceIfPossible();
     }
   }
 
-  applyWordUpdate(data) {
-    this.updateWordData(data);
-    this.updateWordUI();
-    this.updateWordBlock(data);
+  applyWordUpdate(data, wordId = this.wordDetails.currentWordId) {
+    // The word may no longer be the selected one by the time a queued edit is saved
+    const isCurrent = String(wordId) === String(this.wordDetails.currentWordId);
+    // Remember the suggestions that came with the update, or forget the word's old ones
+    if (data.suggestions) {
+      this.wordDetails.suggestions.cache.set(String(wordId), data.suggestions);
+    } else {
+      this.wordDetails.suggestions.cache.delete(String(wordId));
+    }
+
+    if (isCurrent) {
+      this.updateWordData(data);
+      this.updateWordUI();
+    }
+    this.updateWordBlock(data, wordId);
     
     document.dispatchEvent(new CustomEvent('wordUpdated', { 
-      detail: { wordId: this.wordDetails.currentWordId, data } 
+      detail: { wordId, data } 
     }));
     
-    this.wordDetails._checkAndEnableRevertButton(this.wordDetails.currentWordId);
+    if (isCurrent) {
+      this.wordDetails._checkAndEnableRevertButton(wordId);
+    }
   }
 
   updateWordData(data) {
@@ -43,7 +71,7 @@ class WordUpdateHandler {
     wordInfo.word = data.text;
     wordInfo.confidence = data.confidence;
     wordInfo.confidence_level = data.confidence_level;
-    wordInfo.suggestions = data.suggestions;
+    wordInfo.suggestions = data.suggestions ?? null;
     if (data.text_type !== undefined) wordInfo.text_type = data.text_type;
     if (data.print_control !== undefined) wordInfo.print_control = data.print_control;
   }
@@ -54,8 +82,8 @@ class WordUpdateHandler {
     this.wordDetails.updateSuggestions(this.wordDetails.currentWordInfo);
   }
 
-  updateWordBlock(data) {
-    const wordBlock = WordBlockManager.getWordBlock(this.wordDetails.currentWordInfo.id);
+  updateWordBlock(data, wordId = this.wordDetails.currentWordInfo.id) {
+    const wordBlock = WordBlockManager.getWordBlock(wordId);
     if (!wordBlock) return;
 
     WordBlockManager.updateDataAttributes(wordBlock, data);
@@ -74,7 +74,8 @@ class WordSelector {
       text_type: wordBlock.dataset.wordType,
       print_control: wordBlock.dataset.wordPrintControl,
       review: wordBlock.dataset.wordReview === 'true',
-      suggestions: this._parseSuggestions(wordBlock.dataset.wordSuggestions),
+      // Suggestions aren't in the page; WordSuggestions fetches them when the word is shown
+      suggestions: null,
       // Limits for geometry coordinates removed from data-words-json
       // geometry: {
       //   x0: parseFloat(wordBlock.dataset.wordGeoX0),
@@ -85,43 +86,6 @@ class WordSelector {
     };
   }
 
-  _parseSuggestions(suggestionsString) {
-    // Handle empty, null, or whitespace-only strings
-    if (!suggestionsString || !suggestionsString.trim()) {
-      return {};
-    }
-    
-    const trimmedString = suggestionsString.trim();
-    
-    // Handle empty JSON arrays/objects
-    if (trimmedString === '[]' || trimmedString === '{}') {
-      return {};
-    }
-    
-    try {
-      const parsedData = JSON.parse(trimmedString);
-      
-      // If parsed data is already an object/dictionary, return it directly
-      if (typeof parsedData === 'object' && parsedData !== null && !Array.isArray(parsedData)) {
-        return parsedData;
-      }
-      
-      // If parsed data is an array of [word, frequency] tuples, convert to object
-      if (Array.isArray(parsedData)) {
-        return Object.fromEntries(parsedData);
-      }
-      
-      return {};
-    } catch (parseError) {
-      // Data should always be valid JSON, but handle gracefully if parsing fails
-      console.warn('Failed to parse suggestions data:', trimmedString, parseError);
-      if (typeof LibriscanUtils !== 'undefined' && LibriscanUtils.showToast) {
-        LibriscanUtils.showToast('Failed to load word suggestions', 'warning');
-      }
-      return {};
-    }
-  }
-
   dispatchWordSelectedEvent(wordInfo) {
     document.dispatchEvent(new CustomEvent('wordSelected', { detail: wordInfo }));
   }
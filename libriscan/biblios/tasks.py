@@ -1,5 +1,6 @@
 import logging
 
+from django.conf import settings
 from huey.contrib.djhuey import db_task, periodic_task
 from huey.contrib.djhuey import HUEY as huey
 from huey import crontab
@@ -16,7 +17,13 @@ def queue_extraction(extractor):
     if extractor.page.can_extract:
         try:
             logger.info(f"Running page {extractor.page.id} extractor")
-            return extractor.get_words()
+            words = extractor.get_words()
+            # The words are saved and can be shown now; spellcheck them in a separate task
+            if settings.STORE_SUGGESTIONS:
+                queue_suggestions(extractor.page.id)
+            # Let go of the page's handle, so anything waiting on the page knows it's done
+            huey.get(extractor.page.extraction_key)
+            return words
         except Exception as e:
             logger.error(e)
             huey.get(extractor.page.extraction_key)
@@ -25,14 +32,60 @@ def queue_extraction(extractor):
         huey.get(extractor.page.extraction_key)
 
 
+@db_task()
+def queue_suggestions(page_id):
+    """Generate spelling suggestions for a freshly extracted page."""
+    from biblios.models import Page
+    from biblios.services.suggestions import update_page_suggestions
+
+    page = Page.objects.select_related("document").get(id=page_id)
+    updated = update_page_suggestions(page)
+    logger.info(f"Generated suggestions for {updated} words on page {page_id}")
+
+
+# A lane waits for one of its organization's extraction slots by retrying, so allow it a few hours to get one.
+# Only a busy slot is retried; extract_lane() counts the pages of a lane that stops on an error as failed.
+@db_task(retries=720, retry_delay=15, context=True)
+def queue_extraction_lane(org_id, lane, page_ids, progress_key, task=None):
+    """Extract one lane's share of a document's pages."""
+    from biblios.services.extraction import extract_lane
+
+    progress = extract_lane(
+        org_id, lane, page_ids, progress_key, last_try=task is None or not task.retries
+    )
+    logger.info(f"Extraction lane {progress_key} finished: {progress}")
+
+
+@db_task()
+def queue_export(document_id, kind):
+    """Write a document export to its file, for downloading once it's done."""
+    from biblios.services.exports import write_export
+
+    write_export(document_id, kind)
+
+
 @periodic_task(crontab(minute="*/10"))
 def check_timeouts():
-    """Periodically clean out any timed-out extraction handles from the Huey store."""
+    """Periodically clean out any timed-out extraction handles, and stale document extractions and exports, from the Huey store."""
     from datetime import datetime, timedelta
     from pickle import loads
 
+    from biblios.services.exports import EXPORT_TIMEOUT
+    from biblios.services.extraction import (
+        DOCUMENT_EXTRACTION_TIMEOUT,
+        clear_document_extraction,
+    )
+
     for task, start_time in huey.all_results().items():
         if task.startswith("extracting-") and datetime.today() - loads(
             start_time
         ) > timedelta(minutes=10):
             huey.get(task)
+        elif task.startswith("document-extraction-") and "-lane-" not in task:
+            state = loads(start_time)
+            if datetime.today() - state["started"] > DOCUMENT_EXTRACTION_TIMEOUT:
+                clear_document_extraction(task)
+        elif task.startswith("export-"):
+            state = loads(start_time)
+            if datetime.today() - state["started"] > EXPORT_TIMEOUT:
+                huey.get(task)
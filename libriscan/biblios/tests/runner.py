@@ -0,0 +1,16 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class BibliosTestRunner(DiscoverRunner):
+    """Runs the tests with the suggestion cache turned off, so they never write to a developer's real one."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Tests of the cache itself give it a file of their own
+        self.suggestion_cache = override_settings(SUGGESTION_CACHE=None)
+        self.suggestion_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.suggestion_cache.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,11 @@
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.db.utils import IntegrityError
 
@@ -26,6 +33,8 @@ class BibliosTests(TestCase):
     fixtures = ["orgs", "collections", "series", "docs", "pages", "text"]
 
     def setUp(self):
+        # Revisions start over with each test's database, so cached text from an earlier test could look current
+        cache.clear()
         self.factory = RequestFactory()
         self.user = get_user_model().objects.create_user(
             email="test@crimson-vision.tech", password="my-luggage-combo"
@@ -156,6 +165,124 @@ class BibliosTests(TestCase):
         self.assertEqual(word.text, new_text)
         self.assertEqual(word.confidence, Decimal(str(word.CONF_ACCEPTED)))
 
+    def test_latest_doc(self):
+        """The home page links to the last document the user edited, even once someone else has edited it after them."""
+        from biblios.views import index
+
+        def latest_doc():
+            request = self.factory.get("/")
+            request.user = self.user
+            with patch("biblios.views.base.render") as render:
+                index(request)
+            return render.call_args.args[2]["latest_doc"]
+
+        self.assertIsNone(latest_doc())
+
+        word = TextBlock.objects.get(id=1)
+        other = get_user_model().objects.create_user(
+            email="other@crimson-vision.tech", password="my-luggage-combo"
+        )
+        Page.objects.filter(id=word.page_id).touch(self.user, word)
+        Page.objects.filter(id=word.page_id).touch(other, word)
+
+        self.assertEqual(Page.objects.get(id=word.page_id).last_edited_by, other)
+        self.assertEqual(latest_doc(), word.page.document)
+
+    def test_word_edit_touches_page(self):
+        """Editing a word marks its page and document as edited, without saving them."""
+        word = TextBlock.objects.get(id=1)
+        Document.objects.filter(id=word.page.document_id).update(
+            last_edited_by=self.user
+        )
+        page_history = word.page.history.count()
+        doc_history = word.page.document.history.count()
+
+        with self.settings(STORE_SUGGESTIONS=False):
+            word.text = "KNOW"
+            word.review = True
+            # Reading the word as it was, saving it and its history,
+            # adding the difference to the page's and document's stats, and touching the page and document
+            with self.assertNumQueries(7):
+                word.save()
+
+            # Edits that don't change what's counted leave the stats alone
+            word.text = "KNEW"
+            with self.assertNumQueries(5):
+                word.save()
+            word.text_type = TextBlock.PRINTED
+            with self.assertNumQueries(4):
+                word.save(update_fields=["text_type"])
+
+        page = Page.objects.get(id=word.page_id)
+        self.assertIsNotNone(page.last_edited)
+        self.assertIsNotNone(page.document.last_edited)
+        # There's no request here, so there's no editor to replace the last one with
+        self.assertEqual(page.document.last_edited_by, self.user)
+        self.assertEqual(page.history.count(), page_history)
+        self.assertEqual(page.document.history.count(), doc_history)
+
+    def test_update_words(self):
+        """Test applying a batch of word edits from the front end, all or nothing."""
+        from biblios.views import update_words
+        import json
+
+        page = Page.objects.get(id=1)
+        keys = (
+            page.document.collection.owner.short_name,
+            page.document.collection.slug,
+            page.document.identifier,
+            page.number,
+        )
+        # The fixture words have no history, like words extracted with EXTRACTION_HISTORY_SUMMARY on
+        page.words.update(has_history=False)
+        first, second = page.words.all()[:2]
+
+        def post(operations):
+            request = self.factory.post(
+                "update_words",
+                json.dumps({"operations": operations}),
+                content_type="application/json",
+            )
+            request.user = self.user
+            return update_words(request, *keys)
+
+        response = post(
+            [
+                {"id": first.id, "op": "text", "value": "FIRST"},
+                {"id": first.id, "op": "text", "value": "KNOW"},
+                {"id": first.id, "op": "review", "value": True},
+                {"id": second.id, "op": "print_control", "value": TextBlock.OMIT},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)["words"]
+        self.assertEqual(data[str(first.id)]["text"], "KNOW")
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.text, "KNOW")
+        self.assertTrue(first.review)
+        self.assertEqual(second.print_control, TextBlock.OMIT)
+        # One history record for each word, on top of the creation record
+        self.assertEqual(first.history.count(), 2)
+        self.assertEqual(first.history.earliest().text, "ROW")
+        self.assertEqual(first.history.latest().history_user, self.user)
+
+        # A bad operation stops the whole batch
+        response = post(
+            [
+                {"id": first.id, "op": "text", "value": "CHANGED"},
+                {"id": second.id, "op": "print_control", "value": "X"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        first.refresh_from_db()
+        self.assertEqual(first.text, "KNOW")
+
+        # So does a word that isn't on the page
+        response = post([{"id": 999999, "op": "text", "value": "CHANGED"}])
+        self.assertEqual(response.status_code, 400)
+
     def test_update_print_control(self):
         """Test updating a TextBlock's word visibility control from the front end."""
         from biblios.views import update_print_control
@@ -221,3 +348,692 @@ class BibliosTests(TestCase):
         # Check that the textblock has the "reverted" reason
         latest = word.history.latest()
         self.assertEqual(latest.history_change_reason, "Revert to original")
+
+    def test_word_suggestions(self):
+        """Test fetching a word's suggestions, and a whole line's, on demand."""
+        from biblios.views import word_suggestions, line_suggestions
+        import json
+
+        word = TextBlock.objects.get(id=1)
+        keys = (
+            word.page.document.collection.owner.short_name,
+            word.page.document.collection.slug,
+            word.page.document.identifier,
+            word.page.number,
+        )
+
+        request = self.factory.get("word_suggestions")
+        request.user = self.user
+        response = word_suggestions(request, *keys, word.id)
+
+        self.assertEqual(
+            json.loads(response.content)["suggestions"], dict(word.suggestions)
+        )
+
+        # Words without stored suggestions get them generated
+        TextBlock.objects.filter(id=word.id).update(suggestions={})
+        response = word_suggestions(request, *keys, word.id)
+        self.assertEqual(
+            json.loads(response.content)["suggestions"], dict(word.suggestions)
+        )
+
+        request = self.factory.get("line_suggestions")
+        request.user = self.user
+        response = line_suggestions(request, *keys, word.line)
+        data = json.loads(response.content)["suggestions"]
+
+        self.assertEqual(len(data), word.page.words.filter(line=word.line).count())
+        self.assertEqual(data[str(word.id)], dict(word.suggestions))
+
+    def test_optional_stored_suggestions(self):
+        """When suggestions aren't stored, saving a word clears them instead."""
+        from django.test import override_settings
+
+        word = TextBlock.objects.get(id=1)
+        self.assertTrue(word.suggestions)
+
+        with override_settings(STORE_SUGGESTIONS=False):
+            word.text = "KNOW"
+            word.save()
+
+        word.refresh_from_db()
+        self.assertEqual(word.suggestions, {})
+        self.assertEqual(word.get_suggestions()[0][0], "KNOW")
+
+    def test_document_extraction_views(self):
+        """Test starting a whole-document extraction when there's nothing left to extract."""
+        from huey.contrib.djhuey import HUEY as huey
+
+        from biblios.views import extract_document, document_extraction_status
+
+        # Keep the extraction state in memory, away from the real task queue
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+
+        doc = Document.objects.get(id=1)
+        keys = (doc.collection.owner.short_name, doc.collection.slug, doc.identifier)
+
+        request = self.factory.post("document_extract")
+        request.user = self.user
+        response = extract_document(request, *keys)
+        self.assertEqual(response.status_code, 400)
+
+        request = self.factory.get("document_extraction_status")
+        request.user = self.user
+        response = document_extraction_status(request, *keys)
+        self.assertEqual(response.status_code, 286)
+        self.assertContains(response, "No extraction running", status_code=286)
+
+    async def test_extraction_events(self):
+        """Test the extraction event stream, which tells the page when its text is ready."""
+        from django.urls import reverse
+        from huey.contrib.djhuey import HUEY as huey
+
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+
+        page = await Page.objects.select_related("document__collection__owner").aget(
+            id=1
+        )
+        url = reverse(
+            "page_extraction_events",
+            kwargs={
+                "short_name": page.document.collection.owner.short_name,
+                "collection_slug": page.document.collection.slug,
+                "identifier": page.document.identifier,
+                "number": page.number,
+            },
+        )
+
+        # The page already has words, so the stream says so straight away
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = b"".join([part async for part in response.streaming_content])
+        self.assertIn(b"event: finished\ndata: 1\n\n", events)
+
+        # Pages that are still extracting don't get an event yet
+        await sync_to_async(huey.put)(page.extraction_key, "running")
+        self.addCleanup(huey.get, page.extraction_key)
+        with patch("biblios.services.extraction.EXTRACTION_EVENTS_TIMEOUT", 0):
+            response = await self.async_client.get(url)
+            events = b"".join([part async for part in response.streaming_content])
+        self.assertNotIn(b"event:", events)
+
+        # Servers that can't stream tell the page to keep polling
+        await sync_to_async(self.client.force_login)(self.user)
+        response = await sync_to_async(self.client.get)(url)
+        events = b"".join(response.streaming_content)
+        self.assertIn(b"event: unsupported", events)
+
+    def test_check_words_revisions(self):
+        """Test that a page's text is only sent again once its words have changed."""
+        from biblios.views import check_words
+
+        page = Page.objects.get(id=1)
+        keys = (
+            page.document.collection.owner.short_name,
+            page.document.collection.slug,
+            page.document.identifier,
+            page.number,
+        )
+
+        def get(**headers):
+            request = self.factory.get("page_words", **headers)
+            request.user = self.user
+            return check_words(request, *keys)
+
+        response = get()
+        self.assertEqual(response.status_code, 286)
+        etag = response["ETag"]
+
+        # Nothing has changed, so there's no need to send it again
+        self.assertEqual(get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        word = page.words.first()
+        word.text = "KNOW"
+        word.save()
+
+        response = get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 286)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, 'data-word-text="KNOW"', status_code=286)
+
+    def test_cached_page_text(self):
+        """Test that a page's words are only rendered again after one of them changes."""
+        from biblios.views import check_words
+
+        page = Page.objects.get(id=1)
+        keys = (
+            page.document.collection.owner.short_name,
+            page.document.collection.slug,
+            page.document.identifier,
+            page.number,
+        )
+
+        def get():
+            request = self.factory.get("page_words")
+            request.user = self.user
+            with CaptureQueriesContext(connection) as queries:
+                response = check_words(request, *keys)
+            # Loading the words selects their text; checking whether there are any doesn't
+            loaded = any('"biblios_textblock"."text"' in q["sql"] for q in queries)
+            return response, loaded
+
+        response, loaded = get()
+        self.assertTrue(loaded)
+        cached, loaded = get()
+        self.assertFalse(loaded)
+        self.assertEqual(cached.content, response.content)
+
+        word = page.words.first()
+        word.text = "KNOW"
+        word.save()
+
+        response, loaded = get()
+        self.assertTrue(loaded)
+        self.assertContains(response, 'data-word-text="KNOW"', status_code=286)
+
+    def test_last_edited_word(self):
+        """Test that the page view goes back to the user's last edited word, or else anyone's."""
+        from biblios.services.edits import apply_word_edits
+        from biblios.views import PageDetail
+
+        page = Page.objects.get(id=1)
+        first, second = page.words.all()[:2]
+        other = get_user_model().objects.create_user(
+            email="other@crimson-vision.tech", password="my-other-luggage"
+        )
+
+        def last_edited_word_id():
+            request = self.factory.get("page")
+            request.user = self.user
+            view = PageDetail()
+            view.setup(request)
+            view.object = Page.objects.get(id=1)
+            return view.get_context_data()["last_edited_word_id"]
+
+        self.assertIsNone(last_edited_word_id())
+
+        # Someone else's edit is the only one, so that's where to start
+        apply_word_edits(page, [{"id": first.id, "op": "review", "value": True}], other)
+        self.assertEqual(last_edited_word_id(), first.id)
+
+        apply_word_edits(
+            page, [{"id": second.id, "op": "review", "value": True}], self.user
+        )
+        apply_word_edits(
+            page, [{"id": first.id, "op": "review", "value": False}], other
+        )
+        page.refresh_from_db()
+        self.assertEqual(page.last_edited_word_id, first.id)
+        self.assertEqual(last_edited_word_id(), second.id)
+
+    def test_query_plans(self):
+        """Test that the busiest queries are answered from indexes, not by scanning whole tables."""
+        from django.db.models import Subquery
+
+        page = Page.objects.get(id=1)
+        document = page.document
+        hot_queries = {
+            "page words": page.words.all(),
+            "printable words": page.words.filter(print_control=TextBlock.INCLUDE),
+            "flagged words": page.words.filter(review=True),
+            "recent edits": TextBlock.history.filter(history_user=self.user)
+            .select_related("page__document")
+            .order_by("-history_date"),
+            "needs review": Document.objects.filter(
+                collection__owner__in=Subquery(
+                    UserRole.objects.filter(user=self.user).values("organization")
+                ),
+                status=Document.REVIEW,
+            ),
+            "page by URL": Page.objects.select_related("document").filter(
+                document__collection__owner__short_name=document.collection.owner.short_name,
+                document__collection__slug=document.collection.slug,
+                document__identifier=document.identifier,
+                number=page.number,
+            ),
+        }
+        for name, queryset in hot_queries.items():
+            with self.subTest(name):
+                # SQLite's plan says SCAN for each table it reads through from start to end
+                plan = queryset.explain()
+                self.assertNotRegex(plan, r"\bSCAN\b", plan)
+
+    def test_word_geometry(self):
+        """Test that word bounding boxes are stored as whole millionths, and read back as fractions of the page."""
+        word = Page.objects.get(id=1).words.first()
+        word.geo_x_0 = 0.1234564
+        word.geo_x_1 = 1
+        word.save()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT geo_x_0, geo_x_1 FROM biblios_textblock WHERE id = %s",
+                [word.id],
+            )
+            self.assertEqual(cursor.fetchone(), (123456, 1000000))
+
+        word.refresh_from_db()
+        self.assertIsInstance(word.geo_y_0, float)
+        self.assertEqual(word.bbox, (0.123456, word.geo_y_0, 1.0, word.geo_y_1))
+        self.assertEqual(word.bbox_in(1000, 2000)[:3:2], (123.456, 1000.0))
+
+    def test_export_text(self):
+        """Test that a document's text is generated from one query for its words, a line for each line of words."""
+        from biblios.services.exporters import document_text
+
+        page = Page.objects.get(id=1)
+        omitted = page.words.last()
+        omitted.print_control = TextBlock.OMIT
+        omitted.save()
+
+        # One query for the words, and one for the pages
+        with self.assertNumQueries(2):
+            text = "".join(document_text(page.document))
+
+        # Only the first page has words, so the others are blank lines
+        lines = {}
+        for word in page.words.filter(print_control=TextBlock.INCLUDE):
+            lines.setdefault(word.line, []).append(word.text)
+        expected = [" ".join(words) for words in lines.values()]
+        expected += [""] * (page.document.pages.count() - 1)
+        self.assertEqual(text.splitlines(), expected)
+
+    def test_background_export(self):
+        """Test that exports are written to a file in the background, and reused until the document changes."""
+        import tempfile
+        from django.test import override_settings
+        from huey.contrib.djhuey import HUEY as huey
+
+        from biblios.services.exports import (
+            export_key,
+            export_path,
+            export_progress,
+            start_export,
+        )
+        from biblios.views import download_export, export_document
+
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+
+        page = Page.objects.get(id=1)
+        document = page.document
+        keys = (
+            document.collection.owner.short_name,
+            document.collection.slug,
+            document.identifier,
+        )
+
+        def request(method="get"):
+            request = getattr(self.factory, method)("export")
+            request.user = self.user
+            return request
+
+        with override_settings(MEDIA_ROOT=media.name):
+            self.assertIsNone(export_progress(document, "text"))
+
+            # Only one request at a time can start an export
+            with huey.lock_task(export_key(document, "text")):
+                self.assertIsNone(start_export(document, "text"))
+            self.assertFalse(export_path(document, "text").exists())
+
+            response = export_document(request("post"), *keys, "text")
+            self.assertContains(response, "Download")
+            path = export_path(document, "text")
+            self.assertTrue(path.exists())
+
+            response = download_export(request(), *keys, "text")
+            self.assertEqual(
+                response["Content-Disposition"],
+                f'attachment; filename="{document.identifier}.txt"',
+            )
+            self.assertIn(page.words.first().text, b"".join(response).decode())
+            response.close()
+
+            # An edit moves the document on to a new revision, so the old file is replaced
+            word = page.words.first()
+            word.text = "KNOW"
+            word.save()
+            document.refresh_from_db()
+            self.assertIsNone(export_progress(document, "text"))
+
+            response = download_export(request(), *keys, "text")
+            self.assertIn("KNOW", b"".join(response).decode().split())
+            self.assertFalse(path.exists())
+            self.assertTrue(export_path(document, "text").exists())
+            response.close()
+
+            # So does deleting a page
+            self.assertTrue(export_progress(document, "text")["ready"])
+            page.delete()
+            document.refresh_from_db()
+            self.assertIsNone(export_progress(document, "text"))
+
+    def test_export_out_of_order(self):
+        """Test that an export job of an older revision, finishing late, leaves a newer revision's export alone."""
+        import tempfile
+        from django.test import override_settings
+        from huey.contrib.djhuey import HUEY as huey
+
+        from biblios.services import exports
+        from biblios.services.exports import (
+            export_key,
+            export_path,
+            export_progress,
+            start_export,
+            write_export,
+        )
+
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+
+        document = Document.objects.get(id=1)
+        old_revision = document.revision
+        key = export_key(document, "text")
+
+        def finish_old_job():
+            """Run the job as it would have, having read the document before the edit."""
+            Document.objects.filter(id=document.id).update(revision=old_revision)
+            try:
+                return write_export(document.id, "text")
+            finally:
+                Document.objects.filter(id=document.id).update(
+                    revision=old_revision + 1
+                )
+
+        with override_settings(MEDIA_ROOT=media.name):
+            Document.objects.filter(id=document.id).touch()
+            document.refresh_from_db()
+
+            # The newer revision's job is still running when the older one finishes
+            huey.put(key, {"started": datetime.today(), "revision": document.revision})
+            self.assertIsNotNone(finish_old_job())
+            self.assertEqual(export_progress(document, "text")["error"], None)
+            self.assertFalse(export_progress(document, "text")["ready"])
+
+            # Nor does an older job's failure replace it
+            with patch.dict(
+                exports.EXPORTS, {"text": ("txt", Mock(side_effect=OSError("full")))}
+            ):
+                self.assertIsNone(finish_old_job())
+            self.assertIsNone(export_progress(document, "text")["error"])
+            huey.get(key)
+
+            # The newer revision's job finished first
+            self.assertTrue(start_export(document, "text")["ready"])
+            path = export_path(document, "text")
+            finish_old_job()
+            self.assertTrue(path.exists())
+            self.assertTrue(export_progress(document, "text")["ready"])
+
+    def test_pdf_process_pool(self):
+        """Test that rendering a PDF's pages across worker processes gives the same PDF as rendering them in order."""
+        import io
+        import tempfile
+        from PIL import Image
+        from pymupdf import Document as PdfDocument
+
+        from biblios.services.pdf_pages import render_pdf
+
+        images = tempfile.TemporaryDirectory()
+        self.addCleanup(images.cleanup)
+        pages = []
+        for number in range(5):
+            path = f"{images.name}/{number}.png"
+            Image.new("RGB", (400 + number, 600), "white").save(path)
+            words = [(f"page{number}", "cour", 0.1, 0.1, 0.5)]
+            pages.append((path, words, f"{images.name}/derived/{number}.jpg"))
+
+        def render(workers):
+            output = io.BytesIO()
+            render_pdf(pages, output, workers=workers)
+            pdf = PdfDocument(stream=output.getvalue())
+            return [(page.rect.width, page.get_text().strip()) for page in pdf]
+
+        expected = [(400 + n, f"page{n}") for n in range(5)]
+        self.assertEqual(render(1), expected)
+        self.assertEqual(render(2), expected)
+
+    def test_pdf_profiles(self):
+        """Test that export profiles scale down page images once, and reuse them after."""
+        import io
+        import tempfile
+        from PIL import Image
+        from pymupdf import Document as PdfDocument
+
+        from biblios.services.pdf_pages import render_pdf
+
+        images = tempfile.TemporaryDirectory()
+        self.addCleanup(images.cleanup)
+        path = f"{images.name}/scan.png"
+        Image.new("RGB", (1200, 1800), "white").save(path, dpi=(600, 600))
+        derived = f"{images.name}/derived/scan.jpg"
+        pages = [(path, [("word", "cour", 0.1, 0.1, 0.5)], derived)]
+
+        def render(profile):
+            output = io.BytesIO()
+            render_pdf(pages, output, profile)
+            pdf = PdfDocument(stream=output.getvalue())
+            return pdf[0].rect.width, pdf[0].get_images(), output.getvalue()
+
+        width, images_used, archival = render("archival")
+        self.assertEqual(width, 1200)
+        self.assertEqual(images_used[0][2:4], (1200, 1800))
+
+        # Scaled from 600dpi to 150dpi, on a page that's still the same size
+        width, images_used, web = render("web")
+        self.assertEqual(width, 1200)
+        self.assertEqual(images_used[0][2:4], (300, 450))
+        self.assertLess(len(web), len(archival))
+
+        # The scaled down image is kept, and used again
+        with patch("PIL.Image.Image.save") as save:
+            render("web")
+        save.assert_not_called()
+
+        width, images_used, text = render("text")
+        self.assertEqual(images_used, [])
+
+        # 16-bit greyscale scans are scaled down to 8 bits, not clipped to white
+        from biblios.services.pdf_pages import PROFILES, derive_image
+
+        grey = f"{images.name}/grey.png"
+        Image.new("I;16", (100, 100), 32768).save(grey)
+        derive_image(grey, f"{images.name}/grey.jpg", PROFILES["web"])
+        with Image.open(f"{images.name}/grey.jpg") as image:
+            self.assertEqual(image.mode, "L")
+            self.assertAlmostEqual(image.getpixel((10, 10)), 128, delta=2)
+
+    def test_derived_image_cleanup(self):
+        """Test that scaled-down page images are removed once no export will use them again."""
+        import tempfile
+        from pathlib import Path
+        from django.test import override_settings
+
+        from biblios.services.exporters import (
+            derived_image_dir,
+            derived_image_path,
+            pdf_pages,
+        )
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        page = Page.objects.get(id=1)
+        page.image = "pages/first.png"
+        page.save()
+        directory = derived_image_dir(page)
+        directory.mkdir(parents=True)
+        current = Path(derived_image_path(page, "web"))
+        stale = directory / "0123456789abcdef-300dpi-90q.jpg"
+        writing = directory / f".{current.name}.tmp"
+        for path in (current, stale, writing):
+            path.touch()
+
+        # An export clears out copies made with other settings, but not ones being written
+        pdf_pages(page.document, "web")
+        self.assertEqual(set(directory.iterdir()), {current, writing})
+
+        # A new image makes the old one's copies useless
+        page.image = "pages/second.png"
+        page.save()
+        self.assertEqual(set(directory.iterdir()), {writing})
+
+        page.delete()
+        self.assertFalse(directory.exists())
+
+    def test_many_pages_queries(self):
+        """Test that listing and exporting a 200-page document takes the same few queries as a short one."""
+        from django.conf import settings
+        from django.test import override_settings
+        from django.urls import reverse
+
+        from biblios.services.exporters import pdf_pages
+
+        document = Document.objects.create(
+            collection=Document.objects.first().collection, identifier="long"
+        )
+        for number in range(1, 201):
+            Page.objects.create(
+                document=document, number=number, image="pages/long.jpg"
+            )
+        TextBlock.objects.bulk_create(
+            TextBlock(
+                page=page,
+                text=f"{page.number}-{n}",
+                text_type=TextBlock.PRINTED,
+                line=n // 10,
+                number=n % 10,
+                confidence=99,
+                print_control=TextBlock.OMIT if n == 0 else TextBlock.INCLUDE,
+                geo_x_0=0.1,
+                geo_y_0=0.1,
+                geo_x_1=0.2,
+                geo_y_1=0.2,
+            )
+            for page in document.pages.all()
+            for n in range(30)
+        )
+        # Counted once they're all in, as extraction does
+        document.pages.refresh_stats()
+
+        # One query for the pages, and one for all of their words
+        with self.assertNumQueries(2):
+            pages = pdf_pages(document)
+        self.assertEqual(len(pages), 200)
+        self.assertEqual(len(pages[0][1]), 29)
+
+        # Only the words in the snippets are loaded, and the omitted word is left out
+        with self.assertNumQueries(2):
+            pages = list(document.pages.with_snippets())
+            snippets = [page.snippet for page in pages]
+        self.assertEqual(len(pages[0].snippet_words), Page.SNIPPET_LENGTH)
+        first = " ".join(f"1-{n}" for n in range(1, 11))
+        last = " ".join(f"1-{n}" for n in range(20, 30))
+        self.assertEqual(snippets[0], f"{first} ... {last}")
+        self.assertEqual(Page.objects.get(id=pages[0].id).snippet, snippets[0])
+        self.assertTrue(pages[0].has_extraction)
+
+        # The page doesn't need its static files built to be rendered here
+        storages = {
+            **settings.STORAGES,
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+        self.enterContext(override_settings(STORAGES=storages))
+        self.client.force_login(self.user)
+        url = reverse(
+            "document",
+            args=(
+                document.collection.owner.short_name,
+                document.collection.slug,
+                document.identifier,
+            ),
+        )
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertContains(response, snippets[-1])
+
+        document.pages.filter(number__gt=2).delete()
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+    def test_text_stats(self):
+        """Test that page and document word counts are kept up to date as words change."""
+        from biblios.models import DocumentStats, PageStats
+        from biblios.services.edits import apply_word_edits, merge_words
+
+        page = Page.objects.get(id=1)
+        document = page.document
+
+        def live(words):
+            return {
+                "word_count": words.count(),
+                "included_count": words.filter(print_control=TextBlock.INCLUDE).count(),
+                "flagged_count": words.filter(review=True).count(),
+                "low_confidence_count": words.filter(
+                    confidence__lt=TextBlock.CONF_MEDIUM
+                ).count(),
+            }
+
+        def counted(stats):
+            return {field: getattr(stats, field) for field in live(page.words)}
+
+        # The fixture words were loaded without stats, so they're counted whenever they're needed, but never saved
+        self.assertEqual(counted(page.text_stats), live(page.words))
+        self.assertEqual(counted(document.text_stats), live(page.words))
+        self.assertAlmostEqual(
+            page.text_stats.mean_confidence,
+            float(sum(w.confidence for w in page.words.all()) / page.words.count()),
+        )
+        self.assertFalse(PageStats.objects.filter(page=page).exists())
+        self.assertFalse(DocumentStats.objects.filter(document=document).exists())
+
+        # A new page starts with stats of its own
+        blank = Page.objects.create(document=document, number=page.number + 1)
+        self.assertTrue(PageStats.objects.filter(page=blank).exists())
+        self.assertEqual(blank.text_stats.word_count, 0)
+        self.assertIsNone(blank.text_stats.mean_confidence)
+
+        word = page.words.first()
+        word.review = True
+        word.save(update_fields=["review"])
+        apply_word_edits(
+            page, [{"id": page.words.last().id, "op": "print_control", "value": "O"}]
+        )
+        right = page.words.filter(line=0, print_control=TextBlock.INCLUDE)[1]
+        merge_words(right)
+        self.assertEqual(page.text_stats.flagged_count, 1)
+
+        # The changes added up to what counting the words again gives
+        added = (page.text_stats, document.text_stats)
+        self.assertEqual(counted(added[0]), live(page.words))
+        self.assertEqual(counted(added[1]), live(page.words))
+        document.pages.refresh_stats()
+        for stats in added:
+            self.assertAlmostEqual(
+                stats.mean_confidence, page.text_stats.mean_confidence
+            )
+
+        # Listed pages come with their stats
+        with self.assertNumQueries(2):
+            pages = list(document.pages.with_snippets())
+            self.assertTrue(pages[0].has_extraction)
+            self.assertFalse(pages[1].has_extraction)
+
+        # As does a new document
+        new = Document.objects.create(collection=document.collection, identifier="new")
+        self.assertEqual(DocumentStats.objects.get(document=new).word_count, 0)
+
+        page.delete()
+        self.assertEqual(document.text_stats.word_count, 0)
+        self.assertFalse(document.can_export)
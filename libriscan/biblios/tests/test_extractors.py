@@ -1,11 +1,34 @@
 import json
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from threading import Thread
 
-from django.test import TestCase
+import pymupdf
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from huey.contrib.djhuey import HUEY as huey
+from huey.exceptions import TaskLockedException
+from pymupdf import Pixmap
+from simple_history.utils import bulk_create_with_history
 
 from unittest.mock import patch
 
-from biblios.models import Document, Page
-from biblios.services.extractors import AWSExtractor
+from biblios.models import CloudService, Document, Page, TextBlock
+from biblios.services.extraction import (
+    document_extraction_key,
+    extract_lane,
+    extraction_slot_key,
+)
+from biblios.services.extractors import (
+    AWSExtractor,
+    AWSJobExtractor,
+    JSONArrayStream,
+    TestExtractor,
+    get_textract_client,
+    invalidate_aws_clients,
+)
+from biblios.tests.textract_stub import TextractStub
 
 
 class AWSExtractorTests(TestCase):
@@ -29,8 +52,398 @@ class AWSExtractorTests(TestCase):
             aws = AWSExtractor(self.page)
 
             words = aws.get_words()
-            self.assertEqual(len(words), 387)
+            self.assertEqual(words, 387)
 
             blocks = self.page.words.all()
             self.assertEqual(blocks.first().text, "ROW")
             self.assertEqual(blocks.count(), 387)
+
+    def test_json_stream(self):
+        """Streaming a response file gives the same blocks as loading it, however it's split into reads."""
+        with open("biblios/tests/textract_response.json") as j:
+            blocks = json.load(j)["Blocks"]
+
+        stream = JSONArrayStream("biblios/tests/textract_response.json", "Blocks")
+        for read_size in (37, 1000, JSONArrayStream.READ_SIZE):
+            with patch.object(JSONArrayStream, "READ_SIZE", read_size):
+                self.assertEqual(list(stream), blocks)
+
+    def test_streamed_extraction(self):
+        """Words from a streamed response are saved a chunk at a time, numbered the same as a loaded one."""
+        with open("biblios/tests/textract_response.json") as j:
+            blocks = json.load(j)["Blocks"]
+        with patch.object(AWSExtractor, "__get_extraction__", return_value=blocks):
+            AWSExtractor(self.page).get_words()
+        loaded = list(self.page.words.values_list("text", "line", "number"))
+
+        streamed_page = Page.objects.create(document=self.page.document, number=2)
+        with override_settings(EXTRACTION_BATCH_SIZE=100), patch(
+            "biblios.services.extractors.bulk_create_with_history",
+            wraps=bulk_create_with_history,
+        ) as bulk_create:
+            self.assertEqual(TestExtractor(streamed_page).get_words(), 387)
+
+        self.assertEqual(bulk_create.call_count, 4)
+        self.assertEqual(
+            list(streamed_page.words.values_list("text", "line", "number")), loaded
+        )
+
+    @override_settings(EXTRACTION_HISTORY_SUMMARY=True, STORE_SUGGESTIONS=False)
+    def test_history_summary(self):
+        """Summary mode gives the page one history record, and a word gets its own when it's first edited."""
+        self.assertEqual(TestExtractor(self.page).get_words(), 387)
+
+        self.assertFalse(TextBlock.history.filter(page=self.page).exists())
+        self.assertFalse(self.page.words.filter(has_history=True).exists())
+        self.assertEqual(
+            self.page.history.filter(
+                history_change_reason="Extracted 387 words"
+            ).count(),
+            1,
+        )
+
+        word = self.page.words.first()
+        extracted = word.text
+        word.text = "edited"
+        word.save()
+
+        self.assertEqual(word.history.count(), 2)
+        original = word.history.earliest()
+        self.assertEqual(original.text, extracted)
+        self.assertEqual(original.history_type, "+")
+
+        # Once it has, saving it again doesn't look for its history
+        word.refresh_from_db()
+        self.assertTrue(word.has_history)
+        with patch.object(TextBlock, "record_extraction") as record:
+            word.save()
+        record.assert_not_called()
+
+    def test_line_numbering(self):
+        """Words are numbered by their line's position on the page, then their place in the line."""
+
+        def block(block_type, id, top, text=None, children=None):
+            box = {"Top": top, "Left": 0.1, "Width": 0.1, "Height": 0.05}
+            polygon = [{"X": 0.1, "Y": top}] * 4
+            b = {
+                "BlockType": block_type,
+                "Id": id,
+                "Text": text or id,
+                "Confidence": 99.0,
+                "Geometry": {"BoundingBox": box, "Polygon": polygon},
+            }
+            if children:
+                b["Relationships"] = [{"Type": "CHILD", "Ids": children}]
+            return b
+
+        # Lines out of order in the response, the way Textract can return them
+        response = []
+        for top in (0.5, 0.1, 0.3):
+            ids = [f"{top}-{n}" for n in range(3)]
+            response.append(block("LINE", f"line-{top}", top, children=ids))
+            response += [block("WORD", i, top) for i in ids]
+
+        with patch.object(AWSExtractor, "__get_extraction__", return_value=response):
+            AWSExtractor(self.page).get_words()
+
+        numbering = {w.text: (w.line, w.number) for w in self.page.words.all()}
+        self.assertEqual(numbering["0.1-0"], (0, 0))
+        self.assertEqual(numbering["0.3-2"], (1, 2))
+        self.assertEqual(numbering["0.5-1"], (2, 1))
+
+    def test_suggestions_are_deferred(self):
+        """Extraction saves the words straight away, and suggestions are filled in afterwards."""
+        from biblios.services.suggestions import update_page_suggestions
+
+        with open("biblios/tests/textract_response.json") as j:
+            response = json.load(j)
+
+        with patch.object(
+            AWSExtractor, "__get_extraction__", return_value=response["Blocks"]
+        ):
+            AWSExtractor(self.page).get_words()
+
+        self.assertFalse(self.page.words.exclude(suggestions={}).exists())
+
+        updated = update_page_suggestions(self.page)
+
+        self.assertEqual(updated, 387)
+        self.assertFalse(self.page.words.filter(suggestions={}).exists())
+        self.assertEqual(update_page_suggestions(self.page), 0)
+
+
+@override_settings(STORE_SUGGESTIONS=False)
+class DocumentExtractionTests(TestCase):
+    fixtures = ["orgs", "collections", "series", "docs"]
+
+    def setUp(self):
+        # Run the queued tasks in-process
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+
+        self.doc = Document.objects.first()
+        self.pages = [
+            Page.objects.create(document=self.doc, number=n) for n in range(1, 6)
+        ]
+
+        with open("biblios/tests/textract_response.json") as j:
+            self.blocks = json.load(j)["Blocks"]
+
+    def extraction(self):
+        # Every page shares the same response; extracting one mustn't change it for the next
+        return self.blocks
+
+    def test_extract_document(self):
+        """Every page gets extracted, split across the organization's lanes."""
+        service = CloudService.objects.get(organization=self.doc.collection.owner)
+        service.concurrency = 2
+        service.save()
+
+        with patch.object(
+            AWSExtractor, "__get_extraction__", side_effect=self.extraction
+        ):
+            progress = self.doc.generate_extraction()
+
+        self.assertEqual(progress["total"], 5)
+        self.assertEqual(progress["processed"], 5)
+        self.assertEqual(progress["failed"], 0)
+        self.assertTrue(progress["finished"])
+        self.assertEqual(
+            huey.get(document_extraction_key(self.doc), peek=True)["lanes"], 2
+        )
+        for page in self.pages:
+            self.assertEqual(page.words.count(), 387)
+
+        # Nothing's left to extract the second time around
+        self.assertIsNone(self.doc.generate_extraction())
+
+    def test_extract_document_failures(self):
+        """A page that fails is counted, and doesn't stop the rest of its lane."""
+        responses = [self.extraction(), Exception("Service unavailable")]
+        responses += [self.extraction() for _ in range(3)]
+
+        with patch.object(AWSExtractor, "__get_extraction__", side_effect=responses):
+            progress = self.doc.generate_extraction()
+
+        self.assertEqual(progress["processed"], 5)
+        self.assertEqual(progress["failed"], 1)
+        self.assertEqual(
+            Page.objects.filter(document=self.doc, words__isnull=True).count(), 1
+        )
+        # The failed page's handle is cleared so the page view can report the failure
+        for page in self.pages:
+            self.assertIsNone(huey.get(page.extraction_key, peek=True))
+
+    @override_settings(HUEY_WORKERS=3)
+    def test_extraction_lanes(self):
+        """A document never takes every Huey worker, whatever the organization's concurrency."""
+        service = CloudService.objects.get(organization=self.doc.collection.owner)
+        service.concurrency = 8
+        service.save()
+
+        with patch.object(
+            AWSExtractor, "__get_extraction__", side_effect=self.extraction
+        ):
+            self.doc.generate_extraction()
+
+        self.assertEqual(
+            huey.get(document_extraction_key(self.doc), peek=True)["lanes"], 2
+        )
+
+    def test_lane_failure(self):
+        """A lane that stops on an error counts its pages as failed, so the document's extraction finishes."""
+        with patch(
+            "biblios.services.extraction.extract_pages",
+            side_effect=RuntimeError("Database is locked"),
+        ):
+            progress = self.doc.generate_extraction()
+
+        self.assertEqual(progress["processed"], 5)
+        self.assertEqual(progress["failed"], 5)
+        self.assertTrue(progress["finished"])
+
+    def test_extraction_slots(self):
+        """A lane takes any free slot for the organization, and waits while they're all busy."""
+        org_id = self.doc.collection.owner_id
+        service = CloudService.objects.get(organization_id=org_id)
+        service.concurrency = 2
+        service.save()
+
+        busy = extraction_slot_key(org_id, 0)
+        huey.put(busy, datetime.today())
+        self.addCleanup(huey.get, busy)
+        huey.put(extraction_slot_key(org_id, 1), datetime.today())
+
+        with self.assertRaises(TaskLockedException):
+            extract_lane(org_id, 0, [self.pages[0].id], "test-lane")
+        self.assertTrue(self.pages[0].can_extract)
+
+        # Once it's out of retries, its pages have failed
+        progress = extract_lane(
+            org_id, 0, [self.pages[0].id], "test-lane", last_try=True
+        )
+        self.assertEqual(progress, {"processed": 1, "failed": 1})
+
+        # Lane 0 isn't tied to slot 0, so it can take slot 1 once that's free
+        huey.get(extraction_slot_key(org_id, 1))
+        with patch.object(
+            AWSExtractor, "__get_extraction__", side_effect=self.extraction
+        ):
+            extract_lane(org_id, 0, [self.pages[0].id], "test-lane")
+        self.assertFalse(self.pages[0].can_extract)
+        self.assertIsNone(huey.get(extraction_slot_key(org_id, 1), peek=True))
+        self.assertIsNotNone(huey.get(busy, peek=True))
+
+
+class TextractClientTests(TestCase):
+    fixtures = ["orgs", "collections", "series", "docs"]
+
+    def setUp(self):
+        self.service = CloudService.objects.get(id=1)
+        self.addCleanup(invalidate_aws_clients, self.service)
+
+    def test_client_reuse(self):
+        """Each CloudService gets one client, shared across threads, until its record changes."""
+        client = get_textract_client(self.service)
+        self.assertIs(get_textract_client(self.service), client)
+
+        others = []
+        thread = Thread(target=lambda: others.append(get_textract_client(self.service)))
+        thread.start()
+        thread.join()
+        self.assertIs(others[0], client)
+
+        # Saving the record replaces the client
+        self.service.save()
+        replacement = get_textract_client(self.service)
+        self.assertIsNot(replacement, client)
+
+        # So do credentials changed behind the model's back, e.g. by another process
+        CloudService.objects.filter(id=self.service.id).update(client_secret="567")
+        self.service.refresh_from_db()
+        self.assertIsNot(get_textract_client(self.service), replacement)
+
+    def test_stub_endpoint(self):
+        """Pages extracted through a shared client reuse its connection."""
+        doc = Document.objects.first()
+        pages = [Page.objects.create(document=doc, number=n) for n in range(1, 4)]
+
+        with TextractStub() as stub, override_settings(
+            AWS_ENDPOINT_URLS={"textract": stub.url}
+        ):
+            for page in pages:
+                page.image = SimpleUploadedFile("page.jpg", b"image")
+                AWSExtractor(page).get_words()
+
+        self.assertEqual(stub.requests, ["DetectDocumentText"] * 3)
+        self.assertEqual(stub.connections, 1)
+        for page in pages:
+            self.assertEqual(page.words.count(), 387)
+
+
+class AWSJobExtractorTests(TestCase):
+    fixtures = ["orgs", "collections", "series", "docs"]
+
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        self.service = CloudService.objects.get(id=1)
+        self.service.service = CloudService.AWS_JOBS
+        self.service.bucket = "libriscan-test"
+        self.service.save()
+
+        self.stub = self.enterContext(TextractStub(job_polls=2))
+        self.enterContext(
+            override_settings(
+                AWS_ENDPOINT_URLS={"textract": self.stub.url, "s3": self.stub.url}
+            )
+        )
+        self.enterContext(patch.object(AWSJobExtractor, "POLL_INTERVAL", 0))
+        self.addCleanup(invalidate_aws_clients, self.service)
+
+        # Small blank page images to send to the job
+        image = Pixmap(pymupdf.csRGB, (0, 0, 40, 60)).tobytes("png")
+        doc = Document.objects.first()
+        self.pages = [
+            Page.objects.create(
+                document=doc,
+                number=n,
+                image=SimpleUploadedFile(f"page{n}.png", image),
+            )
+            for n in range(1, 4)
+        ]
+
+    def test_extract_pages(self):
+        """One job covers all the pages, and each page gets its own share of the results."""
+        results = []
+        AWSJobExtractor.extract_pages(
+            self.pages, on_page=lambda page, result: results.append((page, result))
+        )
+
+        self.assertEqual([page for page, result in results], self.pages)
+        for page, words in results:
+            self.assertEqual(words, 387)
+            self.assertEqual(page.words.count(), 387)
+            self.assertEqual(page.words.first().text, "ROW")
+
+        requests = self.stub.requests
+        self.assertEqual(requests[:2], ["PutObject", "StartDocumentTextDetection"])
+        self.assertEqual(requests[-1], "DeleteObject")
+        # Two checks while the job's running, then the results over several responses
+        self.assertGreater(requests.count("GetDocumentTextDetection"), 3)
+        self.assertEqual(self.stub.objects, {})
+
+    def test_single_page(self):
+        """Extracting a single page runs a one-page job."""
+        words = AWSJobExtractor(self.pages[1]).get_words()
+
+        self.assertEqual(words, 387)
+        self.assertEqual(self.stub.requests.count("StartDocumentTextDetection"), 1)
+        self.assertFalse(self.pages[0].words.exists())
+
+    def test_job_pages_out_of_order(self):
+        """Pages are yielded once all their blocks arrive, in whatever order Textract returns them, and only once."""
+
+        def block(page, id, type="WORD", children=()):
+            block = {"Page": page, "Id": id, "BlockType": type}
+            if children:
+                block["Relationships"] = [{"Type": "CHILD", "Ids": list(children)}]
+            return block
+
+        blocks = [
+            block(1, "p1", "PAGE", ["l1"]),
+            block(2, "p2", "PAGE", ["l2"]),
+            block(1, "l1", "LINE", ["w1", "w2"]),
+            block(2, "l2", "LINE", ["w3"]),
+            block(1, "w1"),
+            block(2, "w3"),
+            block(3, "w4"),
+            block(1, "w2"),
+            # A repeat of a page that's already been yielded
+            block(2, "w3"),
+        ]
+        pages = list(AWSJobExtractor.job_pages(blocks))
+
+        self.assertEqual([number for number, _ in pages], [2, 1, 3])
+        self.assertEqual([b["Id"] for b in pages[0][1]], ["p2", "l2", "w3"])
+        self.assertEqual([b["Id"] for b in pages[1][1]], ["p1", "l1", "w1", "w2"])
+        # Page 3 never got its PAGE block, so it waits for the end of the results
+        self.assertEqual([b["Id"] for b in pages[2][1]], ["w4"])
+
+    @override_settings(STORE_SUGGESTIONS=False)
+    def test_document_extraction(self):
+        """Whole-document extraction sends each lane's pages as one job."""
+        huey.immediate = True
+        self.addCleanup(setattr, huey, "immediate", False)
+        self.service.concurrency = 1
+        self.service.save()
+
+        progress = self.pages[0].document.generate_extraction()
+
+        self.assertEqual(progress["processed"], 3)
+        self.assertEqual(progress["failed"], 0)
+        self.assertEqual(self.stub.requests.count("StartDocumentTextDetection"), 1)
+        for page in self.pages:
+            self.assertEqual(page.words.count(), 387)
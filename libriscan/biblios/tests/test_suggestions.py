@@ -1,5 +1,6 @@
 from django.test import TestCase
 
+from biblios.models import TextBlock
 from biblios.services.suggestions import long_s_conversion
 
 class SuggestionTests(TestCase):
@@ -22,4 +23,115 @@ class SuggestionTests(TestCase):
             ("theſletter", "thesletter")
         )
         for test, correct in test_words:
-            self.assertEqual(long_s_conversion(test), correct)
\ No newline at end of file
+            self.assertEqual(long_s_conversion(test), correct)
+
+class SuggestionCacheTests(TestCase):
+    fixtures = ["orgs", "collections", "series", "docs", "pages", "text"]
+
+    def setUp(self):
+        import tempfile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = f"{self.tmp.name}/suggestions.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        from biblios.services.suggestion_cache import SuggestionCache
+
+        cache = SuggestionCache(self.filename, 10)
+        self.assertIsNone(cache.get("fong", True, 3))
+
+        cache.set("fong", True, 3, [("song", 100), ("long", 50)])
+        self.assertEqual(cache.get("fong", True, 3), [("song", 100), ("long", 50)])
+
+        # The long-s flag and suggestion count are part of the key
+        self.assertIsNone(cache.get("fong", False, 3))
+        self.assertIsNone(cache.get("fong", True, 5))
+
+    def test_lru_eviction(self):
+        from biblios.services.suggestion_cache import SuggestionCache
+
+        cache = SuggestionCache(self.filename, 2)
+        cache.set("one", False, 3, [])
+        cache.set("two", False, 3, [])
+        cache.set("three", False, 3, [])
+
+        # Make "one" the most recently used, then trim the cache back to size
+        cache.connection.execute(
+            "UPDATE suggestions SET last_used = last_used + 1000 WHERE word = 'one'"
+        )
+        cache.evict()
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("one", False, 3))
+        self.assertIsNone(cache.get("two", False, 3))
+
+    def test_warm_from_textblocks(self):
+        from django.test import override_settings
+
+        from biblios.services.suggestion_cache import (
+            get_suggestion_cache,
+            warm_suggestion_cache,
+        )
+        from biblios.services.suggestions import generate_suggestions
+
+        config = {"filename": self.filename, "max_entries": 1000}
+        with override_settings(SUGGESTION_CACHE=config):
+            self.assertGreater(warm_suggestion_cache(), 0)
+
+            cache = get_suggestion_cache()
+            word = TextBlock.objects.get(id=1)
+            long_s = word.page.document.use_long_s_detection
+            self.assertEqual(
+                cache.get(word.text, long_s, 3),
+                [tuple(s) for s in word.suggestions],
+            )
+
+            # generate_suggestions should be served from the cache
+            cache.set("qwxz", long_s, 3, [("cached", 1)])
+            self.assertEqual(generate_suggestions("qwxz", long_s), [("cached", 1)])
+
+
+class SymSpellTests(TestCase):
+    fixtures = ["orgs", "collections", "series", "docs", "pages", "text"]
+
+    def test_damerau_levenshtein(self):
+        from biblios.services.symspell import damerau_levenshtein
+
+        self.assertEqual(damerau_levenshtein("song", "song"), 0)
+        self.assertEqual(damerau_levenshtein("fong", "song"), 1)
+        self.assertEqual(damerau_levenshtein("teh", "the"), 1)
+        # Edits can overlap, the same as applying two single edits in a row
+        self.assertEqual(damerau_levenshtein("ca", "abc"), 2)
+        self.assertEqual(damerau_levenshtein("", "ab"), 2)
+
+    def test_matches_pyspellchecker(self):
+        """The SymSpell engine should give exactly the same suggestions as pyspellchecker."""
+        from biblios.services.suggestions import find_suggestions
+
+        words = list(
+            TextBlock.objects.values_list("text", flat=True).distinct()[:60]
+        )
+        # Misspellings at edit distances 1 and 2, with punctuation, capitalization and long-s variants
+        words += [
+            "fuccefsful",
+            "Thefe",
+            "acress",
+            "teh",
+            "Ceafe,",
+            "MOFT",
+            "recieve.",
+            "hapenned",
+            "qzxv",
+            "1776",
+        ]
+
+        for word in words:
+            for long_s in (True, False):
+                with self.subTest(word=word, long_s=long_s):
+                    self.assertEqual(
+                        find_suggestions(word, long_s, engine="symspell"),
+                        find_suggestions(word, long_s, engine="pyspellchecker"),
+                    )
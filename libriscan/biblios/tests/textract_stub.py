@@ -0,0 +1,160 @@
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+from pymupdf import Document as PdfDocument
+
+# A canned Textract response, marked with TestData so it can't be mistaken for a real one
+RESPONSE_FILE = "biblios/tests/textract_response.json"
+
+
+class TextractStubHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests, the same way the real endpoint does
+    protocol_version = "HTTP/1.1"
+    # Send each response in one piece, rather than stalling on Nagle's algorithm between the headers and body
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Each handler serves one connection, so this counts how many the clients opened
+        self.server.connections += 1
+
+    def read_body(self):
+        # Always drain the request body so the connection can be reused
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        body = self.read_body()
+        operation = self.headers.get("X-Amz-Target", "").split(".")[-1]
+        self.server.requests.append(operation)
+
+        handler = getattr(self, operation, None)
+        if handler:
+            time.sleep(self.server.latency)
+            self.respond(200, handler(json.loads(body or "{}")))
+        else:
+            self.respond(
+                400,
+                {"__type": "InvalidParameterException", "message": operation},
+            )
+
+    # S3 requests, just enough to hold the documents submitted to jobs
+    def do_PUT(self):
+        self.server.objects[self.path] = self.read_body()
+        self.server.requests.append("PutObject")
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.read_body()
+        self.server.objects.pop(self.path, None)
+        self.server.requests.append("DeleteObject")
+        self.send_response(204)
+        self.end_headers()
+
+    # Textract operations
+    def DetectDocumentText(self, request):
+        return self.server.response
+
+    def StartDocumentTextDetection(self, request):
+        location = request["DocumentLocation"]["S3Object"]
+        pdf = self.server.objects[f"/{location['Bucket']}/{location['Name']}"]
+        job_id = str(uuid4())
+        self.server.jobs[job_id] = {
+            "pages": PdfDocument(stream=pdf).page_count,
+            "polls": 0,
+        }
+        return {"JobId": job_id}
+
+    def GetDocumentTextDetection(self, request):
+        job = self.server.jobs[request["JobId"]]
+        job["polls"] += 1
+        if job["polls"] <= self.server.job_polls:
+            return {"JobStatus": "IN_PROGRESS"}
+
+        # Every page of the job gets the canned response, with its block IDs made unique to the page
+        blocks = []
+        for number in range(1, job["pages"] + 1):
+            for block in copy.deepcopy(self.server.response["Blocks"]):
+                block["Page"] = number
+                block["Id"] = f"{block['Id']}-{number}"
+                for rel in block.get("Relationships", []):
+                    rel["Ids"] = [f"{i}-{number}" for i in rel["Ids"]]
+                blocks.append(block)
+
+        start = int(request.get("NextToken", 0))
+        end = start + request.get("MaxResults", 1000)
+        response = {
+            "JobStatus": "SUCCEEDED",
+            "DocumentMetadata": {"Pages": job["pages"]},
+            "Blocks": blocks[start:end],
+        }
+        if end < len(blocks):
+            response["NextToken"] = str(end)
+        return response
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TextractStub(object):
+    """
+    A local stand-in for the Textract API, and enough of S3 for its document jobs, for tests and benchmarks.
+    Point LB_TEXTRACT_ENDPOINT_URL and LB_S3_ENDPOINT_URL (settings.AWS_ENDPOINT_URLS) at its url.
+
+    `latency` is how many seconds to wait before answering each Textract request.
+    `job_polls` is how many times a document job reports that it's still running before it succeeds.
+    """
+
+    def __init__(self, latency=0, job_polls=1, response_file=RESPONSE_FILE):
+        with open(response_file) as j:
+            response = json.load(j)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), TextractStubHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.response = response
+        self.server.requests = []
+        self.server.connections = 0
+        self.server.job_polls = job_polls
+        self.server.jobs = {}
+        self.server.objects = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def objects(self):
+        return self.server.objects
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
@@ -118,28 +118,61 @@ urlpatterns = [
                                             views.MetadataUpdateView.as_view(),
                                             name="metadata_update",
                                         ),
+                                        path(
+                                            "extract/",
+                                            views.extract_document,
+                                            name="document_extract",
+                                        ),
+                                        path(
+                                            "extract/status/",
+                                            views.document_extraction_status,
+                                            name="document_extraction_status",
+                                        ),
                                         path(
                                             "pdf/",
-                                            views.export_pdf,
-                                            {"use_image": True},
+                                            views.download_export,
+                                            {"kind": "pdf"},
                                             name="export_pdf",
                                         ),
+                                        path(
+                                            "webpdf/",
+                                            views.download_export,
+                                            {"kind": "webpdf"},
+                                            name="export_webpdf",
+                                        ),
                                         path(
                                             "pdftext/",
-                                            views.export_pdf,
-                                            {"use_image": False},
+                                            views.download_export,
+                                            {"kind": "textpdf"},
                                             name="export_textpdf",
                                         ),
                                         path(
                                             "text/",
-                                            views.export_text,
+                                            views.download_export,
+                                            {"kind": "text"},
                                             name="export_text",
                                         ),
                                         path(
                                             "xml/",
-                                            views.export_xml,
+                                            views.download_export,
+                                            {"kind": "xml"},
                                             name="export_xml",
                                         ),
+                                        path(
+                                            "export/<str:kind>/",
+                                            views.export_document,
+                                            name="export_document",
+                                        ),
+                                        path(
+                                            "export/<str:kind>/status/",
+                                            views.export_status,
+                                            name="export_status",
+                                        ),
+                                        path(
+                                            "export/<str:kind>/download/",
+                                            views.download_export,
+                                            name="download_export",
+                                        ),
                                         # page URLs
                                         path(
                                             "page/new",
@@ -181,6 +214,16 @@ urlpatterns = [
                                             views.check_words,
                                             name="page_words",
                                         ),
+                                        path(
+                                            "page<int:number>/words/events/",
+                                            views.extraction_events,
+                                            name="page_extraction_events",
+                                        ),
+                                        path(
+                                            "page<int:number>/words/update/",
+                                            views.update_words,
+                                            name="update_words",
+                                        ),
                                         path(
                                             "page<int:number>/word/<int:word_id>/update/",
                                             views.update_word,
@@ -206,6 +249,16 @@ urlpatterns = [
                                             views.textblock_history,
                                             name="textblock_history",
                                         ),
+                                        path(
+                                            "page<int:number>/word/<int:word_id>/suggestions/",
+                                            views.word_suggestions,
+                                            name="word_suggestions",
+                                        ),
+                                        path(
+                                            "page<int:number>/line/<int:line>/suggestions/",
+                                            views.line_suggestions,
+                                            name="line_suggestions",
+                                        ),
                                     ]
                                 ),
                             ),
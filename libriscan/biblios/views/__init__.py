@@ -27,17 +27,23 @@ from .documents import (
     reorder_page,
     update_page_identifier,
     extract_text,
-    export_pdf,
-    export_text,
-    export_xml,
+    extract_document,
+    document_extraction_status,
+    export_document,
+    export_status,
+    download_export,
     check_words,
+    extraction_events,
     update_document_status,
 )
 from .words import (
     update_word,
     update_print_control,
     textblock_history,
+    word_suggestions,
+    line_suggestions,
     revert_word,
     merge_blocks,
+    update_words,
     toggle_review_flag,
 )
@@ -9,7 +9,7 @@ from django.db.models import Q, Subquery
 
 from rules.contrib.views import AutoPermissionRequiredMixin
 
-from biblios.models import Organization, Document, TextBlock, UserRole
+from biblios.models import Organization, Document, LastEditedWord, TextBlock, UserRole
 
 logger = logging.getLogger("django")
 
@@ -46,9 +46,11 @@ def get_org_by_word(request, short_name, collection_slug, identifier, number, wo
     return get_object_or_404(Organization, short_name=short_name)
 
 
-def get_org_for_export(
-    request, short_name, collection_slug, identifier, use_image=False
-):
+def get_org_by_line(request, short_name, collection_slug, identifier, number, line):
+    return get_object_or_404(Organization, short_name=short_name)
+
+
+def get_org_for_export(request, short_name, collection_slug, identifier, kind):
     return get_object_or_404(Organization, short_name=short_name)
 
 
@@ -56,9 +58,14 @@ def index(request):
     context = {"app_name": "Libriscan"}
 
     if request.user.is_authenticated:
-        # The most recent doc edited by the user
-        history = Document.history.filter(history_user=request.user)
-        context["latest_doc"] = history.latest().instance if history.exists() else None
+        # The most recent doc edited by the user, even if someone else has edited it since
+        last_edit = (
+            LastEditedWord.objects.filter(user=request.user)
+            .select_related("page__document")
+            .order_by("-edited")
+            .first()
+        )
+        context["latest_doc"] = last_edit.page.document if last_edit else None
 
         # Get all organizations user has access to
         all_roles = request.user.userrole_set.all()
@@ -3,8 +3,18 @@ from datetime import datetime, timedelta
 
 from django import forms
 from django.conf import settings
-from django.http import HttpResponse, Http404, JsonResponse
+from django.db.models import OuterRef, Subquery
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    Http404,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.decorators.http import require_http_methods
@@ -21,10 +31,17 @@ from biblios.models import (
     Series,
     Page,
     DublinCoreMetadata,
-    TextBlock,
+    LastEditedWord,
 )
 
 from biblios.forms import DocumentForm, PageForm
+from biblios.services.exports import (
+    EXPORTS,
+    export_filename,
+    export_path,
+    export_progress,
+    start_export,
+)
 from .base import (
     OrgPermissionRequiredMixin,
     get_org_by_page,
@@ -52,6 +69,17 @@ class DocumentDetail(OrgPermissionRequiredMixin, DetailView):
             "owner": self.kwargs.get("short_name"),
             "collection_slug": self.kwargs.get("collection_slug"),
         }
+        context["extraction"] = self.object.extraction_progress
+        context["exports"] = {
+            kind: export_progress(self.object, kind) for kind in EXPORTS
+        }
+        # Everything the page list shows, in the same few queries however many pages there are
+        first_version = Page.history.filter(id=OuterRef("pk")).order_by(
+            "history_date", "history_id"
+        )
+        context["pages"] = self.object.pages.with_snippets().annotate(
+            created=Subquery(first_version.values("history_date")[:1])
+        )
         return context
 
 
@@ -323,25 +351,14 @@ class PageDetail(OrgPermissionRequiredMixin, DetailView):
         # Get page extraction status
         context["extracting"] = huey.get(page.extraction_key, peek=True)
 
-        # Find last edited word on this page for auto-focus
-        from django.db.models import Subquery, OuterRef
-
-        last_edited = (
-            page.words.annotate(
-                last_edit=Subquery(
-                    TextBlock.history.filter(id=OuterRef("id"))  # pylint: disable=no-member
-                    .order_by("-history_date")
-                    .values("history_date")[:1]
-                )
-            )
-            .order_by("-last_edit")
+        # Find last edited word on this page for auto-focus, preferring the user's own
+        context["last_edited_word_id"] = (
+            LastEditedWord.objects.filter(page=page, user=self.request.user)
+            .values_list("word_id", flat=True)
             .first()
-            if page.words.exists()
-            else None
+            or page.last_edited_word_id
         )
 
-        context["last_edited_word_id"] = last_edited.id if last_edited else None
-
         return context
 
     def get_object(self, **kwargs):
@@ -500,51 +517,134 @@ def extract_text(request, short_name, collection_slug, identifier, number):
 
 
 @permission_required(
-    "biblios.view_document", fn=get_org_for_export, raise_exception=True
+    "biblios.change_document", fn=get_org_by_document, raise_exception=True
 )
-def export_pdf(request, short_name, collection_slug, identifier, use_image=True):
-    """
-    Generates a PDF of a given doc ID.
-    use_image:
-        True: generate the PDF using page images
-        False: generate the PDF using just the extracted text
-    """
-    doc = Document.objects.get(
-        collection__owner__short_name=short_name,
+@require_http_methods(["POST"])
+def extract_document(request, short_name, collection_slug, identifier):
+    """Start extracting every page of the document that doesn't have text yet."""
+    document = get_object_or_404(
+        Document.objects.select_related("collection__owner"),
+        identifier=identifier,
         collection__slug=collection_slug,
+        collection__owner__short_name=short_name,
+    )
+
+    progress = document.generate_extraction()
+    if progress is None:
+        return HttpResponse(
+            "Text extraction is not available. Every page may already have text blocks, or a cloud service may not be configured for this organization.",
+            status=400,
+        )
+
+    context = {"document": document, "progress": progress}
+    return render(
+        request, "biblios/components/forms/document_extraction_progress.html", context
+    )
+
+
+@permission_required(
+    "biblios.view_document", fn=get_org_by_document, raise_exception=True
+)
+def document_extraction_status(request, short_name, collection_slug, identifier):
+    """Respond to the document extraction progress polling request."""
+    document = get_object_or_404(
+        Document.objects.select_related("collection__owner"),
         identifier=identifier,
+        collection__slug=collection_slug,
+        collection__owner__short_name=short_name,
+    )
+
+    progress = document.extraction_progress
+    context = {"document": document, "progress": progress}
+
+    # HTMX's polling trigger will stop polling when it receives status code 286
+    status = 286 if progress is None or progress["finished"] else 200
+    return render(
+        request,
+        "biblios/components/forms/document_extraction_progress.html",
+        context,
+        status=status,
     )
-    return doc.export_pdf(use_image)
 
 
 @permission_required(
     "biblios.view_document", fn=get_org_for_export, raise_exception=True
 )
-def export_text(request, short_name, collection_slug, identifier):
-    """
-    Generates a text file of a given doc ID.
-    """
-    doc = Document.objects.get(
-        collection__owner__short_name=short_name,
+@require_http_methods(["POST"])
+def export_document(request, short_name, collection_slug, identifier, kind):
+    """Start exporting the document in the background, unless an export of its current version is ready."""
+    if kind not in EXPORTS:
+        raise Http404("No such export")
+    document = get_object_or_404(
+        Document.objects.select_related("collection__owner"),
+        identifier=identifier,
         collection__slug=collection_slug,
+        collection__owner__short_name=short_name,
+    )
+
+    context = {
+        "document": document,
+        "kind": kind,
+        "progress": start_export(document, kind),
+    }
+    return render(request, "biblios/components/forms/export_progress.html", context)
+
+
+@permission_required(
+    "biblios.view_document", fn=get_org_for_export, raise_exception=True
+)
+def export_status(request, short_name, collection_slug, identifier, kind):
+    """Respond to the export progress polling request."""
+    if kind not in EXPORTS:
+        raise Http404("No such export")
+    document = get_object_or_404(
+        Document.objects.select_related("collection__owner"),
         identifier=identifier,
+        collection__slug=collection_slug,
+        collection__owner__short_name=short_name,
+    )
+
+    progress = export_progress(document, kind)
+    context = {"document": document, "kind": kind, "progress": progress}
+
+    # HTMX's polling trigger will stop polling when it receives status code 286
+    done = progress is None or progress["ready"] or progress["error"]
+    return render(
+        request,
+        "biblios/components/forms/export_progress.html",
+        context,
+        status=286 if done else 200,
     )
-    return doc.export_text()
 
 
 @permission_required(
     "biblios.view_document", fn=get_org_for_export, raise_exception=True
 )
-def export_xml(request, short_name, collection_slug, identifier):
+def download_export(request, short_name, collection_slug, identifier, kind):
     """
-    Generates a text file of a given doc ID.
+    Download the document's export. If it isn't ready, start it,
+    and go back to the document page, which shows how it's getting on.
     """
-    doc = Document.objects.get(
-        collection__owner__short_name=short_name,
-        collection__slug=collection_slug,
+    if kind not in EXPORTS:
+        raise Http404("No such export")
+    document = get_object_or_404(
+        Document.objects.select_related("collection__owner"),
         identifier=identifier,
+        collection__slug=collection_slug,
+        collection__owner__short_name=short_name,
     )
-    return doc.export_xml()
+
+    if (progress := start_export(document, kind)) and progress["ready"]:
+        try:
+            return FileResponse(
+                open(export_path(document, kind), "rb"),
+                as_attachment=True,
+                filename=export_filename(document, kind),
+            )
+        except FileNotFoundError:
+            # The document changed, and the new export replaced this one, since it was checked
+            start_export(document, kind)
+    return redirect(document)
 
 
 @permission_required("biblios.view_page", fn=get_org_by_page, raise_exception=True)
@@ -558,14 +658,29 @@ def check_words(request, short_name, collection_slug, identifier, number):
         document__collection__owner__short_name=short_name,
     )
 
-    if page.words.exists():
+    if page.has_extraction:
         # HTMX's polling trigger will stop polling when it receives status code 286
         # Take the page's extraction handle out of Huey's result store
         huey.get(page.extraction_key)
-        context = {"words": page.words.all()}
-        return render(
+
+        # The text only changes along with the page's revision, so a client that has this version can keep it
+        last_modified = page.last_edited.timestamp() if page.last_edited else None
+        if response := get_conditional_response(
+            request, etag=page.text_etag, last_modified=last_modified
+        ):
+            return response
+
+        # The template caches the parts built from the words by the page's revision, so they're only rendered once
+        context = {"words": page.words.all(), "page": page}
+        response = render(
             request, "biblios/components/forms/text_display.html", context, status=286
         )
+        response["ETag"] = page.text_etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        # Browsers can keep it, but have to check it's still current before using it again
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     elif huey.get(page.extraction_key, peek=True) is None:
         context = {
             "error": "Text extraction has unexpectedly stopped. See the system logs for details."
@@ -579,6 +694,36 @@ def check_words(request, short_name, collection_slug, identifier, number):
         return HttpResponse(status=204)
 
 
+@permission_required("biblios.view_page", fn=get_org_by_page, raise_exception=True)
+def extraction_events(request, short_name, collection_slug, identifier, number):
+    """
+    Stream an event to the page when its extraction finishes or fails, so it doesn't have to poll check_words.
+
+    This needs the ASGI application. Under WSGI each open stream would hold a worker thread,
+    so the page is told to fall back to polling instead.
+    """
+    from biblios.services.extraction import page_extraction_events
+
+    page = get_object_or_404(
+        Page,
+        number=number,
+        document__identifier=identifier,
+        document__collection__slug=collection_slug,
+        document__collection__owner__short_name=short_name,
+    )
+
+    if isinstance(request, ASGIRequest):
+        events = page_extraction_events(page)
+    else:
+        events = ["event: unsupported\ndata: \n\n"]
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop proxies holding the events back
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @permission_required(
     "biblios.change_document", fn=get_org_by_document, raise_exception=True
 )
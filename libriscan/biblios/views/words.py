@@ -1,6 +1,6 @@
+import json
 import logging
 
-from django.db import transaction
 from django.http import JsonResponse
 from django.core.exceptions import ObjectDoesNotExist
 from django.views.decorators.http import require_http_methods
@@ -9,8 +9,9 @@ from django.shortcuts import get_object_or_404, render
 
 from rules.contrib.views import permission_required
 
-from biblios.models import TextBlock
-from .base import get_org_by_word
+from biblios.models import Page, TextBlock
+from biblios.services.edits import apply_word_edits, merge_words
+from .base import get_org_by_line, get_org_by_page, get_org_by_word
 
 logger = logging.getLogger("django")
 
@@ -45,9 +46,7 @@ def update_word(request, short_name, collection_slug, identifier, number, word_i
                     "text": word.text,
                     "confidence": float(word.confidence),
                     "confidence_level": word.confidence_level,
-                    "suggestions": dict(word.suggestions)
-                    if isinstance(word.suggestions, list)
-                    else word.suggestions,
+                    "suggestions": dict(word.get_suggestions()),
                 }
             )
         else:
@@ -136,8 +135,8 @@ def toggle_review_flag(
         word.review = not word.review
         word.save(update_fields=["review"])
         
-        # Count flagged words on the page
-        flagged_count = word.page.words.filter(review=True).count()
+        # Saving the word brought the page's count of flagged words up to date
+        flagged_count = word.page.text_stats.flagged_count
         
         # Return HTML partial for HTMX swap
         context = {
@@ -154,6 +153,42 @@ def toggle_review_flag(
         return JsonResponse({"error": "Failed to toggle review flag"}, status=500)
 
 
+@permission_required("biblios.view_textblock", fn=get_org_by_word, raise_exception=True)
+@require_http_methods(["GET"])
+def word_suggestions(request, short_name, collection_slug, identifier, number, word_id):
+    """Return the spellcheck suggestions for a single TextBlock, generating them if they aren't stored"""
+    word = get_object_or_404(
+        TextBlock.objects.select_related("page__document"),
+        id=word_id,
+        page__number=number,
+        page__document__identifier=identifier,
+        page__document__collection__slug=collection_slug,
+        page__document__collection__owner__short_name=short_name,
+    )
+    return JsonResponse({"id": word.id, "suggestions": dict(word.get_suggestions())})
+
+
+@permission_required("biblios.view_textblock", fn=get_org_by_line, raise_exception=True)
+@require_http_methods(["GET"])
+def line_suggestions(request, short_name, collection_slug, identifier, number, line):
+    """Return the spellcheck suggestions for every word on a line, keyed by TextBlock ID"""
+    words = TextBlock.objects.select_related("page__document").filter(
+        line=line,
+        page__number=number,
+        page__document__identifier=identifier,
+        page__document__collection__slug=collection_slug,
+        page__document__collection__owner__short_name=short_name,
+    )
+    return JsonResponse(
+        {
+            "line": line,
+            "suggestions": {
+                word.id: dict(word.get_suggestions()) for word in words
+            },
+        }
+    )
+
+
 @permission_required("biblios.view_textblock", fn=get_org_by_word, raise_exception=True)
 @require_http_methods(["GET"])
 def textblock_history(
@@ -256,9 +291,7 @@ def revert_word(request, short_name, collection_slug, identifier, number, word_i
                 "text": word.text,
                 "confidence": float(word.confidence),
                 "confidence_level": word.confidence_level,
-                "suggestions": dict(word.suggestions)
-                if isinstance(word.suggestions, list)
-                else word.suggestions,
+                "suggestions": dict(word.get_suggestions()),
                 "text_type": word.text_type,
                 "text_type_display": TextBlock.TEXT_TYPE_CHOICES.get(word.text_type),
                 "print_control": word.print_control,
@@ -291,65 +324,87 @@ def merge_blocks(request, short_name, collection_slug, identifier, number):
     try:
         right_block = get_object_or_404(TextBlock, id=request.POST.get("block"))
 
-        # Find the printable words on this line before the selected one, and take the last as our merge target
-        # TextBlock orders by line+number so we can trust last() to return the correct one
-        left_block = TextBlock.objects.filter(
-            page=right_block.page,
-            line=right_block.line,
-            number__lt=right_block.number,
-            print_control=TextBlock.INCLUDE,
-        ).last()
-
-        if not left_block:
+        try:
+            new_block, left_block, right_block = merge_words(right_block)
             response = {
-                "error": "The selected word must have another printable word before it on the same line"
+                "new": {
+                    "id": new_block.id,
+                    "text": new_block.text,
+                    "confidence": float(new_block.confidence),
+                    "confidence_level": new_block.confidence_level,
+                    "suggestions": dict(new_block.get_suggestions()),
+                },
+                "merged_left": left_block.id,
+                "merged_right": right_block.id,
             }
-
-        else:
-            new_block = TextBlock()
-
-            # Concatenate the blocks' text with no space
-            new_block.text = f"{left_block.text}{right_block.text}"
-
-            # Use block 1's info except where we need block 2's
-            new_block.text_type = left_block.text_type
-            new_block.page = left_block.page
-            new_block.line = left_block.line
-            new_block.number = left_block.number
-            new_block.confidence = TextBlock.CONF_ACCEPTED
-            # Don't assume block_1 is the first.
-            # Take the smallest (x,y)0 and the largest (x,y)1 to get the full boundary corners
-            new_block.geo_x_0 = min(left_block.geo_x_0, right_block.geo_x_0)
-            new_block.geo_y_0 = min(left_block.geo_y_0, right_block.geo_y_0)
-            new_block.geo_x_1 = max(left_block.geo_x_1, right_block.geo_x_1)
-            new_block.geo_y_1 = max(left_block.geo_x_1, right_block.geo_x_1)
-
-            with transaction.atomic():
-                left_block.print_control = TextBlock.MERGE
-                left_block.save()
-
-                right_block.print_control = TextBlock.MERGE
-                right_block.save()
-
-                new_block.save()
-
-                response = {
-                    "new": {
-                        "id": new_block.id,
-                        "text": new_block.text,
-                        "confidence": float(new_block.confidence),
-                        "confidence_level": new_block.confidence_level,
-                        "suggestions": dict(new_block.suggestions)
-                        if isinstance(new_block.suggestions, list)
-                        else new_block.suggestions,
-                    },
-                    "merged_left": left_block.id,
-                    "merged_right": right_block.id,
-                }
-                status = 201
+            status = 201
+        except ValueError as e:
+            response = {"error": str(e)}
 
         return JsonResponse(response, status=status)
 
     except Exception as e:
         logger.error(f"Error merging text blocks: {e}")
         return JsonResponse({"error": "Failed to merge text"}, status=500)
+
+
+def word_edit_data(word):
+    """The fields the page editor shows for a word, after it's been edited."""
+    return {
+        "id": word.id,
+        "text": word.text,
+        "confidence": float(word.confidence),
+        "confidence_level": word.confidence_level,
+        "suggestions": dict(word.get_suggestions()),
+        "print_control": word.print_control,
+        "print_control_display": TextBlock.PRINT_CONTROL_CHOICES.get(
+            word.print_control
+        ),
+        "review": word.review,
+    }
+
+
+@permission_required(
+    "biblios.change_textblock", fn=get_org_by_page, raise_exception=True
+)
+@require_http_methods(["POST"])
+def update_words(request, short_name, collection_slug, identifier, number):
+    """
+    Apply a batch of word edits to the page, all at once.
+
+    Takes a JSON body of {"operations": [{"id": word ID, "op": ..., "value": ...}, ...]};
+    see services.edits.apply_word_edits() for the operations. If any of them is invalid, none are applied.
+    """
+    page = get_object_or_404(
+        Page.objects.select_related("document"),
+        number=number,
+        document__identifier=identifier,
+        document__collection__slug=collection_slug,
+        document__collection__owner__short_name=short_name,
+    )
+    try:
+        body = json.loads(request.body)
+        operations = body.get("operations") if isinstance(body, dict) else None
+        if not isinstance(operations, list):
+            raise ValueError("Expected a list of operations")
+
+        edited, merged = apply_word_edits(page, operations, request.user)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error applying word edits to page {page.id}: {e}")
+        return JsonResponse({"error": "Failed to update words"}, status=500)
+
+    return JsonResponse(
+        {
+            "words": {word.id: word_edit_data(word) for word in edited},
+            "merges": [
+                {
+                    "new": word_edit_data(new),
+                    "merged_left": left.id,
+                    "merged_right": right.id,
+                }
+                for new, left, right in merged
+            ],
+        }
+    )
@@ -141,6 +141,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": LOCAL_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # WAL mode lets pages keep loading while a write, like a freshly extracted page, is in progress.
+            # Writers take the lock when their transaction starts, and wait up to the timeout for it,
+            # rather than failing when a read-only transaction can't be upgraded.
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
     }
 }
 
@@ -224,6 +232,53 @@ HUEY = {
     "consumer": {"workers": HUEY_WORKERS, "worker_type": "thread"},
 }
 
+# Extraction saves a page's words in batches of this many, all in one transaction per page
+EXTRACTION_BATCH_SIZE = int(os.environ.get("LB_EXTRACTION_BATCH_SIZE", 500))
+
+# Skip the history record for each extracted word, and give the page a single summary record instead.
+# A word's creation record is written the first time it's edited, so it can still be reverted.
+EXTRACTION_HISTORY_SUMMARY = (
+    os.environ.get("LB_EXTRACTION_HISTORY_SUMMARY", "False") == "True"
+)
+
+# Send AWS requests somewhere other than AWS, e.g. a local stand-in for testing. Unset means the real services.
+AWS_ENDPOINT_URLS = {
+    "textract": os.environ.get("LB_TEXTRACT_ENDPOINT_URL") or None,
+    "s3": os.environ.get("LB_S3_ENDPOINT_URL") or None,
+}
+
+# PDF exports render their pages across this many processes. With 1, they're rendered in the exporting process.
+EXPORT_WORKERS = int(os.environ.get("LB_EXPORT_WORKERS", 1))
+
+# Rendered page text is cached in each process's memory, keyed by the page's revision. An edit moves the page on
+# to a new revision, so nothing out of date is ever served; old entries just age out once there are max_entries.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "libriscan",
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("LB_CACHE_SIZE", 1000))},
+    }
+}
+
+# Spelling suggestions are cached in a SQLite file alongside the task queue, so every gunicorn and Huey
+# worker shares the same entries. The least recently used words are dropped once the cache reaches max_entries.
+# Set LB_SUGGESTION_CACHE_SIZE to 0 to turn the cache off.
+SUGGESTION_CACHE = {
+    "filename": LOCAL_DIR / "suggestion_cache.db",
+    "max_entries": int(os.environ.get("LB_SUGGESTION_CACHE_SIZE", 200000)),
+}
+
+# The tests turn the suggestion cache off, so they don't fill the real one
+TEST_RUNNER = "biblios.tests.runner.BibliosTestRunner"
+
+# The spelling engine behind suggestions: "pyspellchecker", or "symspell" for a precomputed index that
+# answers much faster but takes a few seconds and a few hundred MB of memory to build in each worker.
+SUGGESTION_ENGINE = os.environ.get("LB_SUGGESTION_ENGINE", "pyspellchecker")
+
+# Whether to store spelling suggestions on every TextBlock. When this is off, suggestions are generated
+# (through the cache above) only when someone opens a word, which keeps the database and pages smaller.
+STORE_SUGGESTIONS = os.environ.get("LB_STORE_SUGGESTIONS", "True") == "True"
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -10,6 +10,9 @@ bind = "0.0.0.0:8000"
 workers = multiprocessing.cpu_count() * 2 + 1
 
 # use threaded workers
+# Pages waiting on text extraction are told when it's done over a server-sent event stream if Libriscan
+# runs as an ASGI app (libriscan.asgi:application) with an ASGI worker, such as uvicorn's
+# "uvicorn.workers.UvicornWorker". With the WSGI app and these workers, those pages poll for the text instead.
 worker_class = "gthread"
 
 # if this value is not 1, gthread workers will be used regardless of the worker_class